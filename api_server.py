@@ -0,0 +1,53 @@
+# job_ad_generator_project/api_server.py
+"""
+Headless HTTP API for the job ad generator (see module/api_service.py).
+Runs alongside the Streamlit UI and shares its credentials file and model setup.
+
+Usage:
+    python api_server.py [--host 0.0.0.0] [--port 8600]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+import yaml
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from configs import app_settings
+from content import content_watcher
+from module import api_service, vertex_service
+
+
+async def main(host: str, port: int):
+    try:
+        with open(app_settings.CREDENTIALS_FILE_PATH, 'r') as file:
+            config_auth = yaml.load(file, Loader=yaml.SafeLoader)
+    except Exception as e:
+        print(f"FATAL: Error loading credentials file {app_settings.CREDENTIALS_FILE_PATH}: {e}")
+        sys.exit(1)
+
+    model, initialized = vertex_service.init_vertex_ai()
+    if not initialized:
+        print("FATAL: Vertex AI could not be initialized. API cannot start.")
+        sys.exit(1)
+
+    content_watcher.start_content_watcher()
+    app = api_service.make_app(model, config_auth['credentials'])
+    app.listen(port, address=host)
+    print(f"Job ad API listening on http://{host}:{port}")
+    await asyncio.Event().wait() # Serve until interrupted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the headless job ad generator API.")
+    parser.add_argument("--host", default=app_settings.API_HOST)
+    parser.add_argument("--port", type=int, default=app_settings.API_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
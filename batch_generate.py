@@ -0,0 +1,107 @@
+# job_ad_generator_project/batch_generate.py
+"""
+Offline batch generation for large requisition drops (see module/batch_generation.py).
+
+Usage:
+    python batch_generate.py export requisitions.csv [--name q3_plan]
+    python batch_generate.py submit data/batches/q3_plan [--backend vertex]
+    python batch_generate.py status data/batches/q3_plan
+    python batch_generate.py import data/batches/q3_plan [--username jsmith]
+    python batch_generate.py run requisitions.csv [--backend local] [--fake-model]   # All steps, waiting for the job
+
+Requisition columns: id, template | template_preset, description | description_preset,
+tone, max_words, profile.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from configs import app_settings
+from module import batch_generation, vertex_service
+
+
+def _make_backend(name: str, fake_model: bool):
+    model = None
+    if fake_model:
+        from benchmarks.fake_model import FakeGenerativeModel
+        model = FakeGenerativeModel(first_token_seconds=0, chunk_seconds=0)
+    else:
+        # The local stand-in answers with the real model; the Vertex backend needs vertexai.init()
+        model, initialized = vertex_service.init_vertex_ai()
+        if not initialized:
+            sys.exit("FATAL: Vertex AI could not be initialized (use --fake-model for a dry run).")
+    return batch_generation.get_batch_backend(name, model)
+
+
+def _submit(batch_dir: str, chunk_paths: list[str], backend) -> str:
+    job_id = backend.submit(batch_dir, chunk_paths)
+    batch_generation.save_job(batch_dir, backend.name, job_id)
+    return job_id
+
+
+def _chunk_paths(batch_dir: str) -> list[str]:
+    input_dir = os.path.join(batch_dir, "input")
+    return [os.path.join(input_dir, name) for name in sorted(os.listdir(input_dir)) if name.endswith(".jsonl")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-generate job ads through batch prediction.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("export", "run"):
+        command_parser = subparsers.add_parser(command)
+        command_parser.add_argument("requisitions", help="CSV or JSONL file, one requisition per row.")
+        command_parser.add_argument("--name", default=None, help="Batch directory name under BATCH_WORK_DIR.")
+        command_parser.add_argument("--chunk-size", type=int, default=app_settings.BATCH_CHUNK_MAX_REQUESTS)
+    for command in ("submit", "status", "import"):
+        subparsers.add_parser(command).add_argument("batch_dir")
+    for command in ("submit", "status", "import", "run"):
+        subparsers.choices[command].add_argument("--backend", default=None, help="'local' or 'vertex'.")
+        subparsers.choices[command].add_argument("--fake-model", action="store_true",
+                                                 help="Local backend only: answer with benchmarks.fake_model.")
+    for command in ("import", "run"):
+        subparsers.choices[command].add_argument(
+            "--username", default=None,
+            help="Owner recorded in the ad history; only this user is served the imported ads from the generation cache."
+        )
+    args = parser.parse_args()
+
+    if args.command in ("export", "run"):
+        export = batch_generation.export_batch(args.requisitions, args.name, args.chunk_size)
+        print(json.dumps(export, indent=2))
+        if args.command == "export":
+            return
+        batch_dir = export["batch_dir"]
+    else:
+        batch_dir = args.batch_dir
+
+    backend_name = args.backend or (batch_generation.load_job(batch_dir)["backend"]
+                                    if args.command in ("status", "import") else app_settings.BATCH_BACKEND)
+    backend = _make_backend(backend_name, args.fake_model)
+
+    if args.command in ("submit", "run"):
+        job_id = _submit(batch_dir, _chunk_paths(batch_dir), backend)
+        print(f"Submitted job: {job_id}")
+        if args.command == "submit":
+            return
+    job_id = batch_generation.load_job(batch_dir)["job_id"]
+
+    status = backend.status(job_id)
+    while args.command == "run" and status not in ("succeeded", "failed"):
+        time.sleep(app_settings.BATCH_POLL_INTERVAL_SECONDS)
+        status = backend.status(job_id)
+    print(f"Job status: {status}")
+    if args.command == "status":
+        return
+    if status != "succeeded":
+        sys.exit(f"Batch job did not succeed ({status}); nothing to import.")
+    print(json.dumps(batch_generation.import_batch_results(backend, job_id, batch_dir, args.username), indent=2))
+
+
+if __name__ == "__main__":
+    main()
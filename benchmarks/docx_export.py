@@ -0,0 +1,68 @@
+# job_ad_generator_project/benchmarks/docx_export.py
+"""
+Measures bulk Word export: renders N ads into the branded .docx templates through
+module.docx_export and streams them into a zip file, reporting template compile
+time, per-document render time, total time and the largest chunk held at once.
+
+The ads are built from the template presets themselves (each .docx template's text
+with its placeholders left in), so no model calls or ad history are needed.
+
+Usage:
+    python benchmarks/docx_export.py --ads 200 --output /tmp/job_ads.zip
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from content.predefined_data import get_predefined_templates, get_template_source_paths
+from module import docx_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bulk .docx export into the Word templates.")
+    parser.add_argument("--ads", type=int, default=200)
+    parser.add_argument("--output", default=os.path.join(tempfile.gettempdir(), "job_ads_export.zip"))
+    args = parser.parse_args()
+
+    if not docx_export.is_available():
+        sys.exit("python-docx is not installed; Word export is unavailable.")
+    word_templates = list(get_template_source_paths())
+    if not word_templates:
+        sys.exit("No .docx templates found in the template directory.")
+    presets = get_predefined_templates()
+    entries = ({"id": index, "ad_text": presets[word_templates[index % len(word_templates)]],
+                "template_preset": word_templates[index % len(word_templates)], "description_preset": None}
+               for index in range(args.ads))
+
+    started = time.perf_counter()
+    largest_chunk = 0
+    with open(args.output, "wb") as output:
+        for chunk in docx_export.iter_bulk_export(entries):
+            largest_chunk = max(largest_chunk, len(chunk))
+            output.write(chunk)
+    total_seconds = time.perf_counter() - started
+    with zipfile.ZipFile(args.output) as archive:
+        document_count = len(archive.namelist())
+
+    print(json.dumps({
+        "ads": args.ads,
+        "documents_in_zip": document_count,
+        "output": args.output,
+        "zip_bytes": os.path.getsize(args.output),
+        "largest_chunk_bytes": largest_chunk,
+        "total_seconds": round(total_seconds, 3),
+        "export_stats": docx_export.get_export_stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
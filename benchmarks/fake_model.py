@@ -0,0 +1,129 @@
+# job_ad_generator_project/benchmarks/fake_model.py
+"""
+Local stand-in for the Vertex AI GenerativeModel, used by the benchmarks and the
+load-test harness so they can run without credentials, quota or network.
+
+It mimics the parts of the SDK the app uses (generate_content, start_chat,
+ChatSession.send_message with streaming, response chunks with .text and
+.candidates[0].finish_reason) and simulates realistic latency: a time to first
+token followed by evenly spaced chunks. A generation_config's max_output_tokens is
+honoured approximately (output is cut short with finish reason MAX_TOKENS).
+"""
+
+import threading
+import time
+
+
+class _FinishReason:
+    def __init__(self, name):
+        self.name = name
+
+
+class _Candidate:
+    def __init__(self, finish_reason_name):
+        self.finish_reason = _FinishReason(finish_reason_name)
+
+
+class FakeResponse:
+    """A full response or a streamed chunk."""
+
+    def __init__(self, text, finish_reason_name="STOP"):
+        self.text = text
+        self.candidates = [_Candidate(finish_reason_name)]
+
+
+class _FakePart:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeContent:
+    def __init__(self, role, text):
+        self.role = role
+        self.parts = [_FakePart(text)]
+
+
+def _max_output_tokens(generation_config):
+    if generation_config is None:
+        return None
+    if isinstance(generation_config, dict):
+        return generation_config.get("max_output_tokens")
+    return generation_config.to_dict().get("max_output_tokens")
+
+
+class FakeGenerativeModel:
+    """
+    Args:
+        first_token_seconds: Simulated time to first token.
+        chunk_seconds: Simulated delay between streamed chunks.
+        words_per_chunk: Words per streamed chunk.
+        output_words: Length of each generated ad, in words.
+    """
+
+    def __init__(self, first_token_seconds=0.4, chunk_seconds=0.03, words_per_chunk=8, output_words=350):
+        self.first_token_seconds = first_token_seconds
+        self.chunk_seconds = chunk_seconds
+        self.words_per_chunk = words_per_chunk
+        self.output_words = output_words
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _ad_text(self, prompt, generation_config=None):
+        """Returns (ad text, finish reason name)."""
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+        output_words, finish_reason = self.output_words, "STOP"
+        max_output_tokens = _max_output_tokens(generation_config)
+        if max_output_tokens and int(max_output_tokens / 1.4) < output_words:
+            output_words, finish_reason = int(max_output_tokens / 1.4), "MAX_TOKENS"
+        words = [f"word{index % 97}" for index in range(output_words)]
+        body = "\n".join(" ".join(words[i:i + 12]) for i in range(0, len(words), 12))
+        return f"**Job Title:** Simulated Role {call_number}\n**Company:** Example Co\n\n**About Us:**\n{body}", finish_reason
+
+    def _stream(self, text, finish_reason="STOP"):
+        time.sleep(self.first_token_seconds)
+        words = text.split(" ")
+        for start in range(0, len(words), self.words_per_chunk):
+            chunk = " ".join(words[start:start + self.words_per_chunk])
+            is_last = start + self.words_per_chunk >= len(words)
+            if not is_last:
+                chunk += " "
+            yield FakeResponse(chunk, finish_reason if is_last else "STOP")
+            time.sleep(self.chunk_seconds)
+
+    def _wait_for_full_response(self):
+        chunk_count = max(1, self.output_words // self.words_per_chunk)
+        time.sleep(self.first_token_seconds + chunk_count * self.chunk_seconds)
+
+    def generate_content(self, contents, generation_config=None, safety_settings=None, stream=False, **kwargs):
+        text, finish_reason = self._ad_text(contents, generation_config)
+        if stream:
+            return self._stream(text, finish_reason)
+        self._wait_for_full_response()
+        return FakeResponse(text, finish_reason)
+
+    def start_chat(self, history=None, **kwargs):
+        return FakeChatSession(self, history or [])
+
+
+class FakeChatSession:
+    def __init__(self, model, history):
+        self._model = model
+        self.history = list(history)
+
+    def send_message(self, content, generation_config=None, safety_settings=None, stream=False, **kwargs):
+        self.history.append(FakeContent("user", content))
+        text, finish_reason = self._model._ad_text(content, generation_config)
+        if not stream:
+            self._model._wait_for_full_response()
+            self.history.append(FakeContent("model", text))
+            return FakeResponse(text, finish_reason)
+
+        def _stream_and_record():
+            streamed = []
+            for chunk in self._model._stream(text, finish_reason):
+                streamed.append(chunk.text)
+                yield chunk
+            self.history.append(FakeContent("model", "".join(streamed)))
+        return _stream_and_record()
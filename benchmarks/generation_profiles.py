@@ -0,0 +1,63 @@
+# job_ad_generator_project/benchmarks/generation_profiles.py
+"""
+Compares the generation profiles (configs.app_settings.GENERATION_PROFILES) on
+latency and length adherence.
+
+For each profile and word limit, the script generates ads through
+vertex_service.generate_initial_ad, which applies the profile's GenerationConfig
+(with max_output_tokens derived from the word limit). It then reports the
+per-profile stats recorded by vertex_service.get_generation_profile_stats(): mean and
+max latency, mean words/limit ratio and the share of ads within the limit.
+
+Usage:
+    python benchmarks/generation_profiles.py --word-limits 150 300 500 --runs 3
+    python benchmarks/generation_profiles.py --fake   # No credentials needed
+"""
+
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from configs.app_settings import GENERATION_PROFILES
+from content.predefined_data import get_predefined_templates, get_predefined_descriptions
+from module import vertex_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure latency and length adherence per generation profile.")
+    parser.add_argument("--word-limits", type=int, nargs="+", default=[150, 300, 500])
+    parser.add_argument("--runs", type=int, default=3, help="Ads per profile and word limit.")
+    parser.add_argument("--tone", default="Professional & Engaging")
+    parser.add_argument("--fake", action="store_true", help="Use benchmarks.fake_model instead of Vertex AI.")
+    args = parser.parse_args()
+
+    if args.fake:
+        from benchmarks.fake_model import FakeGenerativeModel
+        model = FakeGenerativeModel(first_token_seconds=0.05, chunk_seconds=0.002, output_words=600)
+    else:
+        model, _ = vertex_service.init_vertex_ai()
+        if model is None:
+            sys.exit("Vertex AI is not available; run with --fake to use the local stand-in model.")
+
+    template = next(iter(get_predefined_templates().values()))
+    description = next(iter(get_predefined_descriptions().values()))
+    for profile_name in GENERATION_PROFILES:
+        for max_words in args.word_limits:
+            for _ in range(args.runs):
+                vertex_service.generate_initial_ad(model, template, description, args.tone, max_words, profile_name)
+
+    print(json.dumps({
+        "word_limits": args.word_limits,
+        "runs": args.runs,
+        "tone": args.tone,
+        "profiles": vertex_service.get_generation_profile_stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
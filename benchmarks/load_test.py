@@ -0,0 +1,188 @@
+# job_ad_generator_project/benchmarks/load_test.py
+"""
+Multi-session load test for the Streamlit app.
+
+Drives N concurrent simulated recruiters through the real app.py script using
+Streamlit's AppTest runner (same process, same module state, same script-rerun
+path as `streamlit run`): log in, pick a template and a description preset,
+generate an ad, open the chat and send several refinements. The Vertex AI model
+is replaced by benchmarks.fake_model with realistic streaming latency.
+
+For each N it reports script-rerun latency p50/p99, rerun throughput, RSS per
+session and peak thread count, as JSON so capacity can be tracked across releases.
+
+Login note: the authenticator's cookie component needs a browser, so simulated
+sessions start from the post-login state (authentication_status/name/username),
+which is exactly what streamlit-authenticator sets after a successful login.
+
+Usage:
+    python benchmarks/load_test.py --sessions 1 5 10 25 --refinements 3 --output load_results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.fake_model import FakeGenerativeModel
+from benchmarks.session_memory import _current_rss_bytes
+from module import session_store, vertex_service
+
+APP_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "app.py")
+
+
+def _percentile(values, percentile):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _ThreadSampler:
+    """Samples the process thread count in the background and keeps the peak."""
+
+    def __init__(self, interval_seconds=0.05):
+        self.peak = threading.active_count()
+        self._interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-test-thread-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            self._stop.wait(self._interval_seconds)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def _timed_run(app_test, step_name, timings, errors, timeout):
+    started = time.perf_counter()
+    app_test.run(timeout=timeout)
+    timings.append((step_name, time.perf_counter() - started))
+    if app_test.exception:
+        errors.append(f"{step_name}: {app_test.exception[0].message}")
+
+
+def _simulate_session(session_index, refinements, timeout):
+    """Runs one recruiter's journey. Returns (AppTest, [(step, seconds)], [errors])."""
+    timings, errors = [], []
+    app_test = AppTest.from_file(APP_SCRIPT_PATH, default_timeout=timeout)
+    app_test.session_state["authentication_status"] = True
+    app_test.session_state["name"] = f"Load Test User {session_index}"
+    app_test.session_state["username"] = f"loadtest_{session_index}"
+
+    _timed_run(app_test, "login", timings, errors, timeout)
+    try:
+        template_box = app_test.selectbox(key="template_loader_sb")
+        template_box.select(template_box.options[min(2, len(template_box.options) - 1)])
+        _timed_run(app_test, "select_template", timings, errors, timeout)
+
+        description_box = app_test.selectbox(key="description_loader_sb")
+        description_box.select(description_box.options[min(1, len(description_box.options) - 1)])
+        _timed_run(app_test, "select_description", timings, errors, timeout)
+
+        app_test.button(key="generate_ad_btn").click()
+        _timed_run(app_test, "generate", timings, errors, timeout)
+
+        app_test.button(key="finetune_btn_main_ui").click()
+        _timed_run(app_test, "open_chat", timings, errors, timeout)
+
+        for refinement_index in range(refinements):
+            app_test.chat_input(key="chat_refine_input_main_ui").set_value(
+                f"Refinement {refinement_index + 1}: make it a little more concise."
+            )
+            _timed_run(app_test, "refine", timings, errors, timeout)
+    except Exception as e: # Missing widget etc.: record and keep the other sessions going
+        errors.append(f"session {session_index}: {type(e).__name__}: {e}")
+    return app_test, timings, errors
+
+
+def run_level(session_count, refinements, timeout):
+    """Runs `session_count` concurrent sessions and returns the metrics for that level."""
+    rss_before = _current_rss_bytes()
+    started = time.perf_counter()
+    with _ThreadSampler() as sampler, ThreadPoolExecutor(max_workers=session_count) as executor:
+        results = list(executor.map(lambda index: _simulate_session(index, refinements, timeout),
+                                    range(session_count)))
+    wall_seconds = time.perf_counter() - started
+    rss_after = _current_rss_bytes() # AppTest objects are still alive here, like open browser tabs
+
+    all_timings = [seconds for _, timings, _ in results for _, seconds in timings]
+    by_step = {}
+    for _, timings, _ in results:
+        for step_name, seconds in timings:
+            by_step.setdefault(step_name, []).append(seconds)
+    errors = [error for _, _, session_errors in results for error in session_errors]
+
+    return {
+        "sessions": session_count,
+        "reruns": len(all_timings),
+        "wall_seconds": round(wall_seconds, 3),
+        "rerun_p50_ms": round(1000 * _percentile(all_timings, 50), 1),
+        "rerun_p99_ms": round(1000 * _percentile(all_timings, 99), 1),
+        "throughput_reruns_per_s": round(len(all_timings) / wall_seconds, 2) if wall_seconds else 0.0,
+        "steps": {step: {"p50_ms": round(1000 * _percentile(values, 50), 1),
+                         "p99_ms": round(1000 * _percentile(values, 99), 1)}
+                  for step, values in by_step.items()},
+        "rss_per_session_bytes": max(rss_after - rss_before, 0) // session_count,
+        "peak_threads": sampler.peak,
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test app.py with N concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--refinements", type=int, default=3, help="Chat refinements per session.")
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--chunk-ms", type=float, default=30)
+    parser.add_argument("--output-words", type=int, default=350)
+    parser.add_argument("--timeout", type=float, default=120, help="Per-rerun timeout in seconds.")
+    parser.add_argument("--output", default=None, help="Write the JSON results to this file as well.")
+    args = parser.parse_args()
+
+    fake_model = FakeGenerativeModel(first_token_seconds=args.first_token_ms / 1000,
+                                     chunk_seconds=args.chunk_ms / 1000,
+                                     output_words=args.output_words)
+    vertex_service.init_vertex_ai = lambda: (fake_model, True)
+    # Keep simulated users out of the real session store
+    session_store.SESSION_STORE_PATH = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "store.sqlite3")
+
+    levels = [run_level(count, args.refinements, args.timeout) for count in args.sessions]
+    report = {
+        "app": "app.py",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "config": {"refinements": args.refinements, "first_token_ms": args.first_token_ms,
+                   "chunk_ms": args.chunk_ms, "output_words": args.output_words},
+        "model_calls": fake_model.calls,
+        "session_store": session_store.get_store_stats(),
+        "levels": levels,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
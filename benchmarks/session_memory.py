@@ -0,0 +1,105 @@
+# job_ad_generator_project/benchmarks/session_memory.py
+"""
+Per-session memory benchmark for the session store.
+
+Simulates N users, each with a generated ad and a multi-turn refinement chat,
+going through module.session_store the way session_manager does, and reports
+process RSS growth per session. With the hot-cache budget in place RSS should
+stay roughly flat as N grows, because idle chat sessions are evicted to SQLite.
+
+Usage:
+    python benchmarks/session_memory.py --sessions 100 200 400 --turns 6
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from configs import app_settings
+
+
+class _FakeMessage:
+    """Stands in for vertexai Content: a role plus parts carrying .text."""
+    class _Part:
+        def __init__(self, text):
+            self.text = text
+
+    def __init__(self, role, text):
+        self.role = role
+        self.parts = [self._Part(text)]
+
+
+class _FakeChatSession:
+    def __init__(self, history):
+        self.history = [_FakeMessage(role, text) for role, text in history]
+
+
+def _current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _make_ad(user_index: int, version: int) -> str:
+    line = f"Refined ad v{version} for user {user_index}: responsibilities, qualifications and benefits. "
+    return line * 60  # ~5-6 KB per ad version
+
+
+def run(session_counts, turns):
+    from module import session_store
+
+    results = []
+    for count in session_counts:
+        baseline = _current_rss_bytes()
+        for user_index in range(count):
+            session_key = f"bench_user_{count}_{user_index}"
+            history = [["model", _make_ad(user_index, 0)]]
+            for turn in range(1, turns + 1):
+                history.append(["user", f"Please make change number {turn}."])
+                history.append(["model", _make_ad(user_index, turn)])
+            session_store.save_session_state(session_key, {"generated_job_ad": history[-1][1]})
+            session_store.save_chat_history(session_key, history)
+            session_store.cache_chat_session(session_key, _FakeChatSession(history),
+                                             session_store.estimate_history_bytes(history))
+        grown = max(_current_rss_bytes() - baseline, 0)
+        stats = session_store.get_store_stats()
+        results.append({
+            "sessions": count,
+            "rss_growth_bytes": grown,
+            "rss_per_session_bytes": grown // count if count else 0,
+            "hot_sessions": stats["hot_sessions"],
+            "hot_bytes": stats["hot_bytes"],
+            "evictions_budget": stats["evictions_budget"],
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100, 200, 400])
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--store-path", default=None,
+                        help="SQLite file to use (defaults to a temporary file, not the app's store).")
+    args = parser.parse_args()
+
+    # Never pollute the real session store with benchmark users
+    store_path = args.store_path or os.path.join(tempfile.mkdtemp(prefix="session_bench_"), "store.sqlite3")
+    app_settings.SESSION_STORE_PATH = store_path
+    results = run(args.sessions, args.turns)
+    print(json.dumps({"store_path": store_path,
+                      "hot_max_entries": app_settings.SESSION_HOT_MAX_ENTRIES,
+                      "hot_max_bytes": app_settings.SESSION_HOT_MAX_BYTES,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# job_ad_generator_project/benchmarks/token_report.py
+"""
+Token report for every preset template and job description.
+
+For each preset, compares the estimated prompt tokens of the legacy extraction
+(cell-by-cell tables, no normalisation) with the normalised text actually used
+in prompts, using the local token estimator.
+
+Usage:
+    python benchmarks/token_report.py [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from configs.app_settings import AD_TEMPLATES_DIR, JD_DESCRIPTIONS_DIR
+from content import predefined_data
+from content.normalization import estimate_tokens
+
+
+def _legacy_texts(directory_path: str) -> dict:
+    """Re-extracts a directory the way it was read before normalisation was introduced."""
+    original_reader = predefined_data.DOCX_READER_FUNCTION
+    predefined_data.DOCX_READER_FUNCTION = lambda path: predefined_data._read_docx_file_ordered(path, compact_tables=False)
+    try:
+        return predefined_data._load_content_from_directory(directory_path)
+    finally:
+        predefined_data.DOCX_READER_FUNCTION = original_reader
+
+
+def build_report() -> list[dict]:
+    rows = []
+    for kind, directory_path, presets in (
+        ("template", AD_TEMPLATES_DIR, predefined_data.get_predefined_templates()),
+        ("description", JD_DESCRIPTIONS_DIR, predefined_data.get_predefined_descriptions()),
+    ):
+        legacy = _legacy_texts(directory_path)
+        for name, text in presets.items():
+            before = estimate_tokens(legacy.get(name, text))
+            after = estimate_tokens(text)
+            rows.append({"kind": kind, "preset": name, "tokens_before": before, "tokens_after": after,
+                         "saved_pct": round(100 * (before - after) / before, 1) if before else 0.0})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report estimated prompt tokens per preset.")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON.")
+    args = parser.parse_args()
+
+    rows = build_report()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'KIND':<12} {'PRESET':<45} {'BEFORE':>8} {'AFTER':>8} {'SAVED':>7}")
+    for row in rows:
+        print(f"{row['kind']:<12} {row['preset'][:45]:<45} {row['tokens_before']:>8} "
+              f"{row['tokens_after']:>8} {row['saved_pct']:>6}%")
+    total_before = sum(row["tokens_before"] for row in rows)
+    total_after = sum(row["tokens_after"] for row in rows)
+    print(f"{'TOTAL':<58} {total_before:>8} {total_after:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -48,4 +48,176 @@ CREDENTIALS_FILE_PATH = os.path.join(PROJECT_ROOT, "configs", "credentials.yaml"
 # "KEY_FILE": Use a specific service account JSON key file.
 #             The path is specified by SERVICE_ACCOUNT_FILE_PATH below.
 # Default to "ADC", which is generally recommended for portability and Cloud Run.
-VERTEX_AI_AUTH_METHOD = "KEY_FILE"  # Or "ADC"
\ No newline at end of file
+VERTEX_AI_AUTH_METHOD = "KEY_FILE"  # Or "ADC"
+
+# --- Session Store Configuration ---
+# Session and chat state is persisted to a local SQLite file so that only active
+# sessions need to be kept in memory. Idle chat sessions are evicted and rebuilt
+# from their stored history when the user returns.
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+SESSION_STORE_PATH = os.path.join(DATA_DIR, "session_store.sqlite3")
+SESSION_HOT_MAX_ENTRIES = 100              # Max live ChatSession objects kept in memory per process
+SESSION_HOT_MAX_BYTES = 32 * 1024 * 1024   # Approximate memory budget for live chat sessions
+SESSION_IDLE_TTL_SECONDS = 15 * 60         # Chat sessions idle for longer than this are evicted
+SESSION_EVICTION_SWEEP_SECONDS = 60        # Minimum interval between idle-eviction sweeps
+
+# --- Sectioned Generation Configuration ---
+# When enabled, templates are split into sections (About Us, Responsibilities, ...) that are
+# generated concurrently and stitched together in order, and single sections can be regenerated.
+SECTIONED_GENERATION_ENABLED = True
+SECTION_GENERATION_MAX_WORKERS = 8
+
+# --- Content Normalisation Configuration ---
+# Ingested templates and job descriptions are normalised before use in prompts:
+# compact markdown tables, collapsed whitespace, and boilerplate removal.
+CONTENT_NORMALIZATION_ENABLED = True
+CONTENT_BOILERPLATE_MIN_DOCUMENTS = 2   # A long line found in this many JDs is treated as shared boilerplate
+CONTENT_BOILERPLATE_MIN_WORDS = 8       # Shorter lines (headings, labels) are never treated as boilerplate
+# Optional token budget per input field, applied to presets and to prompt inputs (0 = no budget)
+CONTENT_FIELD_TOKEN_BUDGETS = {
+    "template": 0,
+    "description": 0,
+}
+
+# --- Content Hot-Reload Configuration ---
+# Templates/JDs added, changed or removed in the content directories are picked up
+# without a restart (watchdog/inotify if installed, otherwise polling).
+CONTENT_WATCH_ENABLED = True
+CONTENT_WATCH_DEBOUNCE_SECONDS = 1.0   # Wait for a burst of file events to settle before reloading
+CONTENT_POLL_INTERVAL_SECONDS = 5.0    # Polling fallback interval
+
+# --- Headless HTTP API Configuration ---
+# `python api_server.py` serves generation and chat refinement over HTTP with
+# server-sent-event streaming. Clients authenticate with HTTP Basic auth using the
+# same users and hashed passwords as the UI (CREDENTIALS_FILE_PATH).
+API_HOST = "0.0.0.0"
+API_PORT = 8600
+API_MAX_BODY_BYTES = 1024 * 1024
+
+# --- Output Validation Configuration ---
+# Generated and refined ads are checked locally (placeholders, word limit, template
+# sections). Failures trigger at most one narrowly scoped repair request.
+VALIDATION_ENABLED = True
+VALIDATION_WORD_LIMIT_TOLERANCE = 0.15                 # Allow 15% over max_words before repairing
+VALIDATION_ALLOWED_BRACKETED_TEXT = ("[INTERNAL ONLY]",) # Bracketed template text that is not a placeholder
+
+# --- Generation Profiles ---
+# Named GenerationConfig profiles. max_output_tokens is derived from the requested word
+# limit (words * GENERATION_TOKENS_PER_WORD * token_headroom) so a rambling response is
+# cut off instead of streaming long past the requested length.
+GENERATION_PROFILES = {
+    "draft": {"label": "Draft (fast)", "temperature": 0.9, "top_p": 0.95, "candidate_count": 1,
+              "token_headroom": 1.25, "stop_sequences": []},
+    "final": {"label": "Final (quality)", "temperature": 0.6, "top_p": 0.95, "candidate_count": 1,
+              "token_headroom": 1.5, "stop_sequences": []},
+    "refinement": {"label": "Refinement", "temperature": 0.3, "top_p": 0.9, "candidate_count": 1,
+                   "token_headroom": 1.5, "stop_sequences": ["</job_ad>"]},
+}
+GENERATION_TOKENS_PER_WORD = 1.4            # Approximate output tokens per English word (incl. markdown)
+GENERATION_DEFAULT_MAX_OUTPUT_TOKENS = 2048 # Cap used when no word limit is set (max_words == 0)
+# Default profile for each call site; the initial-ad profile can be changed per session in the sidebar.
+CALL_SITE_PROFILES = {
+    "initial_ad": "final",
+    "section": "final",
+    "repair": "refinement",
+    "chat": "refinement",
+    "localisation": "refinement",
+}
+# Per-tone overrides applied on top of the selected profile.
+TONE_PROFILE_OVERRIDES = {
+    "Formal": {"temperature": 0.4},
+    "Technical & Direct": {"temperature": 0.4},
+    "Creative & Unique": {"temperature": 1.0},
+}
+
+# --- Generation History Configuration ---
+# Every finished ad is appended, with its inputs and settings, to a local SQLite store
+# with a full-text index, so past ads can be searched and reused instead of regenerated.
+AD_HISTORY_PATH = os.path.join(DATA_DIR, "ad_history.sqlite3")
+AD_HISTORY_SEARCH_LIMIT = 20   # Results shown in the history panel
+
+# --- Generation Cache / Speculative Pre-Generation Configuration ---
+# With speculative pre-generation switched on in the sidebar, an ad is generated in the
+# background once the (template, description, tone, max words, profile) inputs have been
+# stable for SPECULATIVE_DEBOUNCE_SECONDS. The result waits in the generation cache and
+# is used when Generate is clicked with the same inputs; changing the inputs cancels it.
+SPECULATIVE_GENERATION_ENABLED = True        # Offer the sidebar toggle (each user still opts in)
+SPECULATIVE_DEBOUNCE_SECONDS = 2.0
+SPECULATIVE_MAX_CONCURRENT = 2               # Background generations running at once, process-wide
+SPECULATIVE_MAX_PER_USER_PER_HOUR = 20       # Quota guard for speculative model calls
+SPECULATIVE_MAX_WAIT_SECONDS = 30            # Longest Generate waits for an in-flight speculation (about one generation)
+GENERATION_CACHE_MAX_ENTRIES = 100
+GENERATION_CACHE_TTL_SECONDS = 30 * 60
+# Persisted tier for ads generated by other processes (batch imports)
+GENERATION_CACHE_PATH = os.path.join(DATA_DIR, "generation_cache.sqlite3")
+GENERATION_CACHE_PERSISTED_TTL_SECONDS = 30 * 24 * 3600
+
+# --- Profiling Configuration ---
+# Each script rerun is timed phase by phase (credentials, sidebar, ad output, chat,
+# model calls). Admins see the last reruns in a sidebar panel and can capture a
+# cProfile of a single rerun to PROFILING_OUTPUT_DIR.
+PROFILING_ENABLED = True
+PROFILING_RERUN_HISTORY = 50           # Reruns kept for the performance panel (process-wide)
+PROFILING_OUTPUT_DIR = os.path.join(DATA_DIR, "profiles")
+ADMIN_USERNAMES = ("jsmith",)          # Users who see the developer performance panel
+
+# --- Batch Generation Configuration ---
+# `python batch_generate.py` renders requisitions into batch-prediction JSONL files
+# (the same prompts as online generation), submits them through a batch backend and
+# imports the results into the ad history and the generation cache.
+BATCH_BACKEND = "local"                   # "local" (file-based stand-in) or "vertex" (Vertex AI batch prediction)
+BATCH_WORK_DIR = os.path.join(DATA_DIR, "batches")
+BATCH_CHUNK_MAX_REQUESTS = 500            # Requests per JSONL chunk file
+BATCH_GCS_URI_PREFIX = ""                 # Required for "vertex", e.g. "gs://my-bucket/job-ad-batches"
+BATCH_POLL_INTERVAL_SECONDS = 30
+
+# --- Localisation Configuration ---
+# A finished ad can be translated into several locales at once: one streamed model call
+# per locale, all running concurrently, so the wait is that of the slowest translation.
+# Translations are cached per (ad text, locale), process-wide.
+LOCALISATION_LOCALES = {                  # Locale code -> target language given to the model
+    "de-DE": "German (Germany)",
+    "fr-FR": "French (France)",
+    "es-ES": "Spanish (Spain)",
+    "it-IT": "Italian (Italy)",
+    "nl-NL": "Dutch (Netherlands)",
+    "pl-PL": "Polish (Poland)",
+    "pt-BR": "Portuguese (Brazil)",
+    "sv-SE": "Swedish (Sweden)",
+    "ja-JP": "Japanese (Japan)",
+    "en-GB": "British English",
+}
+LOCALISATION_DEFAULT_LOCALES = ["de-DE", "fr-FR"]
+LOCALISATION_MAX_WORKERS = 10             # Concurrent translation calls per request
+# Output-token cap of a translation = the source ad's estimated tokens * the locale's factor
+# (+ a fixed allowance). Tokenizers split non-English text into more tokens per word, and
+# Japanese far more per character, so the factors are per locale rather than one word ratio.
+LOCALISATION_TOKEN_FACTORS = {
+    "de-DE": 1.8,
+    "fr-FR": 1.7,
+    "es-ES": 1.7,
+    "it-IT": 1.7,
+    "nl-NL": 1.8,
+    "pl-PL": 2.2,
+    "pt-BR": 1.7,
+    "sv-SE": 1.8,
+    "ja-JP": 3.0,
+    "en-GB": 1.2,
+}
+LOCALISATION_DEFAULT_TOKEN_FACTOR = 2.0   # For locales missing from LOCALISATION_TOKEN_FACTORS
+LOCALISATION_CACHE_MAX_ENTRIES = 200
+
+# --- Stream Resumption Configuration ---
+# When a streamed model response breaks part-way (network error, token expiry, 5xx),
+# the text received so far is kept and a continuation request asks the model to carry
+# on from where it stopped; text the continuation repeats is dropped. Applies to ad,
+# section, translation and chat streams in the UI.
+STREAM_RESUME_MAX_RETRIES = 2             # Continuation requests per response (0 disables resumption)
+STREAM_RESUME_BACKOFF_SECONDS = 1.0       # Wait before the first continuation; doubles for each further one
+
+# --- Word Export Configuration ---
+# Generated ads are rendered back into the branded .docx templates in AD_TEMPLATES_DIR,
+# section by section, keeping the template's styles. Ads whose template preset is not
+# a .docx file (built-ins, "Custom") use DOCX_EXPORT_FALLBACK_TEMPLATE.
+DOCX_EXPORT_FALLBACK_TEMPLATE = "Optus Ads Template1"   # Template preset key
+DOCX_EXPORT_MAX_ADS = 1000                              # Ads per bulk export (API)
@@ -0,0 +1,112 @@
+# job_ad_generator_project/content/content_watcher.py
+"""
+Live reload of the content directories (ad templates and job descriptions).
+
+Uses `watchdog` (inotify on Linux) when it is installed, and falls back to a
+lightweight polling thread otherwise. Either way the actual work is done by
+`predefined_data.refresh_content()`, which re-extracts only the files that were
+added or changed and atomically swaps the preset mappings used by all sessions.
+"""
+
+import threading
+import time
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+from configs.app_settings import (
+    AD_TEMPLATES_DIR,
+    JD_DESCRIPTIONS_DIR,
+    CONTENT_WATCH_ENABLED,
+    CONTENT_WATCH_DEBOUNCE_SECONDS,
+    CONTENT_POLL_INTERVAL_SECONDS,
+)
+from content import predefined_data
+
+_watched_kinds = {AD_TEMPLATES_DIR: "templates", JD_DESCRIPTIONS_DIR: "descriptions"}
+_watcher_lock = threading.Lock()
+_watcher_started = False
+
+
+class _DebouncedRefresher:
+    """Collects change notifications and runs one refresh per burst of events (e.g. a file copy)."""
+
+    def __init__(self, debounce_seconds):
+        self._debounce_seconds = debounce_seconds
+        self._pending_kinds = set()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def notify(self, kind):
+        with self._lock:
+            self._pending_kinds.add(kind)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self._debounce_seconds, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        with self._lock:
+            kinds, self._pending_kinds, self._timer = self._pending_kinds, set(), None
+        if kinds:
+            predefined_data.refresh_content(kinds)
+
+
+class _ContentEventHandler(FileSystemEventHandler):
+    def __init__(self, refresher, kind):
+        super().__init__()
+        self._refresher = refresher
+        self._kind = kind
+
+    def on_any_event(self, event):
+        if not event.is_directory:
+            self._refresher.notify(self._kind)
+
+
+def _poll_forever(interval_seconds):
+    while True:
+        time.sleep(interval_seconds)
+        try:
+            predefined_data.refresh_content() # Only stats files unless something changed
+        except Exception as e:
+            print(f"ERROR: Content polling refresh failed: {e}")
+
+
+def start_content_watcher() -> str | None:
+    """
+    Starts watching the content directories once per process (later calls are no-ops).
+
+    Returns:
+        "inotify" or "polling" for the mechanism started, or None if already running or disabled.
+    """
+    global _watcher_started
+    if not CONTENT_WATCH_ENABLED:
+        return None
+    with _watcher_lock:
+        if _watcher_started:
+            return None
+        _watcher_started = True
+
+    if Observer is not None:
+        try:
+            refresher = _DebouncedRefresher(CONTENT_WATCH_DEBOUNCE_SECONDS)
+            observer = Observer()
+            for directory_path, kind in _watched_kinds.items():
+                observer.schedule(_ContentEventHandler(refresher, kind), directory_path, recursive=False)
+            observer.daemon = True
+            observer.start()
+            print("DEBUG: Watching content directories for changes (watchdog/inotify).")
+            return "inotify"
+        except Exception as e:
+            print(f"WARNING: Could not start filesystem watcher ({e}); falling back to polling.")
+
+    poller = threading.Thread(target=_poll_forever, args=(CONTENT_POLL_INTERVAL_SECONDS,),
+                              name="content-poller", daemon=True)
+    poller.start()
+    print(f"DEBUG: Polling content directories for changes every {CONTENT_POLL_INTERVAL_SECONDS}s.")
+    return "polling"
@@ -0,0 +1,170 @@
+# job_ad_generator_project/content/normalization.py
+"""
+Normalisation of ingested template and job description content before it is
+used in prompts. Everything sent to the model costs latency and tokens, so this
+stage removes what the model does not need:
+- Tables rendered as compact markdown instead of verbose cell-by-cell text.
+- Repeated spaces, trailing whitespace and runs of blank lines collapsed.
+- Boilerplate lines (page footers, document-control text, and long lines such as
+  legal statements that are duplicated across several job descriptions) removed.
+- An optional per-field token budget, applied at line boundaries.
+
+Token counts use a local estimator, so no model call is needed to measure them.
+"""
+
+import math
+import re
+
+# Word-like pieces, individual punctuation marks and whitespace runs, roughly how BPE tokenizers split text.
+_TOKEN_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]|\s{2,}")
+_INLINE_SPACE_PATTERN = re.compile(r"(?<=\S)[ \t ]{2,}")
+_TRAILING_SPACE_PATTERN = re.compile(r"[ \t ]+$", re.MULTILINE)
+_BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+_LINE_KEY_PATTERN = re.compile(r"[^a-z0-9]+")
+
+# Lines that never carry job information.
+_BOILERPLATE_LINE_PATTERNS = [
+    re.compile(r"^\s*page\s+\d+(\s+of\s+\d+)?\s*$", re.IGNORECASE),
+    re.compile(r"^\s*(commercial[- ]in[- ])?confidential\s*$", re.IGNORECASE),
+    re.compile(r"^\s*(document\s+(no\.?|number|id)|version|revision)\b\s*[:#]?\s*[\w.\-/]*\d[\w.\-/]*\s*$", re.IGNORECASE),
+    re.compile(r"^\s*(printed|uncontrolled) (copy|when printed).*$", re.IGNORECASE),
+    re.compile(r"^\s*©.*all rights reserved\.?\s*$", re.IGNORECASE),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the model token count of a text locally. Long words count as several
+    tokens (about four characters each) and runs of whitespace count as one, matching
+    subword tokenizers closely enough for before/after comparisons and budgets.
+    """
+    if not text:
+        return 0
+    return sum(math.ceil(len(piece) / 4) if len(piece) > 4 and not piece.isspace() else 1
+               for piece in _TOKEN_PIECE_PATTERN.findall(text))
+
+
+def render_table_markdown(rows: list[list[str]]) -> str:
+    """
+    Renders table rows as a compact markdown table. Horizontally merged cells (which
+    python-docx reports as repeated cells) are collapsed and empty rows are dropped.
+    """
+    cleaned_rows = []
+    for row in rows:
+        cells = []
+        for cell in row:
+            cell_text = " ".join(cell.split()).replace("|", "/")
+            if not cells or cell_text != cells[-1]:
+                cells.append(cell_text)
+        if any(cells):
+            cleaned_rows.append(cells)
+    if not cleaned_rows:
+        return ""
+
+    width = max(len(cells) for cells in cleaned_rows)
+    lines = []
+    for index, cells in enumerate(cleaned_rows):
+        lines.append("| " + " | ".join(cells + [""] * (width - len(cells))) + " |")
+        if index == 0 and len(cleaned_rows) > 1:
+            lines.append("|" + "---|" * width)
+    return "\n".join(lines)
+
+
+def collapse_whitespace(text: str) -> str:
+    """Collapses repeated inline spaces, trailing whitespace and runs of blank lines (keeps indentation)."""
+    if not text:
+        return ""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _TRAILING_SPACE_PATTERN.sub("", text)
+    text = _INLINE_SPACE_PATTERN.sub(" ", text)
+    return _BLANK_LINES_PATTERN.sub("\n\n", text).strip()
+
+
+def _line_key(line: str) -> str:
+    return _LINE_KEY_PATTERN.sub(" ", line.lower()).strip()
+
+
+def find_shared_boilerplate(documents: dict, min_documents: int, min_words: int) -> set:
+    """
+    Finds long lines that appear in at least `min_documents` different documents.
+    Near-duplicate documents (e.g. the same JD saved as .docx and .txt) are counted
+    once, so they do not strip each other's content.
+
+    Returns:
+        A set of normalised line keys (see `remove_boilerplate`).
+    """
+    if min_documents < 2:
+        return set()
+    distinct_key_sets = []
+    for text in documents.values():
+        keys = {_line_key(line) for line in text.splitlines() if len(line.split()) >= min_words}
+        keys.discard("")
+        is_near_duplicate = any(
+            len(keys & other) > 0.5 * min(len(keys), len(other)) for other in distinct_key_sets if keys and other
+        )
+        if not is_near_duplicate:
+            distinct_key_sets.append(keys)
+
+    document_counts = {}
+    for keys in distinct_key_sets:
+        for key in keys:
+            document_counts[key] = document_counts.get(key, 0) + 1
+    return {key for key, count in document_counts.items() if count >= min_documents}
+
+
+def remove_boilerplate(text: str, shared_line_keys: set | frozenset = frozenset()) -> str:
+    """Removes footer/document-control lines and any line whose key is in `shared_line_keys`."""
+    kept_lines = []
+    for line in text.splitlines():
+        if any(pattern.match(line) for pattern in _BOILERPLATE_LINE_PATTERNS):
+            continue
+        if shared_line_keys and _line_key(line) in shared_line_keys:
+            continue
+        kept_lines.append(line)
+    return "\n".join(kept_lines)
+
+
+def apply_token_budget(text: str, token_budget: int) -> str:
+    """Truncates text at a line boundary so it fits `token_budget` estimated tokens (0 = no budget)."""
+    if token_budget <= 0 or estimate_tokens(text) <= token_budget:
+        return text
+    kept_lines = []
+    used_tokens = 0
+    for line in text.splitlines():
+        line_tokens = estimate_tokens(line) + 1
+        if used_tokens + line_tokens > token_budget:
+            break
+        kept_lines.append(line)
+        used_tokens += line_tokens
+    print(f"DEBUG: Content truncated to a budget of {token_budget} tokens.")
+    return "\n".join(kept_lines).rstrip()
+
+
+def normalize_text(text: str, shared_line_keys: set | frozenset = frozenset(), token_budget: int = 0) -> str:
+    """Runs the full normalisation on one text: boilerplate removal, whitespace collapse, token budget."""
+    return apply_token_budget(collapse_whitespace(remove_boilerplate(text or "", shared_line_keys)), token_budget)
+
+
+def normalize_documents(documents: dict, remove_shared: bool, min_documents: int, min_words: int,
+                        token_budget: int = 0) -> tuple[dict, dict]:
+    """
+    Normalises a mapping of name -> raw text.
+
+    Args:
+        documents: Raw extracted texts keyed by preset name.
+        remove_shared: Whether to drop long lines duplicated across documents.
+        min_documents: Number of documents a line must appear in to count as shared.
+        min_words: Minimum words for a line to be considered shared boilerplate.
+        token_budget: Per-document token budget (0 for no budget).
+
+    Returns:
+        tuple: (normalised texts keyed by name, {name: (tokens_before, tokens_after)}).
+    """
+    shared_line_keys = find_shared_boilerplate(documents, min_documents, min_words) if remove_shared else set()
+    normalized = {}
+    token_stats = {}
+    for name, text in documents.items():
+        normalized_text = normalize_text(text, shared_line_keys, token_budget)
+        normalized[name] = normalized_text
+        token_stats[name] = (estimate_tokens(text), estimate_tokens(normalized_text))
+    return normalized, token_stats
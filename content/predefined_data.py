@@ -1,5 +1,6 @@
 # job_ad_generator_project/content/predefined_data.py
 import os
+import threading
 try:
     import docx
     from docx.document import Document as _Document # To access block items
@@ -18,7 +19,15 @@ except ImportError:
     print("WARNING: 'python-docx' library not found. .docx file support will be disabled.")
     print("Please install it by running: pip install python-docx")
 
-from configs.app_settings import AD_TEMPLATES_DIR, JD_DESCRIPTIONS_DIR # Assuming this is correc
+from configs.app_settings import (
+    AD_TEMPLATES_DIR,
+    JD_DESCRIPTIONS_DIR,
+    CONTENT_NORMALIZATION_ENABLED,
+    CONTENT_BOILERPLATE_MIN_DOCUMENTS,
+    CONTENT_BOILERPLATE_MIN_WORDS,
+    CONTENT_FIELD_TOKEN_BUDGETS,
+)
+from content.normalization import normalize_documents, render_table_markdown
 
 # --- Default Base Strings (Built-in) ---
 DEFAULT_JOB_AD_TEMPLATE = """
@@ -146,9 +155,38 @@ def _read_docx_file(filepath):
         print(f"Error reading .docx file {filepath}: {e}")
         return ""
 
+def classify_docx_paragraph(p):
+    """
+    Classifies a .docx paragraph as "heading" (heading-styled, or short and entirely bold),
+    "list" (list-styled or numbered), "text", or "empty".
+    """
+    text = p.text.strip()
+    if not text:
+        return "empty"
+    style_name = p.style.name if p.style is not None else ""
+    text_runs = [run for run in p.runs if run.text.strip()]
+    if style_name.startswith(("Heading", "Title")) or \
+            (text_runs and all(run.bold for run in text_runs) and len(text) <= 120):
+        return "heading"
+    if style_name.startswith("List") or (p._p.pPr is not None and p._p.pPr.numPr is not None):
+        return "list"
+    return "text"
+
+def _format_docx_paragraph(p):
+    """
+    Returns a paragraph's text with light markdown so section structure survives extraction:
+    bold-only or heading-styled paragraphs become "**Heading**", list paragraphs become bullets.
+    """
+    kind = classify_docx_paragraph(p)
+    if kind == "heading":
+        return f"**{p.text.strip()}**"
+    if kind == "list":
+        return f"*   {p.text.strip()}"
+    return p.text
+
 # --- Iterating through body elements for strict order (More Advanced) ---
 # This is a more robust way to get content in document order if you need precise interleaving.
-def _read_docx_file_ordered(filepath):
+def _read_docx_file_ordered(filepath, compact_tables=True):
     if docx is None or _Document is None or CT_P is None or CT_Tbl is None:
         print(f"Skipping .docx file {filepath} as python-docx components for ordered reading are not available.")
         return ""
@@ -160,10 +198,15 @@ def _read_docx_file_ordered(filepath):
             if isinstance(block, CT_P): # Paragraph
                 # Reconstruct Paragraph object to use its .text property
                 p = Paragraph(block, document)
-                full_text_parts.append(p.text)
+                full_text_parts.append(_format_docx_paragraph(p))
             elif isinstance(block, CT_Tbl): # Table
                 # Reconstruct Table object
                 table = Table(block, document)
+                if compact_tables:
+                    # Markdown-style rows carry the same information in far fewer tokens
+                    rows = [[cell.text for cell in row.cells] for row in table.rows]
+                    full_text_parts.append("\n" + render_table_markdown(rows) + "\n")
+                    continue
                 full_text_parts.append(f"\n\n--- TABLE START ---\nTable (Rows: {len(table.rows)}, Columns: {len(table.columns)}):\n")
                 for i, row in enumerate(table.rows):
                     row_texts = []
@@ -183,6 +226,26 @@ def _read_docx_file_ordered(filepath):
 # Choose which docx reader to use: _read_docx_file (simpler) or _read_docx_file_ordered (more complex but better order)
 DOCX_READER_FUNCTION = _read_docx_file_ordered # Or _read_docx_file
 
+def _preset_key_for(filename):
+    """The filename (without extension) becomes the preset key."""
+    return os.path.splitext(filename)[0].replace("_", " ").replace("-", " ").title()
+
+def _read_content_file(filepath, allowed_extensions=(".txt", ".md", ".docx")):
+    """Reads one content file. Returns its text, or None if the file type is not supported."""
+    name_lower = filepath.lower()
+    if name_lower.endswith((".txt", ".md")): # Combined check for .txt and .md
+        if ".txt" in allowed_extensions or ".md" in allowed_extensions: # Ensure it's allowed
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    return f.read().strip()
+            except Exception as e:
+                print(f"Error loading text/md file {filepath}: {e}")
+                return ""
+    elif name_lower.endswith(".docx"):
+        if ".docx" in allowed_extensions:
+            return DOCX_READER_FUNCTION(filepath) # Use the chosen reader function
+    return None
+
 def _load_content_from_directory(directory_path, allowed_extensions=(".txt", ".md", ".docx")):
     """
     Scans a directory for files with allowed extensions and reads their content.
@@ -193,47 +256,158 @@ def _load_content_from_directory(directory_path, allowed_extensions=(".txt", ".m
         return loaded_content
 
     for filename in os.listdir(directory_path):
-        name_lower = filename.lower()
-        filepath = os.path.join(directory_path, filename)
-        content = ""
-
-        if name_lower.endswith((".txt", ".md")): # Combined check for .txt and .md
-            if ".txt" in allowed_extensions or ".md" in allowed_extensions: # Ensure it's allowed
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                except Exception as e:
-                    print(f"Error loading text/md file {filepath}: {e}")
-                    continue
-        elif name_lower.endswith(".docx"):
-            if ".docx" in allowed_extensions:
-                content = DOCX_READER_FUNCTION(filepath) # Use the chosen reader function
-        else:
-            continue
-
+        content = _read_content_file(os.path.join(directory_path, filename), allowed_extensions)
         if content:
-            key_name = os.path.splitext(filename)[0].replace("_", " ").replace("-", " ").title()
-            loaded_content[key_name] = content
+            loaded_content[_preset_key_for(filename)] = content
             
     return loaded_content
 
 # --- Initialize Dictionaries for Presets ---
-PREDEFINED_TEMPLATES = {
+BUILTIN_TEMPLATES = {
     "Default Modern Template": DEFAULT_JOB_AD_TEMPLATE,
 }
 
-PREDEFINED_DESCRIPTIONS = {
+BUILTIN_DESCRIPTIONS = {
     "Senior Software Engineer (Backend)": DEFAULT_JOB_DESCRIPTION,
 }
 
-# --- Load and Merge from Files ---
-# Load custom ad templates from files
-# --- Load and Merge from Files ---
-custom_ad_templates = _load_content_from_directory(AD_TEMPLATES_DIR)
-PREDEFINED_TEMPLATES.update(custom_ad_templates)
+# Directory, built-in presets and normalisation options for each kind of content.
+_CONTENT_KINDS = {
+    # Templates legitimately share text (perks, EEO statement), so only JDs have shared lines removed.
+    "templates": {"directory": AD_TEMPLATES_DIR, "builtins": BUILTIN_TEMPLATES,
+                  "remove_shared": False, "budget_field": "template"},
+    "descriptions": {"directory": JD_DESCRIPTIONS_DIR, "builtins": BUILTIN_DESCRIPTIONS,
+                     "remove_shared": True, "budget_field": "description"},
+}
 
-custom_jd_descriptions = _load_content_from_directory(JD_DESCRIPTIONS_DIR)
-PREDEFINED_DESCRIPTIONS.update(custom_jd_descriptions)
+# Raw extracted text per file, so a change only re-extracts the affected file:
+# kind -> {filepath: (file signature, preset key, raw text)}
+_raw_file_cache = {kind: {} for kind in _CONTENT_KINDS}
+_content_lock = threading.RLock()
+_content_listeners = []
+
+def _file_signature(filepath):
+    stat_result = os.stat(filepath)
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+def _scan_directory(kind):
+    """
+    Brings the raw cache for one kind of content in line with its directory.
+    Only added or changed files are re-extracted.
+
+    Returns:
+        dict: {"added": [...], "changed": [...], "removed": [...]} lists of file paths.
+    """
+    directory_path = _CONTENT_KINDS[kind]["directory"]
+    cache = _raw_file_cache[kind]
+    changes = {"added": [], "changed": [], "removed": []}
+    current_paths = set()
+    if os.path.isdir(directory_path):
+        for filename in sorted(os.listdir(directory_path)):
+            filepath = os.path.join(directory_path, filename)
+            try:
+                signature = _file_signature(filepath)
+            except OSError: # Removed between listdir and stat
+                continue
+            current_paths.add(filepath)
+            cached = cache.get(filepath)
+            if cached and cached[0] == signature:
+                continue
+            content = _read_content_file(filepath)
+            if content is None: # Unsupported file type
+                continue
+            changes["changed" if cached else "added"].append(filepath)
+            cache[filepath] = (signature, _preset_key_for(filename), content)
+    for filepath in [path for path in cache if path not in current_paths]:
+        del cache[filepath]
+        changes["removed"].append(filepath)
+    return changes
+
+def _build_presets(kind):
+    """Builds the preset mapping for one kind from the built-ins and the (normalised) raw cache."""
+    options = _CONTENT_KINDS[kind]
+    file_content = {key: raw for _, key, raw in _raw_file_cache[kind].values() if raw}
+    token_stats = {}
+    if CONTENT_NORMALIZATION_ENABLED:
+        file_content, token_stats = normalize_documents(
+            file_content, remove_shared=options["remove_shared"],
+            min_documents=CONTENT_BOILERPLATE_MIN_DOCUMENTS, min_words=CONTENT_BOILERPLATE_MIN_WORDS,
+            token_budget=CONTENT_FIELD_TOKEN_BUDGETS.get(options["budget_field"], 0)
+        )
+    presets = dict(options["builtins"])
+    presets.update((key, text) for key, text in file_content.items() if text)
+    return presets, token_stats
+
+def refresh_content(kinds=None):
+    """
+    Re-scans the content directories and, if anything was added, changed or removed,
+    rebuilds the preset mappings and swaps them in atomically. Sessions read presets
+    through get_predefined_templates()/get_predefined_descriptions(), so they see the
+    new mappings on their next rerun. Registered listeners are notified of the changes.
+
+    Args:
+        kinds: Iterable of "templates"/"descriptions" to refresh (defaults to both).
+
+    Returns:
+        dict: kind -> {"added": [...], "changed": [...], "removed": [...]} for kinds that changed.
+    """
+    global PREDEFINED_TEMPLATES, PREDEFINED_DESCRIPTIONS, PRESET_TOKEN_STATS
+    with _content_lock:
+        all_changes = {}
+        for kind in (kinds or _CONTENT_KINDS):
+            changes = _scan_directory(kind)
+            if any(changes.values()):
+                all_changes[kind] = changes
+        if not all_changes and PRESET_TOKEN_STATS is not None:
+            return {}
+
+        token_stats = dict(PRESET_TOKEN_STATS or {})
+        new_templates, new_descriptions = PREDEFINED_TEMPLATES, PREDEFINED_DESCRIPTIONS
+        if "templates" in all_changes or PRESET_TOKEN_STATS is None:
+            new_templates, token_stats["templates"] = _build_presets("templates")
+        if "descriptions" in all_changes or PRESET_TOKEN_STATS is None:
+            new_descriptions, token_stats["descriptions"] = _build_presets("descriptions")
+        # Rebinding the module attributes is atomic; readers holding the old dicts are unaffected.
+        PREDEFINED_TEMPLATES, PREDEFINED_DESCRIPTIONS, PRESET_TOKEN_STATS = new_templates, new_descriptions, token_stats
+
+    for kind, changes in all_changes.items():
+        print(f"DEBUG: Content reload ({kind}): {len(changes['added'])} added, "
+              f"{len(changes['changed'])} changed, {len(changes['removed'])} removed.")
+    for listener in list(_content_listeners):
+        try:
+            listener(all_changes)
+        except Exception as e:
+            print(f"ERROR: Content reload listener failed: {e}")
+    return all_changes
+
+def register_content_listener(callback):
+    """Registers callback(changes) to be called after presets are swapped (e.g. to update a search index)."""
+    if callback not in _content_listeners:
+        _content_listeners.append(callback)
+
+def get_predefined_templates():
+    """Returns the current template presets mapping (treat as read-only)."""
+    return PREDEFINED_TEMPLATES
+
+def get_template_source_paths():
+    """Returns {preset key: file path} for the template presets loaded from .docx files."""
+    with _content_lock:
+        return {key: filepath for filepath, (_, key, _) in _raw_file_cache["templates"].items()
+                if filepath.lower().endswith(".docx")}
+
+def get_predefined_descriptions():
+    """Returns the current description presets mapping (treat as read-only)."""
+    return PREDEFINED_DESCRIPTIONS
+
+# --- Load and Normalise Content from Files ---
+PREDEFINED_TEMPLATES = dict(BUILTIN_TEMPLATES)
+PREDEFINED_DESCRIPTIONS = dict(BUILTIN_DESCRIPTIONS)
+# Token estimates (before, after) per file-based preset, for reporting. None until first load.
+PRESET_TOKEN_STATS = None
+refresh_content()
+for _kind, _stats in PRESET_TOKEN_STATS.items():
+    print(f"DEBUG: Loaded {len(_stats)} {_kind} from files: "
+          f"~{sum(b for b, _ in _stats.values())} -> ~{sum(a for _, a in _stats.values())} tokens after normalisation.")
 
 # Optional Debugging
 # print("--- Loaded PREDEFINED_TEMPLATES (including files) ---")
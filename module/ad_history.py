@@ -0,0 +1,194 @@
+# job_ad_generator_project/module/ad_history.py
+
+"""
+Ad History Module
+
+Append-only store of every finished job ad, together with the inputs and settings
+that produced it (template, description, tone, word limit, profile, user, time).
+Entries are kept in a local SQLite file with an FTS5 full-text index over the ad,
+the description and the preset names, so a recruiter can find last month's ad for
+a role in milliseconds and reuse it instead of paying for a new model call.
+
+If the SQLite build lacks FTS5, search falls back to a (slower) LIKE scan.
+
+Like the session store, this module makes no Streamlit calls and is safe to use
+from background threads, scripts and the headless API.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from configs.app_settings import AD_HISTORY_PATH, AD_HISTORY_SEARCH_LIMIT
+
+_db_lock = threading.Lock()
+_db_connection = None
+_fts_available = False
+
+_ENTRY_COLUMNS = ("id", "created_at", "username", "source", "tone", "max_words", "profile",
+                  "template_preset", "description_preset", "template", "description", "ad_text")
+_SEARCH_TERM_PATTERN = re.compile(r"\w+")
+
+_history_stats = {"entries_recorded": 0, "duplicates_skipped": 0, "searches": 0,
+                  "search_seconds_total": 0.0, "reuses": 0}
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Returns the process-wide SQLite connection, creating the schema and index on first use."""
+    global _db_connection, _fts_available
+    if _db_connection is None:
+        os.makedirs(os.path.dirname(AD_HISTORY_PATH), exist_ok=True)
+        connection = sqlite3.connect(AD_HISTORY_PATH, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS ad_history ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, username TEXT,"
+            " source TEXT NOT NULL, tone TEXT, max_words INTEGER, profile TEXT,"
+            " template_preset TEXT, description_preset TEXT, template TEXT, description TEXT,"
+            " ad_text TEXT NOT NULL, ad_digest TEXT NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ad_history_digest ON ad_history (ad_digest)")
+        try:
+            # External-content index: the text is stored once, in ad_history
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS ad_history_fts USING fts5("
+                " ad_text, description, template_preset, description_preset,"
+                " content='ad_history', content_rowid='id', tokenize='porter unicode61')"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS ad_history_fts_insert AFTER INSERT ON ad_history BEGIN"
+                " INSERT INTO ad_history_fts (rowid, ad_text, description, template_preset, description_preset)"
+                " VALUES (new.id, new.ad_text, new.description, new.template_preset, new.description_preset);"
+                " END"
+            )
+            _fts_available = True
+        except sqlite3.OperationalError as e:
+            print(f"WARNING: SQLite FTS5 is unavailable ({e}); ad history search falls back to LIKE.")
+        connection.commit()
+        _db_connection = connection
+    return _db_connection
+
+
+def _row_to_entry(row) -> dict:
+    return dict(zip(_ENTRY_COLUMNS, row))
+
+
+def record_ad(ad_text: str, template: str, description: str, tone: str, max_words: int,
+              username: str | None = None, source: str = "generate", profile: str | None = None,
+              template_preset: str | None = None, description_preset: str | None = None) -> int | None:
+    """
+    Appends a finished ad to the history.
+
+    Args:
+        ad_text: The final (cleaned/validated) job ad.
+        template, description, tone, max_words: The inputs that produced it.
+        username: The user who generated it.
+        source: Where it came from: "generate", "section", "chat", "api" or "api_chat".
+        profile: The generation profile used, if any.
+        template_preset, description_preset: Preset names ("Custom" for edited text).
+
+    Returns:
+        The new entry id, or None if the ad was skipped (empty, or identical to an
+        existing entry) or could not be stored.
+    """
+    if not ad_text or not ad_text.strip():
+        return None
+    ad_digest = hashlib.blake2b(ad_text.strip().encode("utf-8"), digest_size=16).hexdigest()
+    try:
+        with _db_lock:
+            connection = _get_connection()
+            if connection.execute("SELECT 1 FROM ad_history WHERE ad_digest = ? LIMIT 1", (ad_digest,)).fetchone():
+                _history_stats["duplicates_skipped"] += 1
+                return None
+            cursor = connection.execute(
+                "INSERT INTO ad_history (created_at, username, source, tone, max_words, profile, template_preset,"
+                " description_preset, template, description, ad_text, ad_digest)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), username, source, tone, max_words, profile, template_preset,
+                 description_preset, template, description, ad_text, ad_digest)
+            )
+            connection.commit()
+        _history_stats["entries_recorded"] += 1
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        print(f"ERROR: Failed to record ad in history: {e}")
+        return None
+
+
+def _build_fts_query(query: str) -> str:
+    """Turns free text into a safe FTS5 query: every word must match, as a prefix."""
+    return " ".join(f'"{term}"*' for term in _SEARCH_TERM_PATTERN.findall(query))
+
+
+def search_history(query: str = "", username: str | None = None, limit: int = AD_HISTORY_SEARCH_LIMIT) -> list[dict]:
+    """
+    Searches the history. An empty query returns the most recent entries.
+
+    Args:
+        query: Free text matched against the ad, the description and the preset names.
+        username: Restrict results to this user's ads (None for everyone's).
+        limit: Maximum number of entries to return.
+
+    Returns:
+        Entry dicts (see _ENTRY_COLUMNS), best match first (newest first for an empty query).
+    """
+    started = time.perf_counter()
+    columns = ", ".join(f"h.{column}" for column in _ENTRY_COLUMNS)
+    user_filter = " AND h.username = ?" if username else ""
+    user_params = (username,) if username else ()
+    fts_query = _build_fts_query(query or "")
+    try:
+        with _db_lock:
+            connection = _get_connection()
+            if not fts_query:
+                rows = connection.execute(
+                    f"SELECT {columns} FROM ad_history h WHERE 1 = 1{user_filter} ORDER BY h.id DESC LIMIT ?",
+                    (*user_params, limit)
+                ).fetchall()
+            elif _fts_available:
+                rows = connection.execute(
+                    f"SELECT {columns} FROM ad_history_fts JOIN ad_history h ON h.id = ad_history_fts.rowid"
+                    f" WHERE ad_history_fts MATCH ?{user_filter} ORDER BY bm25(ad_history_fts), h.id DESC LIMIT ?",
+                    (fts_query, *user_params, limit)
+                ).fetchall()
+            else:
+                terms = _SEARCH_TERM_PATTERN.findall(query)
+                term_filter = "".join(" AND (h.ad_text LIKE ? OR h.description LIKE ?)" for _ in terms)
+                term_params = [pattern for term in terms for pattern in (f"%{term}%", f"%{term}%")]
+                rows = connection.execute(
+                    f"SELECT {columns} FROM ad_history h WHERE 1 = 1{term_filter}{user_filter} ORDER BY h.id DESC LIMIT ?",
+                    (*term_params, *user_params, limit)
+                ).fetchall()
+    except sqlite3.Error as e:
+        print(f"ERROR: Ad history search failed: {e}")
+        return []
+    _history_stats["searches"] += 1
+    _history_stats["search_seconds_total"] += time.perf_counter() - started
+    return [_row_to_entry(row) for row in rows]
+
+
+def get_entry(entry_id: int) -> dict | None:
+    """Returns one history entry by id, or None."""
+    columns = ", ".join(_ENTRY_COLUMNS)
+    with _db_lock:
+        row = _get_connection().execute(f"SELECT {columns} FROM ad_history WHERE id = ?", (entry_id,)).fetchone()
+    return _row_to_entry(row) if row else None
+
+
+def record_reuse():
+    _history_stats["reuses"] += 1
+
+
+def get_history_stats() -> dict:
+    """Counters for monitoring (entries, searches, mean search latency, reuses instead of model calls)."""
+    stats = dict(_history_stats)
+    searches = stats.pop("search_seconds_total")
+    stats["mean_search_ms"] = round(1000 * searches / stats["searches"], 2) if stats["searches"] else 0.0
+    with _db_lock:
+        stats["total_entries"] = _get_connection().execute("SELECT COUNT(*) FROM ad_history").fetchone()[0]
+    stats["full_text_index"] = _fts_available
+    return stats
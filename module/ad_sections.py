@@ -0,0 +1,117 @@
+# job_ad_generator_project/module/ad_sections.py
+
+"""
+Ad Sections Module
+
+Splits job ad templates (and generated ads) into an ordered list of sections so
+that sections can be generated concurrently, stitched back together in template
+order, and regenerated individually.
+
+A section starts at a heading line: a line that is entirely bold
+(e.g. "**About Us:**" or "**Why Join Us? (Benefits & Perks):**") or a markdown
+"#" heading. Inline label lines such as "**Job Title:** [Insert Job Title Here]"
+are not headings; they stay in the body of the section they appear in. Any text
+before the first heading forms a header section with an empty heading.
+
+Each section is a dict: {"title": str, "heading": str, "body": str}.
+"""
+
+import re
+
+HEADER_SECTION_TITLE = "Header"
+_MIN_SECTION_WORDS = 15
+
+# Entire line is bold text, optionally followed by a colon outside the asterisks.
+_BOLD_HEADING_PATTERN = re.compile(r"^\s*\*\*(?P<title>[^*\n]+?)\*\*\s*:?\s*$")
+_MARKDOWN_HEADING_PATTERN = re.compile(r"^\s{0,3}#{1,6}\s+(?P<title>.+?)\s*#*\s*$")
+_TITLE_NORMALIZE_PATTERN = re.compile(r"[^a-z0-9]+")
+
+
+def _match_heading(line: str) -> str | None:
+    """Returns the section title if the line is a heading, otherwise None."""
+    match = _BOLD_HEADING_PATTERN.match(line) or _MARKDOWN_HEADING_PATTERN.match(line)
+    if not match:
+        return None
+    title = match.group("title").strip().rstrip(":").strip()
+    return title or None
+
+
+def normalize_title(title: str) -> str:
+    """Normalises a section title for matching (case, punctuation and spacing insensitive)."""
+    return _TITLE_NORMALIZE_PATTERN.sub(" ", title.lower()).strip()
+
+
+def parse_sections(text: str) -> list[dict]:
+    """
+    Parses a template or ad into its ordered sections.
+
+    Args:
+        text: The template or job ad text.
+
+    Returns:
+        A list of section dicts in document order. Empty if the text is empty.
+    """
+    sections = []
+    current = {"title": HEADER_SECTION_TITLE, "heading": "", "body_lines": []}
+    for line in (text or "").strip().splitlines():
+        title = _match_heading(line)
+        if title is None:
+            current["body_lines"].append(line)
+            continue
+        sections.append(current)
+        current = {"title": title, "heading": line.strip(), "body_lines": []}
+    sections.append(current)
+
+    parsed = []
+    for section in sections:
+        body = "\n".join(section["body_lines"]).strip()
+        if section["heading"] or body: # Drop an empty header section
+            parsed.append({"title": section["title"], "heading": section["heading"], "body": body})
+    return parsed
+
+
+def render_section(section: dict) -> str:
+    """Renders a single section back to text (heading followed by body)."""
+    if section["heading"] and section["body"]:
+        return f"{section['heading']}\n{section['body']}"
+    return section["heading"] or section["body"]
+
+
+def stitch_sections(sections: list[dict]) -> str:
+    """Joins sections back into a single ad, in the given order."""
+    return "\n\n".join(render_section(section) for section in sections if render_section(section)).strip()
+
+
+def find_section(sections: list[dict], title: str) -> int:
+    """Returns the index of the section whose title matches, or -1."""
+    wanted = normalize_title(title)
+    for index, section in enumerate(sections):
+        if normalize_title(section["title"]) == wanted:
+            return index
+    return -1
+
+
+def split_word_budget(sections: list[dict], max_words: int) -> list[int]:
+    """
+    Splits an overall word limit across sections in proportion to the size of each
+    template section. Every section gets at least 15 words (less when the limit is too
+    small for that), and the budgets never add up to more than max_words: words given
+    to small sections by the minimum are taken from the largest ones.
+
+    Returns:
+        A list of per-section word budgets, all 0 when max_words is 0 (no limit).
+    """
+    if max_words <= 0 or not sections:
+        return [0] * len(sections)
+    minimum_budget = max(1, min(_MIN_SECTION_WORDS, max_words // len(sections)))
+    weights = [max(len(render_section(section).split()), 1) for section in sections]
+    total_weight = sum(weights)
+    budgets = [max(minimum_budget, round(max_words * weight / total_weight)) for weight in weights]
+    excess_words = sum(budgets) - max_words
+    while excess_words > 0:
+        largest = max(range(len(budgets)), key=budgets.__getitem__)
+        if budgets[largest] <= minimum_budget:
+            break # Only when max_words is smaller than one word per section
+        budgets[largest] -= 1
+        excess_words -= 1
+    return budgets
@@ -0,0 +1,132 @@
+# job_ad_generator_project/module/ad_validation.py
+
+"""
+Ad Validation Module
+
+Fast, local checks run on every generated or refined ad before it is shown:
+- Conversational preambles and sign-offs around the ad (stripped locally).
+- Unfilled placeholders such as "[Insert Job Title Here]" or "[Your Company Name]".
+- Ignored word limits (max_words_config).
+- Template sections missing from the ad.
+
+Everything here is plain regex and string work, with no model calls. Issues that
+need the model are fixed by one narrowly scoped repair request
+(see vertex_service.validate_and_repair).
+
+Each issue is a dict: {"type": "placeholder" | "length" | "missing_section", "detail": str}.
+"""
+
+import re
+
+from configs.app_settings import VALIDATION_WORD_LIMIT_TOLERANCE, VALIDATION_ALLOWED_BRACKETED_TEXT
+from . import ad_sections
+
+# Conversational lead-ins the model sometimes adds despite the instructions, e.g.
+# "Okay, here's the revised job ad incorporating your changes:" or "Sure, here is the updated version:".
+_PREAMBLE_PATTERN = re.compile(
+    r"\A\s*(?:(?:okay|ok|sure|alright|certainly|of course|absolutely|great)\b[^\n]{0,80}?[,.!]?\s*)?"
+    r"(?:here(?:'s|’s| is| it is)|i(?:'ve|’ve| have) (?:updated|revised|made)|below is)[^\n]{0,120}?:[ \t]*\n+",
+    re.IGNORECASE
+)
+# Closing offers such as "Let me know if you'd like any further changes!"
+_SIGNOFF_PATTERN = re.compile(
+    r"\n+[ \t]*(?:let me know|i hope this|feel free to|would you like|is there anything)[^\n]*\s*\Z",
+    re.IGNORECASE
+)
+# Bracketed template placeholders that are not markdown links, plus bare JOBTITLE-style tokens.
+# Bracketed text that is legitimate copy is listed in VALIDATION_ALLOWED_BRACKETED_TEXT.
+_PLACEHOLDER_PATTERN = re.compile(r"\[(?!\s*\])[^\[\]\n]{2,160}\](?!\()|\bJOBTITLE\b")
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9][\w'’-]*")
+_ALLOWED_BRACKETED_TEXT = frozenset(text.lower() for text in VALIDATION_ALLOWED_BRACKETED_TEXT)
+
+_validation_stats = {"ads_validated": 0, "ads_passed": 0, "preambles_stripped": 0,
+                     "repairs_issued": 0, "repairs_resolved": 0}
+
+
+def clean_ai_response(raw_response_text: str) -> str:
+    """Strips conversational preambles and sign-offs from the AI's response, leaving the ad."""
+    cleaned_text = raw_response_text.strip()
+    without_preamble = _PREAMBLE_PATTERN.sub("", cleaned_text, count=1)
+    without_signoff = _SIGNOFF_PATTERN.sub("", without_preamble, count=1)
+    if without_signoff.strip() and without_signoff != cleaned_text:
+        _validation_stats["preambles_stripped"] += 1
+        return without_signoff.strip()
+    return cleaned_text
+
+
+def count_words(text: str) -> int:
+    """Counts words, ignoring markdown markers and bullet symbols."""
+    return len(_WORD_PATTERN.findall(text or ""))
+
+
+def find_placeholders(ad_text: str) -> list[str]:
+    """Returns the unfilled placeholders in an ad, in order of first appearance."""
+    found = []
+    for match in _PLACEHOLDER_PATTERN.finditer(ad_text or ""):
+        placeholder = match.group(0)
+        if placeholder.lower() not in _ALLOWED_BRACKETED_TEXT and placeholder not in found:
+            found.append(placeholder)
+    return found
+
+
+def find_missing_sections(ad_text: str, template: str) -> list[str]:
+    """Returns titles of template sections (other than the header) that the ad does not contain."""
+    template_sections = ad_sections.parse_sections(template)
+    if len(template_sections) < 2:
+        return []
+    ad_titles = {ad_sections.normalize_title(section["title"]) for section in ad_sections.parse_sections(ad_text)}
+    return [section["title"] for section in template_sections
+            if section["heading"] and ad_sections.normalize_title(section["title"]) not in ad_titles]
+
+
+def validate_ad(ad_text: str, template: str, max_words: int, check_sections: bool = True) -> list[dict]:
+    """
+    Validates an ad against its template and word limit.
+
+    Args:
+        ad_text: The (already cleaned) job ad text.
+        template: The template the ad was generated from.
+        max_words: Approximate maximum word count (0 for no limit).
+        check_sections: Whether to check section coverage. Off for chat refinements,
+                        where the user may have asked for a section to be removed.
+
+    Returns:
+        A list of issue dicts; empty when the ad passes.
+    """
+    issues = []
+    placeholders = find_placeholders(ad_text)
+    if placeholders:
+        issues.append({"type": "placeholder", "detail": ", ".join(placeholders)})
+    if max_words > 0:
+        word_count = count_words(ad_text)
+        if word_count > max_words * (1 + VALIDATION_WORD_LIMIT_TOLERANCE):
+            issues.append({"type": "length", "detail": f"{word_count} words; the limit is about {max_words}"})
+    if check_sections and template:
+        for title in find_missing_sections(ad_text, template):
+            issues.append({"type": "missing_section", "detail": title})
+
+    _validation_stats["ads_validated"] += 1
+    if not issues:
+        _validation_stats["ads_passed"] += 1
+    return issues
+
+
+def describe_issues(issues: list[dict]) -> str:
+    """Human-readable, one-line-per-issue summary (used in repair prompts and UI warnings)."""
+    descriptions = {
+        "placeholder": "Unfilled placeholders remain: {detail}",
+        "length": "The ad is too long ({detail})",
+        "missing_section": "The '{detail}' section from the template is missing",
+    }
+    return "\n".join("- " + descriptions[issue["type"]].format(detail=issue["detail"]) for issue in issues)
+
+
+def record_repair(resolved: bool):
+    _validation_stats["repairs_issued"] += 1
+    if resolved:
+        _validation_stats["repairs_resolved"] += 1
+
+
+def get_validation_stats() -> dict:
+    """Counters for monitoring how often ads need a repair call."""
+    return dict(_validation_stats)
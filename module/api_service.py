@@ -0,0 +1,408 @@
+# job_ad_generator_project/module/api_service.py
+
+"""
+Headless HTTP API Module
+
+Exposes ad generation and chat refinement over HTTP for ATS and intranet tools,
+alongside the Streamlit UI. Built on Tornado (already installed with Streamlit),
+so every request is served from a single asyncio event loop: model replies are
+streamed with the async Vertex AI calls and forwarded as server-sent events,
+without a thread per request.
+
+Endpoints (all except /v1/health require HTTP Basic auth with a UI account):
+- GET  /v1/health
+- POST /v1/ads/generate              -> SSE stream of the generated ad
+- POST /v1/chats                     -> {"chat_id": ...} primed with the given ad
+- POST /v1/chats/{chat_id}/messages  -> SSE stream of the refined ad (validated and, if needed,
+                                        repaired like a generated one; recorded in the ad history)
+- GET  /v1/history?q=...&mine=1      -> {"entries": [...]} past ads from the ad history
+- GET  /v1/history/export?q=...&mine=1&template=... -> streamed zip of the matching ads as .docx files
+
+SSE events: "chunk" ({"text": ...}) for each piece of text, then "done"
+({"text": full text, "ad_text": cleaned/validated ad, ...}) or "error" ({"error": message}).
+A "warning" event ({"warning": message}) before "done" reports a reply that reached its
+output token limit; the text is still returned.
+
+Model streams are closed as soon as the client disconnects, and a new message to
+a chat supersedes (closes) a reply to that chat that is still streaming.
+"""
+
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+
+import bcrypt
+import tornado.iostream
+import tornado.web
+
+from configs.app_settings import API_MAX_BODY_BYTES, GENERATION_PROFILES, DOCX_EXPORT_MAX_ADS
+from content.predefined_data import get_predefined_templates, get_predefined_descriptions, get_template_source_paths
+from . import ad_history, cancellation, docx_export, session_store, vertex_service
+
+# Successful password checks are cached so bcrypt (deliberately slow) runs once per
+# credential rather than once per request.
+_AUTH_CACHE_SECONDS = 300
+_AUTH_CACHE_MAX_ENTRIES = 1000 # Oldest credentials are forgotten first; expired ones on every insert
+
+
+class _ApiRequestHandler(tornado.web.RequestHandler):
+    """Base handler: Basic auth against the UI credentials, JSON bodies and JSON errors."""
+
+    requires_auth = True
+
+    def initialize(self, model, credentials, auth_cache):
+        self.model = model
+        self.credentials = credentials
+        self.auth_cache = auth_cache
+        self.username = None
+
+    async def prepare(self):
+        if self.request.body and len(self.request.body) > API_MAX_BODY_BYTES:
+            raise tornado.web.HTTPError(413, reason="Request body too large")
+        if self.requires_auth:
+            self.username = await self._authenticate()
+            if not self.username:
+                self.set_header("WWW-Authenticate", 'Basic realm="job-ad-generator"')
+                raise tornado.web.HTTPError(401, reason="Authentication required")
+
+    async def _authenticate(self) -> str | None:
+        header = self.request.headers.get("Authorization", "")
+        if not header.startswith("Basic "):
+            return None
+        try:
+            username, password = base64.b64decode(header[6:]).decode("utf-8").split(":", 1)
+        except Exception:
+            return None
+        user = self.credentials.get("usernames", {}).get(username)
+        if not user or not user.get("password"):
+            return None
+
+        cache_key = hashlib.sha256(f"{username}:{password}".encode("utf-8")).hexdigest()
+        if self.auth_cache.get(cache_key, 0) > time.monotonic():
+            return username
+        self.auth_cache.pop(cache_key, None)
+        # bcrypt is CPU-bound; keep it off the event loop
+        is_valid = await asyncio.get_running_loop().run_in_executor(
+            None, bcrypt.checkpw, password.encode("utf-8"), user["password"].encode("utf-8")
+        )
+        if not is_valid:
+            return None
+        self._remember_credentials(cache_key)
+        return username
+
+    def _remember_credentials(self, cache_key: str):
+        """Caches a verified credential, keeping the cache free of expired entries and within its size bound."""
+        now = time.monotonic()
+        for expired_key in [key for key, expires_at in self.auth_cache.items() if expires_at <= now]:
+            del self.auth_cache[expired_key]
+        self.auth_cache[cache_key] = now + _AUTH_CACHE_SECONDS
+        while len(self.auth_cache) > _AUTH_CACHE_MAX_ENTRIES:
+            self.auth_cache.popitem(last=False)
+
+    def json_body(self) -> dict:
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="Request body must be JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Request body must be a JSON object")
+        return body
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"error": self._reason}))
+
+
+class _EventStreamHandler(_ApiRequestHandler):
+    """Adds server-sent-event output and client-disconnect detection."""
+
+    def initialize(self, **kwargs):
+        super().initialize(**kwargs)
+        self.client_disconnected = False
+        self.cancel_token = cancellation.CancellationToken(liveness_check=lambda: not self.client_disconnected)
+
+    def on_connection_close(self):
+        self.client_disconnected = True
+        self.cancel_token.cancel("disconnected")
+
+    def start_event_stream(self):
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no") # Disable proxy buffering
+
+    async def send_event(self, event: str, data: dict):
+        if self.client_disconnected:
+            return
+        self.write(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+        try:
+            await self.flush()
+        except tornado.iostream.StreamClosedError:
+            self.client_disconnected = True
+
+    async def relay_stream(self, text_stream, stream_kind: str) -> str | None:
+        """
+        Forwards an async stream of text chunks as "chunk" events and returns the full text,
+        or None if the client went away, the request was superseded, or the stream failed
+        (an "error" event is sent).
+        """
+        self.start_event_stream()
+        full_text = ""
+        try:
+            async for chunk_text in text_stream:
+                if self.cancel_token.cancelled:
+                    await text_stream.aclose() # Closes the upstream model stream
+                    cancellation.record_aborted_stream(stream_kind, self.cancel_token.reason, full_text)
+                    if self.cancel_token.reason == "superseded":
+                        await self.send_event("error", {"error": "Superseded by a newer message to this chat."})
+                    return None
+                full_text += chunk_text
+                await self.send_event("chunk", {"text": chunk_text})
+        except vertex_service.OutputTruncated as e:
+            print(f"WARNING: API model stream truncated: {e}")
+            await self.send_event("warning", {"warning": str(e)})
+        except Exception as e:
+            print(f"ERROR: API model stream failed: {e}")
+            await self.send_event("error", {"error": str(e)})
+            return None
+        if not full_text.strip():
+            await self.send_event("error", {"error": "The model returned an empty response."})
+            return None
+        return full_text
+
+
+class HealthHandler(_ApiRequestHandler):
+    requires_auth = False
+
+    def get(self):
+        self.write({"status": "ok", "model_available": self.model is not None})
+
+
+class GenerateAdHandler(_EventStreamHandler):
+    """
+    Body: {"template" | "template_preset", "description" | "description_preset",
+           "tone" (optional), "max_words" (optional, 0 = no limit),
+           "profile" (optional, a GENERATION_PROFILES name)}
+    """
+
+    async def post(self):
+        body = self.json_body()
+        template = body.get("template") or get_predefined_templates().get(body.get("template_preset", ""))
+        description = body.get("description") or get_predefined_descriptions().get(body.get("description_preset", ""))
+        if not template or not description:
+            raise tornado.web.HTTPError(400, reason="Provide a template (or known template_preset) "
+                                                    "and a description (or known description_preset)")
+        tone = body.get("tone") or "Professional & Engaging"
+        try:
+            max_words = int(body.get("max_words") or 0)
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, reason="max_words must be an integer")
+        profile_name = body.get("profile")
+        if profile_name is not None and profile_name not in GENERATION_PROFILES:
+            raise tornado.web.HTTPError(400, reason=f"Unknown profile; use one of {', '.join(GENERATION_PROFILES)}")
+
+        full_text = await self.relay_stream(vertex_service.stream_initial_ad_async(
+            self.model, template, description, tone, max_words, profile_name
+        ), "api_initial_ad")
+        if full_text is not None:
+            # The repair call (if any) is blocking, so it runs in the default executor
+            ad_text, issues = await asyncio.get_running_loop().run_in_executor(
+                None, vertex_service.validate_and_repair, self.model, full_text, template, description, tone, max_words
+            )
+            ad_history.record_ad(ad_text, template, description, tone, max_words, username=self.username,
+                                 source="api", profile=profile_name,
+                                 template_preset=body.get("template_preset"),
+                                 description_preset=body.get("description_preset"))
+            await self.send_event("done", {"text": full_text, "ad_text": ad_text, "validation_issues": issues})
+        self.finish()
+
+
+def _chat_store_key(username: str, chat_id: str) -> str:
+    # Scoped by username, so one API user can never reach another user's chat
+    return f"api:{username}:{chat_id}"
+
+
+class CreateChatHandler(_ApiRequestHandler):
+    """
+    Body: {"ad_text": the current job ad, plus optionally the inputs that produced it:
+           "template" | "template_preset", "description" | "description_preset", "tone", "max_words"}.
+    Returns {"chat_id": ...}. The inputs are kept with the chat for validating refined ads.
+    """
+
+    async def post(self):
+        body = self.json_body()
+        ad_text = body.get("ad_text", "")
+        if not ad_text.strip():
+            raise tornado.web.HTTPError(400, reason="ad_text is required")
+        try:
+            max_words = int(body.get("max_words") or 0)
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, reason="max_words must be an integer")
+        chat_context = {
+            "template": body.get("template") or get_predefined_templates().get(body.get("template_preset", ""), ""),
+            "description": body.get("description") or
+                           get_predefined_descriptions().get(body.get("description_preset", ""), ""),
+            "tone": body.get("tone") or "Professional & Engaging",
+            "max_words": max_words,
+        }
+        chat_id = uuid.uuid4().hex
+        store_key = _chat_store_key(self.username, chat_id)
+        history = [["model", vertex_service.build_chat_priming_message(ad_text)]]
+        # SQLite writes are blocking, so they run in the default executor
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, session_store.save_chat_history, store_key, history)
+        await loop.run_in_executor(None, session_store.save_session_state, store_key, chat_context)
+        self.set_status(201)
+        self.write({"chat_id": chat_id})
+
+
+class ChatMessageHandler(_EventStreamHandler):
+    """
+    Body: {"message": refinement request}. Streams the reply as SSE; the "done" event carries
+    the validated (and, if needed, repaired) ad and its remaining "validation_issues".
+    """
+
+    # Serialises messages per chat so concurrent requests cannot interleave a chat's history.
+    # store key -> {"lock", "users"}; an entry is removed once no request holds or awaits its lock.
+    chat_locks = {}
+
+    async def post(self, chat_id):
+        message = self.json_body().get("message", "")
+        if not message.strip():
+            raise tornado.web.HTTPError(400, reason="message is required")
+        store_key = _chat_store_key(self.username, chat_id)
+
+        # A newer message to the same chat closes the reply to the previous one that is still streaming
+        cancellation.supersede(store_key, self.cancel_token)
+        chat_lock = self.chat_locks.setdefault(store_key, {"lock": asyncio.Lock(), "users": 0})
+        chat_lock["users"] += 1
+        # SQLite reads/writes and the repair call (if any) are blocking, so they run in the default executor
+        loop = asyncio.get_running_loop()
+        try:
+            async with chat_lock["lock"]:
+                if self.cancel_token.cancelled: # Superseded or disconnected while waiting for the lock
+                    raise tornado.web.HTTPError(409, reason="Superseded by a newer message to this chat")
+                chat_session = session_store.get_cached_chat_session(store_key)
+                if chat_session is None:
+                    history = await loop.run_in_executor(None, session_store.load_chat_history, store_key)
+                    if not history:
+                        raise tornado.web.HTTPError(404, reason="Unknown chat_id")
+                    chat_session = vertex_service.rebuild_chat_session(self.model, history)
+                    if chat_session is None:
+                        raise tornado.web.HTTPError(500, reason="Could not restore chat session")
+                chat_context = await loop.run_in_executor(None, session_store.load_session_state, store_key) or {}
+
+                full_text = await self.relay_stream(
+                    vertex_service.stream_chat_message_async(chat_session, message), "api_chat"
+                )
+                if full_text is not None:
+                    # Sections are not checked: the refinement may have asked to remove one
+                    ad_text, issues = await loop.run_in_executor(
+                        None, vertex_service.validate_and_repair, self.model, full_text,
+                        chat_context.get("template", ""), chat_context.get("description", ""),
+                        chat_context.get("tone", "Professional & Engaging"), chat_context.get("max_words", 0), False
+                    )
+                    if ad_text != full_text:
+                        # Keep the cleaned/repaired ad in the history, so the next refinement builds on it
+                        vertex_service.replace_last_model_turn(chat_session, ad_text)
+                # An abandoned reply is not added to the history by the SDK, so this stays consistent
+                history = vertex_service.serialize_chat_history(chat_session)
+                await loop.run_in_executor(None, session_store.save_chat_history, store_key, history)
+                session_store.cache_chat_session(store_key, chat_session, session_store.estimate_history_bytes(history))
+        finally:
+            chat_lock["users"] -= 1
+            if not chat_lock["users"] and self.chat_locks.get(store_key) is chat_lock:
+                del self.chat_locks[store_key]
+            cancellation.end_request(store_key, self.cancel_token)
+        if full_text is not None:
+            await loop.run_in_executor(
+                None, functools.partial(
+                    ad_history.record_ad, ad_text, chat_context.get("template", ""),
+                    chat_context.get("description", ""), chat_context.get("tone", "Professional & Engaging"),
+                    chat_context.get("max_words", 0),
+                    username=self.username, source="api_chat"
+                )
+            )
+            await self.send_event("done", {"text": full_text, "ad_text": ad_text, "validation_issues": issues})
+        self.finish()
+
+
+class HistoryHandler(_ApiRequestHandler):
+    """Query: q (free text, optional), mine=1 to restrict to the caller's ads, limit (optional)."""
+
+    def get(self):
+        try:
+            limit = min(int(self.get_query_argument("limit", "20")), 100)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="limit must be an integer")
+        username = self.username if self.get_query_argument("mine", "") == "1" else None
+        entries = ad_history.search_history(self.get_query_argument("q", ""), username=username, limit=limit)
+        self.write({"entries": entries})
+
+
+class HistoryExportHandler(_ApiRequestHandler):
+    """
+    Query: q, mine=1 and limit (up to DOCX_EXPORT_MAX_ADS) as for /v1/history, and template
+    (optional template preset; by default each ad uses its own template, or the fallback).
+    The zip is streamed as it is built, about one document per chunk.
+    """
+
+    def on_connection_close(self):
+        self.client_disconnected = True
+
+    async def get(self):
+        self.client_disconnected = False
+        if not docx_export.is_available():
+            raise tornado.web.HTTPError(503, reason="Word export is not available (python-docx is not installed)")
+        try:
+            limit = min(int(self.get_query_argument("limit", "200")), DOCX_EXPORT_MAX_ADS)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="limit must be an integer")
+        template_preset = self.get_query_argument("template", "")
+        template_path = get_template_source_paths().get(template_preset) if template_preset else None
+        if template_preset and not template_path:
+            raise tornado.web.HTTPError(400, reason=f"Unknown Word template; use one of "
+                                                    f"{', '.join(get_template_source_paths())}")
+        username = self.username if self.get_query_argument("mine", "") == "1" else None
+        entries = ad_history.search_history(self.get_query_argument("q", ""), username=username, limit=limit)
+
+        self.set_header("Content-Type", "application/zip")
+        self.set_header("Content-Disposition", 'attachment; filename="job_ads.zip"')
+        self.set_header("X-Accel-Buffering", "no") # Disable proxy buffering
+        chunks = docx_export.iter_bulk_export(entries, template_path)
+        loop = asyncio.get_running_loop()
+        try:
+            # Rendering is CPU-bound; each chunk is produced off the event loop
+            while (chunk := await loop.run_in_executor(None, next, chunks, None)) is not None:
+                if self.client_disconnected:
+                    return
+                self.write(chunk)
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            return
+        finally:
+            chunks.close()
+        self.finish()
+
+
+def make_app(model, credentials: dict) -> tornado.web.Application:
+    """
+    Builds the Tornado application.
+
+    Args:
+        model: The initialized GenerativeModel instance shared by all requests.
+        credentials: The "credentials" section of the UI credentials file.
+    """
+    handler_kwargs = {"model": model, "credentials": credentials, "auth_cache": OrderedDict()}
+    return tornado.web.Application([
+        (r"/v1/health", HealthHandler, handler_kwargs),
+        (r"/v1/ads/generate", GenerateAdHandler, handler_kwargs),
+        (r"/v1/chats", CreateChatHandler, handler_kwargs),
+        (r"/v1/chats/([0-9a-f]{32})/messages", ChatMessageHandler, handler_kwargs),
+        (r"/v1/history", HistoryHandler, handler_kwargs),
+        (r"/v1/history/export", HistoryExportHandler, handler_kwargs),
+    ])
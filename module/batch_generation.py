@@ -0,0 +1,347 @@
+# job_ad_generator_project/module/batch_generation.py
+
+"""
+Batch Generation Module
+
+Offline path for large requisition drops (e.g. a quarterly hiring plan with
+hundreds of roles). Batch prediction trades latency for much higher throughput
+and a lower unit cost than one online generate_content call per ad.
+
+Pipeline:
+1. export_batch(): requisitions (CSV or JSONL, read row by row) are rendered into
+   batch-prediction JSONL chunk files of at most BATCH_CHUNK_MAX_REQUESTS lines,
+   using exactly the prompt and GenerationConfig that generate_initial_ad builds.
+   A manifest maps each request key to its inputs.
+2. A batch backend submits the chunk files and reports the job status:
+   - LocalFileBatchBackend: file-based stand-in that answers each request with a
+     given model (the real one or benchmarks.fake_model), for tests and dry runs.
+   - VertexBatchBackend: Vertex AI batch prediction via Cloud Storage.
+3. import_batch_results(): prediction lines are streamed back, joined to their
+   inputs through the manifest, cleaned and validated locally (no repair calls),
+   and written to the ad history, the generation cache and a results file.
+
+Request line format (Vertex AI Gemini batch prediction):
+    {"key": "...", "request": {"contents": [...], "generationConfig": {...}, "safetySettings": [...]}}
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from configs.app_settings import (
+    BATCH_BACKEND,
+    BATCH_WORK_DIR,
+    BATCH_CHUNK_MAX_REQUESTS,
+    BATCH_GCS_URI_PREFIX,
+    MODEL_NAME,
+    SAFETY_SETTINGS,
+    CALL_SITE_PROFILES,
+)
+from content.predefined_data import get_predefined_templates, get_predefined_descriptions
+from . import ad_history, ad_validation, generation_cache, vertex_service
+
+_MANIFEST_FILE_NAME = "manifest.jsonl"
+_RESULTS_FILE_NAME = "results.jsonl"
+_JOB_FILE_NAME = "job.json"
+
+
+def _prompt_digest(request: dict) -> str:
+    """Joins predictions to inputs when the service does not echo the "key" field."""
+    prompt = request["contents"][0]["parts"][0]["text"]
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _read_requisitions(requisitions_path: str):
+    """Yields requisition dicts from a CSV or JSONL file, one row at a time."""
+    with open(requisitions_path, newline="", encoding="utf-8") as f:
+        if requisitions_path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _resolve_requisition(row: dict, row_number: int) -> dict:
+    """Resolves presets and defaults for one requisition. Raises ValueError if inputs are missing."""
+    template = row.get("template") or get_predefined_templates().get(row.get("template_preset") or "")
+    description = row.get("description") or get_predefined_descriptions().get(row.get("description_preset") or "")
+    if not template or not description:
+        raise ValueError(f"row {row_number}: needs a template (or known template_preset) "
+                         f"and a description (or known description_preset)")
+    return {
+        "requisition_id": str(row.get("id") or row_number),
+        "template": template,
+        "description": description,
+        "tone": row.get("tone") or "Professional & Engaging",
+        "max_words": int(row.get("max_words") or 0),
+        "profile": row.get("profile") or CALL_SITE_PROFILES["initial_ad"],
+        "template_preset": row.get("template_preset") or "Custom",
+        "description_preset": row.get("description_preset") or "Custom",
+    }
+
+
+def build_batch_request(requisition: dict) -> dict:
+    """The batch-prediction request for a requisition: the same prompt and config as online generation."""
+    prompt = vertex_service.build_initial_ad_prompt(
+        requisition["template"], requisition["description"], requisition["tone"], requisition["max_words"]
+    )
+    generation_config = vertex_service.build_generation_config(
+        "initial_ad", requisition["max_words"], requisition["tone"], requisition["profile"]
+    )
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": generation_config.to_dict(),
+        "safetySettings": [{"category": category.name, "threshold": threshold.name}
+                           for category, threshold in SAFETY_SETTINGS.items()],
+    }
+
+
+def export_batch(requisitions_path: str, batch_name: str | None = None,
+                 chunk_max_requests: int = BATCH_CHUNK_MAX_REQUESTS) -> dict:
+    """
+    Renders requisitions into batch-prediction JSONL chunk files plus a manifest.
+
+    Args:
+        requisitions_path: CSV or JSONL file with one requisition per row. Columns:
+            id, template | template_preset, description | description_preset,
+            tone, max_words, profile (all but the template/description optional).
+        batch_name: Name of the batch directory under BATCH_WORK_DIR (generated if omitted).
+        chunk_max_requests: Maximum request lines per chunk file.
+
+    Returns:
+        {"batch_dir", "chunk_paths", "requests", "skipped": [error messages]}.
+    """
+    batch_name = batch_name or f"batch_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    batch_dir = os.path.join(BATCH_WORK_DIR, batch_name)
+    os.makedirs(os.path.join(batch_dir, "input"), exist_ok=True)
+
+    chunk_paths, skipped = [], []
+    request_count, chunk_file = 0, None
+    with open(os.path.join(batch_dir, _MANIFEST_FILE_NAME), "w", encoding="utf-8") as manifest_file:
+        try:
+            for row_number, row in enumerate(_read_requisitions(requisitions_path), start=1):
+                try:
+                    requisition = _resolve_requisition(row, row_number)
+                except ValueError as e:
+                    skipped.append(str(e))
+                    continue
+                if request_count % chunk_max_requests == 0:
+                    if chunk_file:
+                        chunk_file.close()
+                    chunk_paths.append(os.path.join(batch_dir, "input", f"requests_{len(chunk_paths):04d}.jsonl"))
+                    chunk_file = open(chunk_paths[-1], "w", encoding="utf-8")
+                key = f"{batch_name}:{row_number}"
+                request = build_batch_request(requisition)
+                chunk_file.write(json.dumps({"key": key, "request": request}) + "\n")
+                manifest_file.write(json.dumps({"key": key, "prompt_digest": _prompt_digest(request), **requisition}) + "\n")
+                request_count += 1
+        finally:
+            if chunk_file:
+                chunk_file.close()
+
+    print(f"DEBUG: Exported {request_count} batch requests in {len(chunk_paths)} chunk(s) to {batch_dir}.")
+    return {"batch_dir": batch_dir, "chunk_paths": chunk_paths, "requests": request_count, "skipped": skipped}
+
+
+class LocalFileBatchBackend:
+    """
+    File-based stand-in for a batch-prediction service. Submitting runs every request
+    through `model` (anything with generate_content, e.g. benchmarks.fake_model) and
+    writes the output in the Vertex AI prediction format.
+    """
+
+    name = "local"
+
+    def __init__(self, model):
+        self.model = model
+
+    def submit(self, batch_dir: str, chunk_paths: list[str]) -> str:
+        output_dir = os.path.join(batch_dir, "local_output")
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, "predictions.jsonl"), "w", encoding="utf-8") as output_file:
+            for chunk_path in chunk_paths:
+                with open(chunk_path, encoding="utf-8") as chunk_file:
+                    for line in chunk_file:
+                        output_file.write(json.dumps(self._predict(json.loads(line))) + "\n")
+        return output_dir
+
+    def _predict(self, request_line: dict) -> dict:
+        request = request_line["request"]
+        try:
+            response = self.model.generate_content(
+                request["contents"][0]["parts"][0]["text"], generation_config=request.get("generationConfig")
+            )
+            return {**request_line, "status": "", "response": {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": response.text}]},
+                                "finishReason": "STOP"}]
+            }}
+        except Exception as e:
+            return {**request_line, "status": str(e)}
+
+    def status(self, job_id: str) -> str:
+        return "succeeded" if os.path.exists(os.path.join(job_id, "predictions.jsonl")) else "failed"
+
+    def iter_predictions(self, job_id: str):
+        with open(os.path.join(job_id, "predictions.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class VertexBatchBackend:
+    """
+    Vertex AI batch prediction. Chunk files are uploaded under BATCH_GCS_URI_PREFIX and
+    submitted as one job; predictions are streamed back from the job's output location.
+    Requires vertexai.init() (vertex_service.init_vertex_ai()) and google-cloud-storage.
+    """
+
+    name = "vertex"
+
+    def __init__(self, gcs_uri_prefix: str = BATCH_GCS_URI_PREFIX):
+        if not gcs_uri_prefix.startswith("gs://"):
+            raise ValueError("BATCH_GCS_URI_PREFIX must be set to a gs:// URI for the Vertex batch backend.")
+        from google.cloud import storage
+        self.gcs_uri_prefix = gcs_uri_prefix.rstrip("/")
+        self.storage_client = storage.Client()
+
+    def _blob(self, gcs_uri: str):
+        bucket_name, _, blob_name = gcs_uri[len("gs://"):].partition("/")
+        return self.storage_client.bucket(bucket_name).blob(blob_name)
+
+    def submit(self, batch_dir: str, chunk_paths: list[str]) -> str:
+        from vertexai.batch_prediction import BatchPredictionJob
+        batch_uri = f"{self.gcs_uri_prefix}/{os.path.basename(batch_dir)}"
+        input_uris = []
+        for chunk_path in chunk_paths:
+            input_uris.append(f"{batch_uri}/input/{os.path.basename(chunk_path)}")
+            self._blob(input_uris[-1]).upload_from_filename(chunk_path) # Streams from disk
+        job = BatchPredictionJob.submit(
+            source_model=MODEL_NAME, input_dataset=input_uris, output_uri_prefix=f"{batch_uri}/output"
+        )
+        print(f"DEBUG: Submitted Vertex AI batch prediction job {job.resource_name}.")
+        return job.resource_name
+
+    def status(self, job_id: str) -> str:
+        from vertexai.batch_prediction import BatchPredictionJob
+        job = BatchPredictionJob(job_id)
+        if not job.has_ended:
+            return "running"
+        return "succeeded" if job.has_succeeded else "failed"
+
+    def iter_predictions(self, job_id: str):
+        from vertexai.batch_prediction import BatchPredictionJob
+        output_location = BatchPredictionJob(job_id).output_location.rstrip("/")
+        bucket_name, _, prefix = output_location[len("gs://"):].partition("/")
+        for blob in self.storage_client.list_blobs(bucket_name, prefix=prefix):
+            if blob.name.endswith(".jsonl"):
+                with blob.open("r", encoding="utf-8") as f: # Streamed, not downloaded whole
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+
+
+def get_batch_backend(name: str = BATCH_BACKEND, model=None):
+    """Returns the configured batch backend ("local" needs the model that stands in for the service)."""
+    if name == "local":
+        return LocalFileBatchBackend(model)
+    if name == "vertex":
+        return VertexBatchBackend()
+    raise ValueError(f"Unknown batch backend '{name}'. Use 'local' or 'vertex'.")
+
+
+def save_job(batch_dir: str, backend_name: str, job_id: str):
+    """Records the submitted job in the batch directory, for later status checks and import."""
+    with open(os.path.join(batch_dir, _JOB_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump({"backend": backend_name, "job_id": job_id, "submitted_at": time.time()}, f)
+
+
+def load_job(batch_dir: str) -> dict:
+    """Returns {"backend", "job_id", "submitted_at"} for a submitted batch."""
+    with open(os.path.join(batch_dir, _JOB_FILE_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _prediction_text(prediction: dict) -> str | None:
+    """Text of a prediction line, or None if it failed, was blocked or was cut off at max_output_tokens."""
+    try:
+        candidate = prediction["response"]["candidates"][0]
+    except (KeyError, IndexError, TypeError):
+        return None
+    if candidate.get("finishReason") in ("SAFETY", "MAX_TOKENS"):
+        return None
+    return "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", [])) or None
+
+
+def _index_manifest(manifest_path: str) -> dict:
+    """
+    Maps request keys and prompt digests to byte offsets in the manifest, so only the
+    offsets are held in memory and each requisition is read when its prediction arrives.
+    """
+    offsets = {}
+    with open(manifest_path, "rb") as f:
+        offset = f.tell()
+        for line in iter(f.readline, b""):
+            entry = json.loads(line)
+            offsets[entry["key"]] = offsets[entry["prompt_digest"]] = offset
+            offset = f.tell()
+    return offsets
+
+
+def import_batch_results(backend, job_id: str, batch_dir: str, username: str | None = None) -> dict:
+    """
+    Streams a finished job's predictions back, joins them to their inputs and stores them.
+
+    Each ad is cleaned and validated locally (issues are reported, not repaired), then
+    appended to the ad history (source "batch"), stored in the generation cache under
+    its input key for `username` (only that user's Generate click can take it; without a
+    username nothing is cached), and written to results.jsonl in the batch directory.
+
+    Returns:
+        Counts: {"predictions", "imported", "failed", "unmatched", "with_validation_issues", "results_path"}.
+    """
+    offsets = _index_manifest(os.path.join(batch_dir, _MANIFEST_FILE_NAME))
+    report = {"predictions": 0, "imported": 0, "failed": 0, "unmatched": 0, "with_validation_issues": 0}
+    results_path = os.path.join(batch_dir, _RESULTS_FILE_NAME)
+    with open(os.path.join(batch_dir, _MANIFEST_FILE_NAME), encoding="utf-8") as manifest_file, \
+            open(results_path, "w", encoding="utf-8") as results_file:
+        for prediction in backend.iter_predictions(job_id):
+            report["predictions"] += 1
+            offset = offsets.get(prediction.get("key"))
+            if offset is None and "request" in prediction:
+                offset = offsets.get(_prompt_digest(prediction["request"]))
+            if offset is None:
+                report["unmatched"] += 1
+                continue
+            manifest_file.seek(offset)
+            requisition = json.loads(manifest_file.readline())
+
+            raw_text = _prediction_text(prediction)
+            if raw_text is None:
+                report["failed"] += 1
+                results_file.write(json.dumps({"requisition_id": requisition["requisition_id"], "ad_text": None,
+                                               "error": prediction.get("status") or "No usable response"}) + "\n")
+                continue
+
+            ad_text = ad_validation.clean_ai_response(raw_text)
+            issues = ad_validation.validate_ad(ad_text, requisition["template"], requisition["max_words"])
+            report["with_validation_issues"] += bool(issues)
+            ad_history.record_ad(ad_text, requisition["template"], requisition["description"], requisition["tone"],
+                                 requisition["max_words"], username=username, source="batch",
+                                 profile=requisition["profile"], template_preset=requisition["template_preset"],
+                                 description_preset=requisition["description_preset"])
+            if username: # Cached ads are only served to their owner, so an anonymous import is not cached
+                generation_cache.store(
+                    generation_cache.make_generation_key(requisition["template"], requisition["description"],
+                                                         requisition["tone"], requisition["max_words"],
+                                                         requisition["profile"]),
+                    ad_text, source="batch", persist=True, username=username # Imports run in their own process
+                )
+            results_file.write(json.dumps({"requisition_id": requisition["requisition_id"], "ad_text": ad_text,
+                                           "validation_issues": issues}) + "\n")
+            report["imported"] += 1
+    report["results_path"] = results_path
+    return report
+
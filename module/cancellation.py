@@ -0,0 +1,141 @@
+# job_ad_generator_project/module/cancellation.py
+
+"""
+Cancellation Module
+
+Cooperative cancellation for streamed model calls. A CancellationToken is
+checked between response chunks; once it is cancelled the upstream stream is
+closed, so the model stops producing (and billing) output tokens and the
+thread is released.
+
+Tokens are cancelled when:
+- a newer request from the same owner (browser session, API chat) supersedes them
+  (begin_request), or a Streamlit rerun/stop interrupts the script that owns them;
+- the owner disconnected (the token's liveness check fails), which matters for
+  work that runs without touching Streamlit, e.g. section worker threads;
+- their inputs changed (speculative pre-generation).
+
+Counters estimate the output tokens saved: for each aborted stream, the mean
+length of completed streams of the same kind minus what had been produced.
+
+No Streamlit calls; safe to use from worker threads and the API event loop.
+"""
+
+import threading
+import time
+
+from content.normalization import estimate_tokens
+
+_LIVENESS_CHECK_INTERVAL_SECONDS = 1.0
+
+
+class GenerationCancelled(Exception):
+    """Raised from worker threads when their generation was cancelled."""
+
+
+class CancellationToken:
+    """
+    Args:
+        liveness_check: Optional callable returning False once the owner has gone away
+                        (checked at most once a second, from whichever thread asks).
+    """
+
+    def __init__(self, liveness_check=None):
+        self._event = threading.Event()
+        self._liveness_check = liveness_check
+        self._last_liveness_check = time.monotonic()
+        self.reason = None
+
+    def cancel(self, reason: str):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+            _record_cancellation(reason)
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self._liveness_check is not None and \
+                time.monotonic() - self._last_liveness_check >= _LIVENESS_CHECK_INTERVAL_SECONDS:
+            self._last_liveness_check = time.monotonic()
+            if not self._liveness_check():
+                self.cancel("disconnected")
+        return self._event.is_set()
+
+
+_registry_lock = threading.Lock()
+# owner -> the token of its current request
+_active_tokens = {}
+
+_stats_lock = threading.Lock()
+_cancellation_stats = {"cancellations": {}, "streams_completed": 0, "streams_aborted": 0,
+                       "tokens_before_abort": 0, "tokens_saved_estimate": 0}
+# stream kind -> [completed streams, total output tokens], the baseline for tokens saved
+_completed_token_totals = {}
+
+
+def begin_request(owner: str, liveness_check=None) -> CancellationToken:
+    """Returns a token for a new request by `owner`, cancelling the owner's previous request."""
+    token = CancellationToken(liveness_check)
+    supersede(owner, token)
+    return token
+
+
+def supersede(owner: str, token: CancellationToken):
+    """Registers `token` as the owner's current request, cancelling the owner's previous request."""
+    with _registry_lock:
+        previous_token = _active_tokens.get(owner)
+        _active_tokens[owner] = token
+    if previous_token is not None and previous_token is not token:
+        previous_token.cancel("superseded")
+
+
+def end_request(owner: str, token: CancellationToken):
+    """Unregisters a finished request (no-op if a newer one has replaced it)."""
+    with _registry_lock:
+        if _active_tokens.get(owner) is token:
+            del _active_tokens[owner]
+
+
+def _record_cancellation(reason: str):
+    with _stats_lock:
+        _cancellation_stats["cancellations"][reason] = _cancellation_stats["cancellations"].get(reason, 0) + 1
+
+
+def record_completed_stream(kind: str, text: str):
+    with _stats_lock:
+        _cancellation_stats["streams_completed"] += 1
+        totals = _completed_token_totals.setdefault(kind, [0, 0])
+        totals[0] += 1
+        totals[1] += estimate_tokens(text)
+
+
+def record_aborted_stream(kind: str, reason: str, partial_text: str):
+    """Counts a stream closed before completion and the output tokens that were not generated."""
+    produced_tokens = estimate_tokens(partial_text)
+    with _stats_lock:
+        _cancellation_stats["streams_aborted"] += 1
+        _cancellation_stats["tokens_before_abort"] += produced_tokens
+        completed_count, completed_tokens = _completed_token_totals.get(kind, (0, 0))
+        if completed_count:
+            _cancellation_stats["tokens_saved_estimate"] += max(completed_tokens // completed_count - produced_tokens, 0)
+    print(f"DEBUG: Closed {kind} model stream early ({reason}) after ~{produced_tokens} tokens.")
+
+
+def interruption_reason(exc: BaseException) -> str:
+    """Maps a Streamlit script-control exception to a cancellation reason."""
+    if type(exc).__name__ == "RerunException":
+        return "superseded" # The user interacted again (new prompt, another click)
+    if type(exc).__name__ == "StopException":
+        return "stopped"    # Script stopped, e.g. the session was closed
+    return "interrupted"
+
+
+def get_cancellation_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_cancellation_stats)
+        stats["cancellations"] = dict(stats["cancellations"])
+    with _registry_lock:
+        stats["active_requests"] = len(_active_tokens)
+    return stats
@@ -0,0 +1,391 @@
+# job_ad_generator_project/module/docx_export.py
+
+"""
+Word Export Module
+
+Renders generated ads back into the branded .docx templates in content/ad_templates:
+- Each template is split into sections at its heading paragraphs (the same rule the
+  preset loader uses), and the generated ad's sections replace the matching template
+  sections: by title first, then in order for renamed headings (e.g. "JOBTITLE" filled
+  in). Template sections left without an ad section are dropped, so neither placeholder
+  text nor a second copy of a section the ad has under another title ends up in the export.
+- Generated paragraphs reuse the template's own heading, bullet and body paragraphs as
+  prototypes, so numbering, fonts and spacing come from the template. "**bold**" runs
+  are kept bold.
+- A template is parsed once into a compiled form (the unchanged package parts, plus
+  document.xml as serialized fragments and paragraph/run prototypes) and re-parsed only
+  when the file changes. Rendering an ad is then string assembly and one zip write,
+  without python-docx.
+- Bulk exports are produced as a stream of zip chunks, one ad at a time, so neither the
+  archive nor the set of documents is ever held in memory.
+
+No Streamlit calls.
+"""
+
+import copy
+import io
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+try:
+    import docx
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph
+    from lxml import etree
+except ImportError:
+    docx = None
+    print("WARNING: 'python-docx' library not found. Word export will be disabled.")
+
+from configs.app_settings import DOCX_EXPORT_FALLBACK_TEMPLATE
+from content.predefined_data import classify_docx_paragraph, get_template_source_paths
+from . import ad_sections
+
+_DOCUMENT_PART = "word/document.xml"
+_FRAGMENT_MARKER = "docx-export-fragment"
+_RUNS_MARKER = "docx-export-runs"
+_TEXT_MARKER = "@@docx-export-text@@"
+_LIST_ITEM_PATTERN = re.compile(r"^(?:[*\-•+]|\d+[.)])\s+")
+_RENDER_CACHE_MAX_ENTRIES = 16
+
+_compile_lock = threading.Lock()
+# template path -> (file signature, compiled template)
+_compiled_templates = {}
+
+_render_cache_lock = threading.Lock()
+# (template path, file signature, ad text) -> rendered .docx bytes, for reruns of the same ad
+_render_cache = OrderedDict()
+
+_export_stats = {"templates_compiled": 0, "compile_seconds": 0.0, "documents_rendered": 0, "render_seconds": 0.0,
+                 "render_cache_hits": 0, "bulk_exports": 0, "bulk_bytes_streamed": 0}
+
+
+def is_available() -> bool:
+    return docx is not None
+
+
+def _file_signature(path: str) -> tuple[int, int]:
+    stat_result = os.stat(path)
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+
+def _serialize_fragments(root, fragments: list[list]) -> tuple[str, list[str], str]:
+    """
+    Serializes groups of body elements within the document root, so they carry no repeated
+    namespace declarations. Returns (document prefix, one XML string per group, document suffix).
+    """
+    root = copy.deepcopy(root)
+    body = root.find(qn("w:body"))
+    section_properties = body.find(qn("w:sectPr"))
+    for child in list(body):
+        body.remove(child)
+    for elements in fragments:
+        body.append(etree.Comment(_FRAGMENT_MARKER))
+        body.extend(copy.deepcopy(element) for element in elements)
+    body.append(etree.Comment(_FRAGMENT_MARKER))
+    if section_properties is not None:
+        body.append(section_properties)
+    xml = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True).decode("utf-8")
+    pieces = xml.split(f"<!--{_FRAGMENT_MARKER}-->")
+    return pieces[0], pieces[1:-1], pieces[-1]
+
+
+def _prototype_elements(paragraph_element, is_heading: bool = False) -> list:
+    """
+    Turns a template paragraph into prototype elements: the paragraph with its runs replaced
+    by a marker, and its first text run as a plain and a bold run with a text marker (a
+    heading's plain run keeps its own formatting).
+    """
+    paragraph = copy.deepcopy(paragraph_element)
+    runs = paragraph.findall(qn("w:r"))
+    text_runs = [run for run in runs if run.find(qn("w:t")) is not None]
+    run = copy.deepcopy(text_runs[0] if text_runs else (runs[0] if runs else OxmlElement("w:r")))
+    for child in list(paragraph):
+        if child.tag != qn("w:pPr"):
+            paragraph.remove(child)
+    paragraph.append(etree.Comment(_RUNS_MARKER))
+
+    for child in list(run):
+        if child.tag != qn("w:rPr"):
+            run.remove(child)
+    text = etree.SubElement(run, qn("w:t"))
+    text.text = _TEXT_MARKER
+    text.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+    plain_run, bold_run = copy.deepcopy(run), copy.deepcopy(run)
+    if not is_heading:
+        plain_properties = plain_run.get_or_add_rPr()
+        plain_properties._remove_b()
+        plain_properties._remove_bCs()
+    bold_properties = bold_run.get_or_add_rPr()
+    bold_properties.get_or_add_b()
+    bold_properties.get_or_add_bCs()
+    return [paragraph, plain_run, bold_run]
+
+
+def _prototype_from_xml(paragraph_xml: str, plain_run_xml: str, bold_run_xml: str) -> dict:
+    paragraph_open, paragraph_close = paragraph_xml.split(f"<!--{_RUNS_MARKER}-->")
+    return {"open": paragraph_open, "close": paragraph_close,
+            "plain_run": tuple(plain_run_xml.split(_TEXT_MARKER)), "bold_run": tuple(bold_run_xml.split(_TEXT_MARKER))}
+
+
+def compile_template(template_path: str) -> dict:
+    """
+    Parses a .docx template into its compiled form.
+
+    Returns:
+        dict: {"parts": [(name, bytes | None)] in package order (None for document.xml),
+               "prefix"/"suffix": document.xml around the body content,
+               "slots": [{"title", "heading_text", "heading", "list", "text"}] in document order,
+               where the first slot holds any content before the first heading}.
+    """
+    started = time.perf_counter()
+    with zipfile.ZipFile(template_path) as package:
+        parts = [(name, None if name == _DOCUMENT_PART else package.read(name)) for name in package.namelist()]
+    document = docx.Document(template_path)
+    body = document.element.body
+
+    slots = [{"title": ad_sections.HEADER_SECTION_TITLE, "heading_text": "", "heading": None, "prototypes": {}}]
+    document_prototypes = {}
+    for element in body.iterchildren():
+        if element.tag == qn("w:sectPr"):
+            continue
+        kind = classify_docx_paragraph(Paragraph(element, document)) if element.tag == qn("w:p") else "other"
+        if kind == "heading":
+            heading_text = Paragraph(element, document).text.strip()
+            slots.append({"title": heading_text.rstrip(":").strip(), "heading_text": heading_text,
+                          "heading": element, "prototypes": {}})
+            document_prototypes.setdefault("heading", element)
+            continue
+        if kind in ("list", "text"):
+            slots[-1]["prototypes"].setdefault(kind, element)
+            document_prototypes.setdefault(kind, element)
+
+    # Three fragment groups per prototype paragraph
+    fragments = []
+    prototype_keys = []
+    for index, slot in enumerate(slots):
+        for kind in ("heading", "list", "text"):
+            if kind == "heading":
+                element = slot["heading"] # None for the header slot
+            else:
+                element = slot["prototypes"].get(kind, document_prototypes.get(kind))
+                if element is None:
+                    element = document_prototypes.get("text", document_prototypes.get("heading"))
+            if element is not None:
+                prototype_keys.append((index, kind))
+                fragments.extend([[prototype_element]
+                                  for prototype_element in _prototype_elements(element, kind == "heading")])
+    prefix, prototype_xml, suffix = _serialize_fragments(document.element, fragments)
+
+    compiled_slots = [{"title": slot["title"], "heading_text": slot["heading_text"]} for slot in slots]
+    for position, (index, kind) in enumerate(prototype_keys):
+        compiled_slots[index][kind] = _prototype_from_xml(*prototype_xml[3 * position:3 * position + 3])
+
+    _export_stats["templates_compiled"] += 1
+    _export_stats["compile_seconds"] += time.perf_counter() - started
+    print(f"DEBUG: Compiled Word template '{os.path.basename(template_path)}' ({len(slots) - 1} sections).")
+    return {"parts": parts, "prefix": prefix, "suffix": suffix, "slots": compiled_slots}
+
+
+def get_compiled_template(template_path: str) -> dict:
+    """Returns the compiled template, compiling it on first use and again when the file changes."""
+    signature = _file_signature(template_path)
+    with _compile_lock:
+        cached = _compiled_templates.get(template_path)
+        if cached is None or cached[0] != signature:
+            cached = (signature, compile_template(template_path))
+            _compiled_templates[template_path] = cached
+        return cached[1]
+
+
+def resolve_template_path(template_preset: str | None) -> str | None:
+    """The .docx file for a template preset, or the fallback template for other presets ("Custom", built-ins)."""
+    source_paths = get_template_source_paths()
+    return source_paths.get(template_preset) or source_paths.get(DOCX_EXPORT_FALLBACK_TEMPLATE) or \
+        next(iter(source_paths.values()), None)
+
+
+def _render_runs(prototype: dict, text: str) -> str:
+    """Renders a line of text as runs, with **bold** spans in the bold run style."""
+    runs = []
+    for index, segment in enumerate(text.split("**")):
+        if segment:
+            run_open, run_close = prototype["bold_run" if index % 2 else "plain_run"]
+            runs.append(run_open + escape(segment) + run_close)
+    return prototype["open"] + "".join(runs) + prototype["close"]
+
+
+def _render_section(slot: dict, section: dict, heading_text: str) -> str:
+    xml = []
+    if slot.get("heading") and heading_text:
+        xml.append(_render_runs(slot["heading"], heading_text.replace("**", "")))
+    for line in section["body"].splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        list_item = _LIST_ITEM_PATTERN.match(line)
+        prototype = slot.get("list" if list_item else "text") or slot.get("text")
+        if prototype:
+            xml.append(_render_runs(prototype, line[list_item.end():] if list_item else line))
+    return "".join(xml)
+
+
+def _assign_sections(slots: list[dict], sections: list[dict]) -> tuple[dict, list[dict]]:
+    """Maps slot index -> generated section (by title, then in order). Returns (assignments, leftovers)."""
+    slot_by_title = {}
+    for index, slot in enumerate(slots[1:], start=1):
+        slot_by_title.setdefault(ad_sections.normalize_title(slot["title"]), index)
+    assignments, unmatched = {}, []
+    for section in sections:
+        if not section["heading"]:
+            assignments.setdefault(0, section)
+            continue
+        index = slot_by_title.get(ad_sections.normalize_title(section["title"]))
+        if index is not None and index not in assignments:
+            assignments[index] = section
+        else:
+            unmatched.append(section)
+    free_slots = [index for index in range(1, len(slots)) if index not in assignments]
+    while unmatched and free_slots:
+        assignments[free_slots.pop(0)] = unmatched.pop(0)
+    return assignments, unmatched
+
+
+def render_document_xml(compiled: dict, ad_text: str) -> str:
+    """Builds document.xml for an ad from a compiled template (only slots filled from the ad are kept)."""
+    slots = compiled["slots"]
+    assignments, leftovers = _assign_sections(slots, ad_sections.parse_sections(ad_text))
+    body = []
+    for index, slot in enumerate(slots):
+        section = assignments.get(index)
+        if section is None:
+            continue # The template's own text for this slot is placeholder content
+        same_title = ad_sections.normalize_title(section["title"]) == ad_sections.normalize_title(slot["title"])
+        body.append(_render_section(slot, section, slot["heading_text"] if same_title else section["title"]))
+    for section in leftovers:
+        body.append(_render_section(slots[-1], section, section["title"]))
+    return compiled["prefix"] + "".join(body) + compiled["suffix"]
+
+
+def _write_package(compiled: dict, document_xml: str, output):
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as package:
+        for name, data in compiled["parts"]:
+            package.writestr(name, document_xml.encode("utf-8") if data is None else data)
+
+
+def render_ad_docx(ad_text: str, template_path: str) -> bytes:
+    """
+    Renders one ad into a .docx based on the given template.
+
+    Returns:
+        The .docx file contents.
+    """
+    cache_key = (template_path, _file_signature(template_path), ad_text)
+    with _render_cache_lock:
+        if cache_key in _render_cache:
+            _render_cache.move_to_end(cache_key)
+            _export_stats["render_cache_hits"] += 1
+            return _render_cache[cache_key]
+    started = time.perf_counter()
+    compiled = get_compiled_template(template_path)
+    output = io.BytesIO()
+    _write_package(compiled, render_document_xml(compiled, ad_text), output)
+    document_bytes = output.getvalue()
+    _export_stats["documents_rendered"] += 1
+    _export_stats["render_seconds"] += time.perf_counter() - started
+    with _render_cache_lock:
+        _render_cache[cache_key] = document_bytes
+        while len(_render_cache) > _RENDER_CACHE_MAX_ENTRIES:
+            _render_cache.popitem(last=False)
+    return document_bytes
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that collects what zipfile writes until the next take()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def export_filename(entry: dict) -> str:
+    """
+    A file name for an exported ad: its id and description preset (or first line),
+    e.g. "0042_senior_software_engineer_backend.docx".
+    """
+    label = entry.get("description_preset") if entry.get("description_preset") not in (None, "", "Custom") else \
+        next((line.strip("*#: ") for line in entry["ad_text"].splitlines() if line.strip()), "job_ad")
+    slug = re.sub(r"[^a-z0-9]+", "_", label.lower()).strip("_")[:60] or "job_ad"
+    return f"{entry.get('id', 0):04d}_{slug}.docx"
+
+
+def iter_bulk_export(entries, template_path: str | None = None):
+    """
+    Streams a zip of .docx exports, one document per ad history entry.
+
+    Args:
+        entries: Iterable of ad history entries (dicts with "ad_text", "id" and "template_preset");
+                 consumed lazily, one at a time.
+        template_path: Template for every ad (default: each entry's own template preset,
+                       or DOCX_EXPORT_FALLBACK_TEMPLATE).
+
+    Yields:
+        bytes: Consecutive chunks of the zip archive (about one document each).
+    """
+    sink = _ChunkWriter()
+    used_names = set()
+    _export_stats["bulk_exports"] += 1
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive: # Each .docx is already compressed
+        for entry in entries:
+            entry_template_path = template_path or resolve_template_path(entry.get("template_preset"))
+            if not entry_template_path or not entry.get("ad_text"):
+                continue
+            filename = export_filename(entry)
+            if filename in used_names:
+                filename = f"{len(used_names):04d}_{filename}"
+            used_names.add(filename)
+            started = time.perf_counter()
+            compiled = get_compiled_template(entry_template_path)
+            # Each document is written straight into the archive entry, never as separate bytes
+            with archive.open(filename, "w", force_zip64=True) as document_file:
+                _write_package(compiled, render_document_xml(compiled, entry["ad_text"]), document_file)
+            _export_stats["documents_rendered"] += 1
+            _export_stats["render_seconds"] += time.perf_counter() - started
+            chunk = sink.take()
+            _export_stats["bulk_bytes_streamed"] += len(chunk)
+            yield chunk
+    chunk = sink.take() # Central directory
+    _export_stats["bulk_bytes_streamed"] += len(chunk)
+    yield chunk
+
+
+def get_export_stats() -> dict:
+    stats = dict(_export_stats)
+    stats["mean_render_ms"] = round(1000 * stats["render_seconds"] / stats["documents_rendered"], 2) \
+        if stats["documents_rendered"] else None
+    stats["compile_seconds"] = round(stats["compile_seconds"], 3)
+    stats["render_seconds"] = round(stats["render_seconds"], 3)
+    with _compile_lock:
+        stats["compiled_templates"] = len(_compiled_templates)
+    return stats
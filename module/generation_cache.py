@@ -0,0 +1,158 @@
+# job_ad_generator_project/module/generation_cache.py
+
+"""
+Generation Cache Module
+
+Cache of generated ads keyed by the inputs that produced them (template,
+description, tone, max words, profile). Entries are filled ahead of time and are
+taken (removed) when used, so a second Generate click with unchanged inputs still
+produces a fresh variant.
+
+Two tiers, both scoped by the owning username so one user's pre-generated ad is
+never handed to another user with the same inputs:
+- In memory, process-wide, for speculative pre-generation: bounded by an entry
+  count (least recently stored entries go first) and GENERATION_CACHE_TTL_SECONDS.
+- Persisted in a local SQLite file, for entries produced by another process
+  (batch imports run from the command line), kept for
+  GENERATION_CACHE_PERSISTED_TTL_SECONDS. Each persisted entry belongs to the user
+  who imported it and is only ever returned to that user.
+
+No Streamlit calls; safe to use from background threads.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from configs.app_settings import (
+    GENERATION_CACHE_MAX_ENTRIES,
+    GENERATION_CACHE_TTL_SECONDS,
+    GENERATION_CACHE_PATH,
+    GENERATION_CACHE_PERSISTED_TTL_SECONDS,
+)
+
+_cache_lock = threading.Lock()
+# (username, key) -> {"text": str, "source": str, "stored_at": float}
+_cache_entries = OrderedDict()
+
+_db_lock = threading.Lock()
+_db_connection = None
+
+_cache_stats = {"stores": 0, "persisted_stores": 0, "hits": 0, "persisted_hits": 0, "misses": 0,
+                "expired": 0, "evicted": 0}
+
+
+def make_generation_key(template: str, description: str, tone: str, max_words: int, profile_name: str | None = None) -> str:
+    """Returns a stable digest of the generation inputs."""
+    payload = json.dumps([template, description, tone, int(max_words or 0), profile_name], separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Returns the process-wide SQLite connection for the persisted tier, creating the schema on first use."""
+    global _db_connection
+    if _db_connection is None:
+        os.makedirs(os.path.dirname(GENERATION_CACHE_PATH), exist_ok=True)
+        connection = sqlite3.connect(GENERATION_CACHE_PATH, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(generation_cache)")]
+        if columns and "username" not in columns:
+            # Entries from before owners were recorded cannot be attributed to anyone, so they are dropped
+            connection.execute("DROP TABLE generation_cache")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS generation_cache ("
+            " cache_key TEXT NOT NULL, username TEXT NOT NULL, text TEXT NOT NULL, source TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, PRIMARY KEY (cache_key, username))"
+        )
+        connection.commit()
+        _db_connection = connection
+    return _db_connection
+
+
+def _is_expired(entry: dict, now: float, ttl_seconds: float = GENERATION_CACHE_TTL_SECONDS) -> bool:
+    return now - entry["stored_at"] > ttl_seconds
+
+
+def store(key: str, text: str, source: str, persist: bool = False, username: str | None = None):
+    """
+    Stores a generated ad for the given input key and user (replacing any previous entry);
+    only that user can take it. With persist, the entry goes to the persisted tier so other
+    processes can take it (a username is then required).
+    """
+    if persist:
+        if not username:
+            raise ValueError("Persisted generation cache entries need an owning username.")
+        with _db_lock:
+            connection = _get_connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO generation_cache (cache_key, username, text, source, stored_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, username, text, source, time.time())
+            )
+            connection.commit()
+        _cache_stats["persisted_stores"] += 1
+        return
+    with _cache_lock:
+        _cache_entries.pop((username, key), None)
+        _cache_entries[(username, key)] = {"text": text, "source": source, "stored_at": time.time()}
+        _cache_stats["stores"] += 1
+        while len(_cache_entries) > GENERATION_CACHE_MAX_ENTRIES:
+            _cache_entries.popitem(last=False)
+            _cache_stats["evicted"] += 1
+
+
+def contains(key: str, username: str | None = None) -> bool:
+    with _cache_lock:
+        entry = _cache_entries.get((username, key))
+        if entry is not None and not _is_expired(entry, time.time()):
+            return True
+    return _read_persisted(key, username, remove=False) is not None
+
+
+def _read_persisted(key: str, username: str | None, remove: bool) -> dict | None:
+    if not username:
+        return None # Persisted entries are only ever returned to their owner
+    if not os.path.exists(GENERATION_CACHE_PATH) and _db_connection is None:
+        return None # Nothing was ever persisted; avoid creating the file on lookups
+    with _db_lock:
+        connection = _get_connection()
+        row = connection.execute(
+            "SELECT text, source, stored_at FROM generation_cache WHERE cache_key = ? AND username = ?",
+            (key, username)
+        ).fetchone()
+        if row and remove:
+            connection.execute("DELETE FROM generation_cache WHERE cache_key = ? AND username = ?", (key, username))
+            connection.commit()
+    if row is None:
+        return None
+    entry = {"text": row[0], "source": row[1], "stored_at": row[2]}
+    if _is_expired(entry, time.time(), GENERATION_CACHE_PERSISTED_TTL_SECONDS):
+        _cache_stats["expired"] += remove
+        return None
+    return entry
+
+
+def take(key: str, username: str | None = None) -> dict | None:
+    """
+    Removes and returns `username`'s entry for the input key ({"text", "source", "stored_at"}),
+    or None if that user has no fresh entry in either tier.
+    """
+    with _cache_lock:
+        entry = _cache_entries.pop((username, key), None)
+        if entry is not None and _is_expired(entry, time.time()):
+            _cache_stats["expired"] += 1
+            entry = None
+    if entry is None:
+        entry = _read_persisted(key, username, remove=True)
+        _cache_stats["persisted_hits"] += entry is not None
+    _cache_stats["hits" if entry else "misses"] += 1
+    return entry
+
+
+def get_cache_stats() -> dict:
+    with _cache_lock:
+        return {**_cache_stats, "entries": len(_cache_entries)}
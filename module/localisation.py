@@ -0,0 +1,197 @@
+# job_ad_generator_project/module/localisation.py
+
+"""
+Localisation Module
+
+Translates a finished ad into several target locales at once:
+- One streamed model call per locale, all started together on a thread pool, so the
+  total wait is about that of the slowest single translation.
+- Progress is handed back to the calling thread through a queue; the caller's
+  on_update callback (which may make Streamlit calls) only ever runs there.
+- Finished translations are cached per (ad digest, locale), process-wide, so a
+  rerun, another recruiter or a re-selected locale does not translate the same ad again.
+  A translation cut off at its output token cap is reported as an error, never cached.
+- Each translation is checked for a changed markdown structure (headings, bullets,
+  bold markers); mismatches are counted and logged, not retried.
+
+No Streamlit calls.
+"""
+
+import hashlib
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from configs.app_settings import LOCALISATION_LOCALES, LOCALISATION_MAX_WORKERS, LOCALISATION_CACHE_MAX_ENTRIES
+from . import cancellation, vertex_service
+
+_UPDATE_INTERVAL_SECONDS = 0.2
+
+_cache_lock = threading.Lock()
+# (ad digest, locale) -> translated text
+_translation_cache = OrderedDict()
+
+_stats_lock = threading.Lock()
+_localisation_stats = {"requests": 0, "translations": 0, "cache_hits": 0, "failures": 0, "cancelled": 0, "truncated": 0,
+                       "formatting_mismatches": 0, "last_wall_seconds": None, "last_slowest_seconds": None}
+
+
+def ad_digest(ad_text: str) -> str:
+    return hashlib.blake2b(ad_text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _formatting_signature(text: str) -> tuple[int, int, int]:
+    """(heading lines, bullet/numbered lines, bold markers): what a faithful translation keeps."""
+    lines = [line.strip() for line in text.splitlines()]
+    headings = sum(1 for line in lines if line.startswith("#"))
+    bullets = sum(1 for line in lines if re.match(r"([*\-•]|\d+[.)])\s", line))
+    return headings, bullets, text.count("**")
+
+
+def get_cached_translations(ad_text: str, locales: list[str]) -> dict:
+    """Returns {locale: translated text} for the locales already translated for this exact ad."""
+    digest = ad_digest(ad_text)
+    with _cache_lock:
+        return {locale: _translation_cache[(digest, locale)] for locale in locales
+                if (digest, locale) in _translation_cache}
+
+
+def _store_translation(digest: str, locale: str, text: str):
+    with _cache_lock:
+        _translation_cache.pop((digest, locale), None)
+        _translation_cache[(digest, locale)] = text
+        while len(_translation_cache) > LOCALISATION_CACHE_MAX_ENTRIES:
+            _translation_cache.popitem(last=False)
+
+
+def _translate_one(model, ad_text: str, locale: str, cancel_token: cancellation.CancellationToken,
+                   updates: queue.Queue) -> tuple[str, float]:
+    """Worker: streams one translation, posting the text so far to `updates`. Returns (text, seconds)."""
+    if cancel_token.cancelled:
+        raise cancellation.GenerationCancelled(cancel_token.reason)
+    started = time.perf_counter()
+    translated_text = vertex_service.translate_ad_in_background(
+        model, ad_text, locale, cancel_token,
+        on_text=lambda text: updates.put((locale, text))
+    )
+    if translated_text is None:
+        raise cancellation.GenerationCancelled(cancel_token.reason)
+    return translated_text, time.perf_counter() - started
+
+
+def translate_ad(model, ad_text: str, locales: list[str],
+                 cancel_token: cancellation.CancellationToken | None = None, on_update=None) -> dict:
+    """
+    Translates an ad into the given locales concurrently (cached locales are not translated again).
+
+    Args:
+        model: The initialized GenerativeModel instance.
+        ad_text: The finished ad.
+        locales: LOCALISATION_LOCALES keys.
+        cancel_token: Optional token; once cancelled, the translation streams are closed.
+        on_update: Optional callback(locale, text, done), called from the calling thread with the
+                   partial translation as it streams in and once with the final text. Its Streamlit
+                   calls double as checkpoints at which a rerun or stop interrupts the translations.
+
+    Returns:
+        dict: {"translations": {locale: text}, "errors": {locale: message},
+               "cached": [locales served from the cache], "seconds": wall-clock time}.
+    """
+    started = time.perf_counter()
+    locales = [locale for locale in dict.fromkeys(locales) if locale in LOCALISATION_LOCALES]
+    digest = ad_digest(ad_text)
+    translations = get_cached_translations(ad_text, locales)
+    result = {"translations": translations, "errors": {}, "cached": list(translations), "seconds": 0.0}
+    missing_locales = [locale for locale in locales if locale not in translations]
+    with _stats_lock:
+        _localisation_stats["requests"] += 1
+        _localisation_stats["cache_hits"] += len(translations)
+    if on_update:
+        for locale, text in translations.items():
+            on_update(locale, text, True)
+    if not missing_locales or not ad_text.strip():
+        return result
+
+    print(f"DEBUG: Translating the ad into {len(missing_locales)} locales concurrently.")
+    # The workers need a token even when the caller has none, so an interrupted wait can stop them
+    cancel_token = cancel_token or cancellation.CancellationToken()
+    updates = queue.Queue()
+    source_signature = _formatting_signature(ad_text)
+    slowest_seconds = 0.0
+
+    def drain_updates():
+        latest = {}
+        while True:
+            try:
+                locale, text = updates.get_nowait()
+            except queue.Empty:
+                break
+            latest[locale] = text # Only the newest text per locale is worth rendering
+        if on_update:
+            for locale, text in latest.items():
+                if locale not in result["translations"] and locale not in result["errors"]:
+                    on_update(locale, text, False)
+
+    with ThreadPoolExecutor(max_workers=min(LOCALISATION_MAX_WORKERS, len(missing_locales)),
+                            thread_name_prefix="localisation") as executor:
+        futures = {executor.submit(_translate_one, model, ad_text, locale, cancel_token, updates): locale
+                   for locale in missing_locales}
+        pending = set(futures)
+        try:
+            while pending:
+                finished, pending = wait(pending, timeout=_UPDATE_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+                drain_updates()
+                for future in finished:
+                    locale = futures[future]
+                    try:
+                        translated_text, seconds = future.result()
+                    except cancellation.GenerationCancelled:
+                        result["errors"][locale] = "Cancelled."
+                        with _stats_lock:
+                            _localisation_stats["cancelled"] += 1
+                        continue
+                    except vertex_service.OutputTruncated as e:
+                        result["errors"][locale] = str(e)
+                        with _stats_lock:
+                            _localisation_stats["truncated"] += 1
+                        print(f"WARNING: {e} Not cached.")
+                        continue
+                    except Exception as e:
+                        result["errors"][locale] = str(e)
+                        with _stats_lock:
+                            _localisation_stats["failures"] += 1
+                        print(f"ERROR: Translation into {locale} failed: {e}")
+                        continue
+                    slowest_seconds = max(slowest_seconds, seconds)
+                    _store_translation(digest, locale, translated_text)
+                    result["translations"][locale] = translated_text
+                    with _stats_lock:
+                        _localisation_stats["translations"] += 1
+                        if _formatting_signature(translated_text) != source_signature:
+                            _localisation_stats["formatting_mismatches"] += 1
+                            print(f"WARNING: Translation into {locale} changed the ad's markdown structure.")
+                    if on_update:
+                        on_update(locale, translated_text, True)
+        except BaseException as e: # Streamlit rerun/stop raised from on_update
+            cancel_token.cancel(cancellation.interruption_reason(e))
+            raise
+
+    result["seconds"] = time.perf_counter() - started
+    with _stats_lock:
+        _localisation_stats["last_wall_seconds"] = round(result["seconds"], 2)
+        _localisation_stats["last_slowest_seconds"] = round(slowest_seconds, 2)
+    print(f"DEBUG: Translated into {len(missing_locales)} locales in {result['seconds']:.1f}s "
+          f"(slowest single translation {slowest_seconds:.1f}s).")
+    return result
+
+
+def get_localisation_stats() -> dict:
+    """Counters, plus wall-clock vs slowest single translation time of the last fan-out."""
+    with _stats_lock:
+        stats = dict(_localisation_stats)
+    with _cache_lock:
+        stats["cache_entries"] = len(_translation_cache)
+    return stats
@@ -0,0 +1,151 @@
+# job_ad_generator_project/module/profiling.py
+
+"""
+Profiling Module
+
+Lightweight timing spans for the Streamlit script:
+- app.py calls start_rerun() at the top of every rerun. Spans (the span() context
+  manager or the @profiled decorator) opened on the script thread during that rerun
+  are recorded with their nesting depth.
+- app.py closes the rerun with finish_rerun() in a finally block, so reruns cut
+  short by st.rerun()/st.stop() are recorded too. Streamlit may run each rerun on a
+  new script thread; start_rerun() also closes a record left open on its thread.
+- The last PROFILING_RERUN_HISTORY reruns, process-wide, are available from
+  get_recent_reruns() for the developer performance panel.
+- request_capture() profiles a user's next rerun with cProfile. The stats are
+  written to PROFILING_OUTPUT_DIR and can be opened with pstats or snakeviz.
+
+Spans opened outside a rerun (worker threads, the API server, scripts) cost one
+thread-local lookup and record nothing. No Streamlit calls.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from configs.app_settings import PROFILING_ENABLED, PROFILING_RERUN_HISTORY, PROFILING_OUTPUT_DIR
+
+_thread_state = threading.local()
+
+_history_lock = threading.Lock()
+_recent_reruns = deque(maxlen=PROFILING_RERUN_HISTORY)
+
+# session_key -> True while a capture of that user's next rerun is pending
+_capture_requests = {}
+# session_key -> {"path": str, "summary": str} of the latest capture
+_latest_captures = {}
+
+
+def start_rerun(session_key: str | None):
+    """Opens the record for a new script rerun on this thread, closing the previous one."""
+    if not PROFILING_ENABLED:
+        return
+    finish_rerun()
+    rerun = {"session_key": session_key, "started_at": time.time(), "start": time.perf_counter(),
+             "spans": [], "depth": 0, "profiler": None}
+    if session_key and _capture_requests.pop(session_key, False):
+        rerun["profiler"] = cProfile.Profile()
+        rerun["profiler"].enable()
+    _thread_state.rerun = rerun
+
+
+def finish_rerun():
+    """Closes this thread's open rerun record (if any) and adds it to the history."""
+    rerun = getattr(_thread_state, "rerun", None)
+    if rerun is None:
+        return
+    _thread_state.rerun = None
+    total_seconds = time.perf_counter() - rerun["start"]
+    if rerun["profiler"] is not None:
+        rerun["profiler"].disable()
+        _save_capture(rerun["session_key"], rerun["profiler"])
+    with _history_lock:
+        _recent_reruns.append({
+            "session_key": rerun["session_key"],
+            "started_at": rerun["started_at"],
+            "total_ms": round(1000 * total_seconds, 1),
+            "spans": rerun["spans"],
+            "profiled": rerun["profiler"] is not None,
+        })
+
+
+@contextmanager
+def span(name: str):
+    """Times a block as a named span of the current rerun (no-op outside a rerun)."""
+    rerun = getattr(_thread_state, "rerun", None)
+    if rerun is None:
+        yield
+        return
+    depth = rerun["depth"]
+    rerun["depth"] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun["depth"] = depth
+        rerun["spans"].append({"name": name, "depth": depth,
+                               "offset_ms": round(1000 * (started - rerun["start"]), 1),
+                               "ms": round(1000 * (time.perf_counter() - started), 1)})
+
+
+def profiled(name: str | None = None):
+    """Decorator form of span(); the span name defaults to the function name."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def request_capture(session_key: str):
+    """Profiles the next rerun of this user's session with cProfile."""
+    if session_key:
+        _capture_requests[session_key] = True
+
+
+def _save_capture(session_key: str, profiler: cProfile.Profile):
+    try:
+        os.makedirs(PROFILING_OUTPUT_DIR, exist_ok=True)
+        path = os.path.join(PROFILING_OUTPUT_DIR, f"rerun_{session_key}_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(25)
+        _latest_captures[session_key] = {"path": path, "summary": summary.getvalue()}
+        print(f"DEBUG: Saved rerun profile to {path}")
+    except OSError as e:
+        print(f"ERROR: Could not save rerun profile: {e}")
+
+
+def get_latest_capture(session_key: str) -> dict | None:
+    """Returns {"path", "summary"} of the user's latest captured profile, or None."""
+    return _latest_captures.get(session_key)
+
+
+def get_recent_reruns(limit: int | None = None) -> list[dict]:
+    """Most recent reruns first: {"session_key", "started_at", "total_ms", "spans", "profiled"}."""
+    with _history_lock:
+        reruns = list(reversed(_recent_reruns))
+    return reruns[:limit] if limit else reruns
+
+
+def summarize_reruns(reruns: list[dict]) -> list[dict]:
+    """One flat row per rerun (total plus top-level span times), for display as a table."""
+    rows = []
+    for rerun in reruns:
+        row = {"time": time.strftime("%H:%M:%S", time.localtime(rerun["started_at"])),
+               "user": rerun["session_key"] or "-", "total_ms": rerun["total_ms"]}
+        for recorded_span in rerun["spans"]:
+            if recorded_span["depth"] == 0:
+                row[recorded_span["name"]] = row.get(recorded_span["name"], 0) + recorded_span["ms"]
+        rows.append(row)
+    return rows
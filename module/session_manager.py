@@ -1,40 +1,288 @@
 # job_ad_generator_project/module/session_manager.py
+import threading
+import time
+from contextlib import contextmanager
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from content.predefined_data import (
     DEFAULT_JOB_AD_TEMPLATE,
     DEFAULT_JOB_DESCRIPTION,
-    PREDEFINED_TEMPLATES, # Import the dicts to check keys
-    PREDEFINED_DESCRIPTIONS
+    get_predefined_templates, # Current preset mappings (swapped on content reload)
+    get_predefined_descriptions
+)
+from configs.app_settings import (
+    CALL_SITE_PROFILES,
+    LOCALISATION_DEFAULT_LOCALES,
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_EVICTION_SWEEP_SECONDS,
 )
+from . import ad_history, cancellation, session_store, vertex_service
 
 # Determine safe default preset keys
 default_template_key = "Default Modern Template"
-if default_template_key not in PREDEFINED_TEMPLATES:
-    default_template_key = list(PREDEFINED_TEMPLATES.keys())[0] if PREDEFINED_TEMPLATES else "Custom"
-    # If even PREDEFINED_TEMPLATES is empty (e.g. no built-ins and no files), default to "Custom" and empty template
+if default_template_key not in get_predefined_templates():
+    default_template_key = list(get_predefined_templates().keys())[0] if get_predefined_templates() else "Custom"
+    # If even the template presets are empty (e.g. no built-ins and no files), default to "Custom" and empty template
 
 default_description_key = "Senior Software Engineer (Backend)"
-if default_description_key not in PREDEFINED_DESCRIPTIONS:
-    default_description_key = list(PREDEFINED_DESCRIPTIONS.keys())[0] if PREDEFINED_DESCRIPTIONS else "Custom"
+if default_description_key not in get_predefined_descriptions():
+    default_description_key = list(get_predefined_descriptions().keys())[0] if get_predefined_descriptions() else "Custom"
+
+# Session values persisted to the session store and restored when a user returns.
+# The ChatSession itself is never kept in st.session_state; see get_chat_session().
+PERSISTED_SESSION_KEYS = (
+    "job_ad_template",
+    "job_description",
+    "generated_job_ad",
+    "initial_generation_done",
+    "show_chat_interface",
+    "tone_config",
+    "max_words_config",
+    "generation_profile",
+    "speculative_generation",
+    "selected_template_preset",
+    "selected_description_preset",
+    "ad_validation_issues",
+    "localisation_locales",
+)
+
+# The large values each browser tab holds in its own st.session_state (and the widgets that
+# show them). A tab idle for SESSION_IDLE_TTL_SECONDS has them dropped from memory; its next
+# rerun restores them from the session store (see initialize_session_state).
+_LARGE_SESSION_KEYS = (
+    "job_ad_template",
+    "job_description",
+    "generated_job_ad",
+    "ad_validation_issues",
+    "job_ad_template_input_main",
+    "job_description_input_main",
+    "generated_ad_display_in_frame",
+)
+
+_browser_sessions_lock = threading.Lock()
+# browser session id -> time of its last rerun
+_browser_session_activity = {}
+_last_state_sweep = 0.0
+
+
+def get_session_key() -> str | None:
+    """
+    Returns the key under which this user's state is stored: the logged-in username.
+
+    State is deliberately per user, not per browser tab. Streamlit's session id changes on
+    every page load, so only a per-user key lets a recruiter come back to their ad and chat
+    after a reload, on another device or after a restart. All of a user's tabs therefore
+    share one stored state and one ChatSession; the tab that saved most recently wins.
+    """
+    return st.session_state.get("username")
 
 
 def initialize_session_state():
-    """Initializes all session state variables if they don't exist."""
+    """Initializes all session state variables if they don't exist, restoring persisted values first."""
+    persisted_state = session_store.load_session_state(get_session_key()) or {}
+    if persisted_state:
+        session_store.record_rehydration()
+        print(f"DEBUG: Rehydrated session state for '{get_session_key()}' from the session store.")
+
     defaults = {
-        "job_ad_template": PREDEFINED_TEMPLATES.get(default_template_key, DEFAULT_JOB_AD_TEMPLATE), # Fallback
-        "job_description": PREDEFINED_DESCRIPTIONS.get(default_description_key, DEFAULT_JOB_DESCRIPTION), # Fallback
+        "job_ad_template": get_predefined_templates().get(default_template_key, DEFAULT_JOB_AD_TEMPLATE), # Fallback
+        "job_description": get_predefined_descriptions().get(default_description_key, DEFAULT_JOB_DESCRIPTION), # Fallback
         "generated_job_ad": "",
         "initial_generation_done": False,
         "show_chat_interface": False,
-        "chat_session": None,
         "model_instance": None,
         "vertex_ai_initialized": False,
         "tone_config": "Professional & Engaging",
         "max_words_config": 0,
+        "generation_profile": CALL_SITE_PROFILES["initial_ad"],
+        "speculative_generation": False,
         "selected_template_preset": default_template_key,
         "selected_description_preset": default_description_key,
+        "ad_validation_issues": [],
+        "localisation_locales": list(LOCALISATION_DEFAULT_LOCALES),
     }
 
     for key, default_value in defaults.items():
         if key not in st.session_state:
-            st.session_state[key] = default_value
\ No newline at end of file
+            st.session_state[key] = persisted_state.get(key, default_value)
+
+
+def persist_session_state():
+    """Writes the persisted subset of st.session_state to the session store (skipped if unchanged)."""
+    session_key = get_session_key()
+    if not session_key:
+        return
+    state = {key: st.session_state.get(key) for key in PERSISTED_SESSION_KEYS if key in st.session_state}
+    session_store.save_session_state(session_key, state)
+    session_id = _browser_session_id()
+    if session_id:
+        with _browser_sessions_lock:
+            _browser_session_activity[session_id] = time.time()
+    session_store.evict_idle_sessions()
+    evict_idle_browser_state()
+
+
+def _get_browser_session_state(session_id: str):
+    """The st.session_state of another browser session, or None if it is gone or cannot be reached."""
+    try:
+        from streamlit.runtime import Runtime
+        session_info = Runtime.instance()._session_mgr.get_session_info(session_id)
+    except Exception: # No runtime (bare script/AppTest) or a Streamlit without this internal API
+        return None
+    return session_info.session.session_state if session_info is not None else None
+
+
+def evict_idle_browser_state(force: bool = False) -> int:
+    """
+    Drops the large session_state values of browser tabs that have not rerun within
+    SESSION_IDLE_TTL_SECONDS. Their values are already in the session store, so the
+    tab's next rerun initializes them again from there. Sweeps are rate-limited to
+    SESSION_EVICTION_SWEEP_SECONDS unless forced.
+
+    Returns:
+        The number of browser sessions whose state was evicted.
+    """
+    global _last_state_sweep
+    now = time.time()
+    with _browser_sessions_lock:
+        if not force and now - _last_state_sweep < SESSION_EVICTION_SWEEP_SECONDS:
+            return 0
+        _last_state_sweep = now
+        idle_session_ids = [session_id for session_id, last_active in _browser_session_activity.items()
+                            if now - last_active >= SESSION_IDLE_TTL_SECONDS]
+        for session_id in idle_session_ids:
+            del _browser_session_activity[session_id]
+
+    evicted = 0
+    for session_id in idle_session_ids:
+        session_state = _get_browser_session_state(session_id)
+        if session_state is None:
+            continue # Tab closed; Streamlit frees its state itself
+        for key in _LARGE_SESSION_KEYS + ("app_session_initialized",): # Re-initialize on the next rerun
+            if key in session_state:
+                del session_state[key]
+        evicted += 1
+    if evicted:
+        session_store.record_state_eviction(evicted)
+        print(f"DEBUG: Evicted the session state of {evicted} idle browser session(s) from memory.")
+    return evicted
+
+
+def get_chat_session():
+    """
+    Returns the live ChatSession for this user.
+
+    Served from the process-wide hot cache when possible; otherwise rebuilt from the
+    stored chat history (after idle eviction or a process restart). Returns None if
+    the user has no chat yet or the model is unavailable.
+    """
+    session_key = get_session_key()
+    chat_session = session_store.get_cached_chat_session(session_key)
+    if chat_session is not None:
+        return chat_session
+
+    history = session_store.load_chat_history(session_key)
+    if not history or not st.session_state.get('model_instance'):
+        return None
+    chat_session = vertex_service.rebuild_chat_session(st.session_state.model_instance, history)
+    if chat_session is not None:
+        session_store.record_rehydration()
+        session_store.cache_chat_session(session_key, chat_session, session_store.estimate_history_bytes(history))
+    return chat_session
+
+
+def set_chat_session(chat_session):
+    """
+    Stores (or clears, when None) this user's ChatSession: the history is persisted
+    and the live object is kept in the hot cache. Call again after each exchange
+    so the stored history stays current.
+    """
+    session_key = get_session_key()
+    if chat_session is None:
+        session_store.evict_chat_session(session_key)
+        session_store.save_chat_history(session_key, None)
+        return
+    history = vertex_service.serialize_chat_history(chat_session)
+    session_store.save_chat_history(session_key, history)
+    session_store.cache_chat_session(session_key, chat_session, session_store.estimate_history_bytes(history))
+
+
+def record_generated_ad(source: str):
+    """Appends the current generated ad and the inputs that produced it to the ad history."""
+    ad_history.record_ad(
+        st.session_state.generated_job_ad,
+        st.session_state.job_ad_template,
+        st.session_state.job_description,
+        st.session_state.tone_config,
+        st.session_state.max_words_config,
+        username=get_session_key(),
+        source=source,
+        profile=st.session_state.get("generation_profile"),
+        template_preset=st.session_state.get("selected_template_preset"),
+        description_preset=st.session_state.get("selected_description_preset"),
+    )
+
+
+def load_ad_from_history(entry: dict, open_chat: bool = False):
+    """
+    Makes a history entry the current ad, restoring the inputs and settings that produced it.
+    With open_chat, a chat primed with the ad is started so it can be refined straight away.
+    """
+    st.session_state.generated_job_ad = entry["ad_text"]
+    st.session_state.job_ad_template = entry["template"] or st.session_state.job_ad_template
+    st.session_state.job_description = entry["description"] or st.session_state.job_description
+    st.session_state.selected_template_preset = "Custom"
+    st.session_state.selected_description_preset = "Custom"
+    if entry["tone"]:
+        st.session_state.tone_config = entry["tone"]
+    st.session_state.max_words_config = entry["max_words"] or 0
+    st.session_state.ad_validation_issues = []
+    st.session_state.initial_generation_done = True
+    st.session_state.show_chat_interface = open_chat
+    chat_session = None
+    if open_chat and st.session_state.get('model_instance'):
+        chat_session = vertex_service.initialize_chat_session_with_context(
+            st.session_state.model_instance, entry["ad_text"]
+        )
+    set_chat_session(chat_session)
+    ad_history.record_reuse()
+    persist_session_state()
+
+
+def _browser_session_id() -> str | None:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def _is_browser_session_active(session_id: str) -> bool:
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance().is_active_session(session_id)
+    except Exception: # No runtime (bare script/AppTest) or an older Streamlit: assume connected
+        return True
+
+
+@contextmanager
+def model_request():
+    """
+    Yields a CancellationToken for model calls made by this rerun of this browser session.
+
+    Starting a request supersedes any request the session still has in flight. The token
+    is cancelled if the rerun is interrupted (the user submitted a new prompt or clicked
+    again, or the session stopped) and when the browser session disconnects, so worker
+    threads and response streams stop instead of running to completion.
+    """
+    session_id = _browser_session_id()
+    owner = f"ui:{session_id or get_session_key()}"
+    token = cancellation.begin_request(
+        owner, liveness_check=(lambda: _is_browser_session_active(session_id)) if session_id else None
+    )
+    try:
+        yield token
+    except BaseException as e:
+        if not isinstance(e, Exception): # Streamlit rerun/stop, not an application error
+            token.cancel(cancellation.interruption_reason(e))
+        raise
+    finally:
+        cancellation.end_request(owner, token)
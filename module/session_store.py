@@ -0,0 +1,265 @@
+# job_ad_generator_project/module/session_store.py
+
+"""
+Session Store Module
+
+This module keeps per-user session and chat state out of process memory:
+- Session state (template, description, ad, settings) is persisted to a local
+  SQLite file as compressed JSON.
+- Chat histories are persisted separately so they can be rebuilt into a
+  ChatSession when the user returns.
+- Only active ChatSession objects are kept "hot" in an LRU cache, bounded by an
+  entry count and an approximate memory budget. Idle entries are evicted.
+- State is keyed by username, so all of a user's browser tabs share it (see
+  session_manager.get_session_key); idle tabs' in-memory copies are evicted there.
+
+The module is deliberately free of Streamlit calls so it can be used from
+background threads and scripts.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from configs.app_settings import (
+    SESSION_STORE_PATH,
+    SESSION_HOT_MAX_ENTRIES,
+    SESSION_HOT_MAX_BYTES,
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_EVICTION_SWEEP_SECONDS,
+)
+
+_db_lock = threading.Lock()
+_db_connection = None
+
+# session_key -> {"chat": ChatSession, "bytes": int, "last_access": float}
+_hot_lock = threading.RLock()
+_hot_chat_sessions = OrderedDict()
+_hot_bytes_total = 0
+_last_idle_sweep = 0.0
+
+# session_key -> digest of the last payload written, to skip redundant writes
+_last_written_digests = {}
+
+_store_stats = {"state_writes": 0, "state_writes_skipped": 0, "chat_writes": 0,
+                "evictions_budget": 0, "evictions_idle": 0, "state_evictions_idle": 0, "rehydrations": 0}
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Returns the process-wide SQLite connection, creating the schema on first use."""
+    global _db_connection
+    if _db_connection is None:
+        os.makedirs(os.path.dirname(SESSION_STORE_PATH), exist_ok=True)
+        connection = sqlite3.connect(SESSION_STORE_PATH, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS session_state ("
+            " session_key TEXT PRIMARY KEY, payload BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS chat_history ("
+            " session_key TEXT PRIMARY KEY, payload BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        connection.commit()
+        _db_connection = connection
+    return _db_connection
+
+
+def _encode(value) -> bytes:
+    """Serialises a JSON-compatible value into a compact compressed blob."""
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def _decode(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _write(table: str, session_key: str, blob: bytes):
+    with _db_lock:
+        connection = _get_connection()
+        connection.execute(
+            f"INSERT INTO {table} (session_key, payload, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_key) DO UPDATE SET payload=excluded.payload, updated_at=excluded.updated_at",
+            (session_key, blob, time.time())
+        )
+        connection.commit()
+
+
+def _read(table: str, session_key: str):
+    with _db_lock:
+        row = _get_connection().execute(
+            f"SELECT payload FROM {table} WHERE session_key = ?", (session_key,)
+        ).fetchone()
+    return _decode(row[0]) if row else None
+
+
+def save_session_state(session_key: str, state: dict) -> bool:
+    """
+    Persists a session's state if it changed since the last write.
+
+    Args:
+        session_key: Identifier of the session (the logged-in username).
+        state: JSON-compatible dict of session values.
+
+    Returns:
+        True if a write was performed, False if it was skipped or failed.
+    """
+    if not session_key:
+        return False
+    try:
+        blob = _encode(state)
+        digest = hashlib.blake2b(blob, digest_size=16).digest()
+        if _last_written_digests.get(session_key) == digest:
+            _store_stats["state_writes_skipped"] += 1
+            return False
+        _write("session_state", session_key, blob)
+        _last_written_digests[session_key] = digest
+        _store_stats["state_writes"] += 1
+        return True
+    except Exception as e:
+        print(f"ERROR: Failed to persist session state for '{session_key}': {e}")
+        return False
+
+
+def load_session_state(session_key: str) -> dict | None:
+    """Loads a previously persisted session state, or None if there is none."""
+    if not session_key:
+        return None
+    try:
+        return _read("session_state", session_key)
+    except Exception as e:
+        print(f"ERROR: Failed to load session state for '{session_key}': {e}")
+        return None
+
+
+def save_chat_history(session_key: str, history: list | None):
+    """
+    Persists a serialised chat history (a list of [role, text] pairs).
+    Passing None or an empty list clears the stored history.
+    """
+    if not session_key:
+        return
+    try:
+        if history:
+            _write("chat_history", session_key, _encode(history))
+        else:
+            with _db_lock:
+                connection = _get_connection()
+                connection.execute("DELETE FROM chat_history WHERE session_key = ?", (session_key,))
+                connection.commit()
+        _store_stats["chat_writes"] += 1
+    except Exception as e:
+        print(f"ERROR: Failed to persist chat history for '{session_key}': {e}")
+
+
+def load_chat_history(session_key: str) -> list | None:
+    """Loads a serialised chat history, or None if none is stored."""
+    if not session_key:
+        return None
+    try:
+        return _read("chat_history", session_key)
+    except Exception as e:
+        print(f"ERROR: Failed to load chat history for '{session_key}': {e}")
+        return None
+
+
+def estimate_history_bytes(history: list | None) -> int:
+    """Rough in-memory footprint of a chat history, used for the hot-cache budget."""
+    if not history:
+        return 0
+    # Python str objects plus the SDK's Content/Part wrappers roughly double the raw text size.
+    return sum(2 * len(text) + 512 for _, text in history)
+
+
+def cache_chat_session(session_key: str, chat_session, approx_bytes: int):
+    """Places (or refreshes) a live ChatSession in the hot cache and enforces the budget."""
+    global _hot_bytes_total
+    if not session_key or chat_session is None:
+        return
+    with _hot_lock:
+        previous = _hot_chat_sessions.pop(session_key, None)
+        if previous:
+            _hot_bytes_total -= previous["bytes"]
+        _hot_chat_sessions[session_key] = {"chat": chat_session, "bytes": approx_bytes, "last_access": time.time()}
+        _hot_bytes_total += approx_bytes
+        _enforce_budget()
+
+
+def get_cached_chat_session(session_key: str):
+    """Returns the hot ChatSession for a session (marking it recently used), or None."""
+    with _hot_lock:
+        entry = _hot_chat_sessions.get(session_key)
+        if entry is None:
+            return None
+        entry["last_access"] = time.time()
+        _hot_chat_sessions.move_to_end(session_key)
+        return entry["chat"]
+
+
+def evict_chat_session(session_key: str):
+    """Drops a session's ChatSession from the hot cache. Its stored history is kept."""
+    global _hot_bytes_total
+    with _hot_lock:
+        entry = _hot_chat_sessions.pop(session_key, None)
+        if entry:
+            _hot_bytes_total -= entry["bytes"]
+
+
+def record_rehydration():
+    _store_stats["rehydrations"] += 1
+
+
+def record_state_eviction(count: int):
+    """Counts browser sessions whose in-memory session state was dropped (see session_manager)."""
+    _store_stats["state_evictions_idle"] += count
+
+
+def _enforce_budget():
+    """Evicts least-recently-used chat sessions until the entry and byte budgets are met."""
+    global _hot_bytes_total
+    while _hot_chat_sessions and (len(_hot_chat_sessions) > SESSION_HOT_MAX_ENTRIES or
+                                  _hot_bytes_total > SESSION_HOT_MAX_BYTES):
+        _, entry = _hot_chat_sessions.popitem(last=False)
+        _hot_bytes_total -= entry["bytes"]
+        _store_stats["evictions_budget"] += 1
+
+
+def evict_idle_sessions(force: bool = False) -> int:
+    """
+    Evicts chat sessions that have not been used within SESSION_IDLE_TTL_SECONDS.
+    Sweeps are rate-limited to SESSION_EVICTION_SWEEP_SECONDS unless forced.
+
+    Returns:
+        The number of sessions evicted.
+    """
+    global _last_idle_sweep, _hot_bytes_total
+    now = time.time()
+    if not force and now - _last_idle_sweep < SESSION_EVICTION_SWEEP_SECONDS:
+        return 0
+    _last_idle_sweep = now
+    evicted = 0
+    with _hot_lock:
+        # Entries are kept in LRU order, so idle ones are at the front.
+        while _hot_chat_sessions:
+            session_key, entry = next(iter(_hot_chat_sessions.items()))
+            if now - entry["last_access"] < SESSION_IDLE_TTL_SECONDS:
+                break
+            _hot_chat_sessions.popitem(last=False)
+            _hot_bytes_total -= entry["bytes"]
+            evicted += 1
+    if evicted:
+        _store_stats["evictions_idle"] += evicted
+        print(f"DEBUG: Evicted {evicted} idle chat session(s) from memory.")
+    return evicted
+
+
+def get_store_stats() -> dict:
+    """Returns counters and current hot-cache usage for monitoring and benchmarks."""
+    with _hot_lock:
+        return dict(_store_stats, hot_sessions=len(_hot_chat_sessions), hot_bytes=_hot_bytes_total)
@@ -0,0 +1,209 @@
+# job_ad_generator_project/module/speculation.py
+
+"""
+Speculative Pre-Generation Module
+
+While a recruiter picks presets and adjusts the tone, the model is idle. With
+speculative pre-generation switched on, each script rerun reports the current
+generation inputs here; once they have been stable for SPECULATIVE_DEBOUNCE_SECONDS
+an ad is generated in the background and stored in the generation cache, so the
+Generate click can return it immediately (or wait for the in-flight call instead
+of starting a new one).
+
+Guards:
+- Changing the inputs cancels the pending or in-flight speculation for that user
+  (the response stream is abandoned between chunks).
+- Background generations run on a small dedicated pool (SPECULATIVE_MAX_CONCURRENT)
+  at reduced OS scheduling priority, so they never compete with real requests for
+  more than a couple of threads.
+- Each user may start at most SPECULATIVE_MAX_PER_USER_PER_HOUR speculations.
+
+No Streamlit calls; the speculation runs on background threads.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from configs.app_settings import (
+    SPECULATIVE_DEBOUNCE_SECONDS,
+    SPECULATIVE_MAX_CONCURRENT,
+    SPECULATIVE_MAX_PER_USER_PER_HOUR,
+    SPECULATIVE_MAX_WAIT_SECONDS,
+)
+from . import cancellation, generation_cache, vertex_service
+
+_QUOTA_WINDOW_SECONDS = 3600
+_WAIT_POLL_SECONDS = 0.5
+
+
+def _lower_thread_priority():
+    try:
+        # On Linux the nice value is per thread, so this only affects the speculation workers
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_MAX_CONCURRENT, thread_name_prefix="speculative-generation",
+                               initializer=_lower_thread_priority)
+
+_speculation_lock = threading.Lock()
+# session_key -> {"key": input key, "timer": Timer | None, "future": Future | None, "cancel_token": CancellationToken}
+_user_speculations = {}
+# session_key -> launch times within the quota window
+_user_launch_times = {}
+
+_speculation_stats = {"scheduled": 0, "launched": 0, "completed": 0, "cancelled": 0, "failed": 0,
+                      "skipped_quota": 0, "used": 0, "used_after_waiting": 0}
+
+
+def _cancel_locked(speculation: dict, reason: str):
+    """Cancels a pending or running speculation. Caller holds _speculation_lock."""
+    if speculation["timer"] is not None:
+        speculation["timer"].cancel()
+    future = speculation["future"]
+    if not speculation["cancel_token"].cancelled and (future is None or not future.done()):
+        if speculation["timer"] is not None or future is not None:
+            _speculation_stats["cancelled"] += 1
+        speculation["cancel_token"].cancel(reason)
+
+
+def _quota_available_locked(session_key: str) -> bool:
+    launch_times = _user_launch_times.setdefault(session_key, deque())
+    while launch_times and time.monotonic() - launch_times[0] > _QUOTA_WINDOW_SECONDS:
+        launch_times.popleft()
+    return len(launch_times) < SPECULATIVE_MAX_PER_USER_PER_HOUR
+
+
+def schedule_speculation(session_key: str, model, template: str, description: str, tone: str, max_words: int,
+                         profile_name: str | None = None):
+    """
+    Reports the current generation inputs for a user. Call on every script rerun while
+    the user has speculation switched on; only changes in the inputs have an effect.
+    """
+    if not session_key or model is None or not template or not description:
+        return
+    key = generation_cache.make_generation_key(template, description, tone, max_words, profile_name)
+    with _speculation_lock:
+        current = _user_speculations.get(session_key)
+        if current is not None:
+            if current["key"] == key:
+                return # Already pending, running or done for these inputs
+            _cancel_locked(current, "input_changed")
+
+        speculation = {"key": key, "timer": None, "future": None, "cancel_token": cancellation.CancellationToken()}
+        _user_speculations[session_key] = speculation
+        if generation_cache.contains(key, session_key):
+            return
+        speculation["timer"] = threading.Timer(
+            SPECULATIVE_DEBOUNCE_SECONDS, _launch,
+            args=(session_key, speculation, model, template, description, tone, max_words, profile_name)
+        )
+        speculation["timer"].daemon = True
+        speculation["timer"].start()
+        _speculation_stats["scheduled"] += 1
+
+
+def _launch(session_key, speculation, model, template, description, tone, max_words, profile_name):
+    """Debounce expired: start the background generation unless cancelled or over quota."""
+    with _speculation_lock:
+        speculation["timer"] = None
+        if speculation["cancel_token"].cancelled or _user_speculations.get(session_key) is not speculation:
+            return
+        if not _quota_available_locked(session_key):
+            _speculation_stats["skipped_quota"] += 1
+            print(f"DEBUG: Speculative generation skipped for '{session_key}': hourly quota reached.")
+            return
+        _user_launch_times[session_key].append(time.monotonic())
+        _speculation_stats["launched"] += 1
+        speculation["future"] = _executor.submit(
+            _run, session_key, speculation, model, template, description, tone, max_words, profile_name
+        )
+
+
+def _run(session_key, speculation, model, template, description, tone, max_words, profile_name) -> str | None:
+    if speculation["cancel_token"].cancelled:
+        return None
+    try:
+        generated_text = vertex_service.generate_initial_ad_in_background(
+            model, template, description, tone, max_words, speculation["cancel_token"], profile_name
+        )
+    except Exception as e:
+        _speculation_stats["failed"] += 1
+        print(f"WARNING: Speculative generation failed: {e}")
+        return None
+    if generated_text:
+        generation_cache.store(speculation["key"], generated_text, source="speculative", username=session_key)
+        _speculation_stats["completed"] += 1
+    return generated_text
+
+
+def take_speculative_result(session_key: str, key: str, wait_seconds: float = SPECULATIVE_MAX_WAIT_SECONDS,
+                            on_wait=None) -> str | None:
+    """
+    Returns a pre-generated ad for these inputs from the generation cache (a speculation,
+    or a batch result this user imported), or None if there is none.
+
+    If the speculation for these inputs is still running it is waited for (it has a
+    head start on a fresh call), for at most wait_seconds; if it is still in its debounce
+    period it is cancelled, since the caller is about to generate anyway.
+
+    Args:
+        session_key: The user's session key (their username).
+        key: The generation key of the inputs (see generation_cache.make_generation_key).
+        wait_seconds: Longest wait for an in-flight speculation.
+        on_wait: Optional callback(seconds waited), called about twice a second while waiting.
+                 Its Streamlit calls double as checkpoints at which a rerun or stop interrupts
+                 the wait; the speculation keeps running and its result stays in the cache.
+    """
+    with _speculation_lock:
+        speculation = _user_speculations.get(session_key)
+        future = None
+        if speculation is not None and speculation["key"] == key:
+            if speculation["timer"] is not None:
+                speculation["timer"].cancel()
+                speculation["timer"] = None
+                speculation["cancel_token"].cancel("generate_clicked")
+            future = speculation["future"]
+
+    waited = future is not None and not future.done()
+    if waited:
+        started = time.monotonic()
+        while not future.done():
+            waited_seconds = time.monotonic() - started
+            if waited_seconds >= wait_seconds:
+                print("WARNING: Timed out waiting for the in-flight speculative generation.")
+                break
+            try:
+                future.result(timeout=min(_WAIT_POLL_SECONDS, wait_seconds - waited_seconds))
+            except FutureTimeoutError:
+                if on_wait:
+                    on_wait(time.monotonic() - started)
+
+    entry = generation_cache.take(key, username=session_key) # session_key is the logged-in username
+    if entry is None:
+        return None
+    if entry["source"] != "speculative":
+        return entry["text"]
+    _speculation_stats["used"] += 1
+    if waited:
+        _speculation_stats["used_after_waiting"] += 1
+    return entry["text"]
+
+
+def cancel_speculation(session_key: str):
+    """Cancels the user's pending or running speculation (e.g. when they switch the feature off)."""
+    with _speculation_lock:
+        speculation = _user_speculations.pop(session_key, None)
+        if speculation is not None:
+            _cancel_locked(speculation, "speculation_disabled")
+
+
+def get_speculation_stats() -> dict:
+    """Counters, plus the share of completed speculations that were used."""
+    stats = dict(_speculation_stats)
+    stats["use_rate_pct"] = round(100 * stats["used"] / stats["completed"], 1) if stats["completed"] else None
+    return stats
@@ -1,9 +1,18 @@
 # job_ad_generator_project/module/ui_components.py
+import time
+
 import streamlit as st
-from configs.app_settings import ABSOLUTE_LOGO_PATH
-from content.predefined_data import PREDEFINED_TEMPLATES, PREDEFINED_DESCRIPTIONS
-from . import vertex_service # Relative import for sibling module
+from configs.app_settings import (
+    ABSOLUTE_LOGO_PATH, SECTIONED_GENERATION_ENABLED, GENERATION_PROFILES, SPECULATIVE_GENERATION_ENABLED,
+    ADMIN_USERNAMES, PROFILING_ENABLED, LOCALISATION_LOCALES
+)
+from content.predefined_data import get_predefined_templates, get_predefined_descriptions, get_template_source_paths
+from . import (
+    ad_history, ad_sections, ad_validation, cancellation, docx_export, generation_cache, localisation, profiling,
+    session_manager, session_store, speculation, vertex_service
+) # Relative import for sibling modules
 
+@profiling.profiled()
 def render_sidebar(authenticator): # Authenticator is passed in
     """Renders the sidebar contents, including login/logout and app configurations."""
     with st.sidebar:
@@ -38,11 +47,32 @@ def render_sidebar(authenticator): # Authenticator is passed in
                 "Approximate Max Words:", min_value=0, value=st.session_state.get('max_words_config', 0),
                 step=50, key="max_words_config_input"
             )
+            profile_names = list(GENERATION_PROFILES.keys())
+            current_profile = st.session_state.get('generation_profile', "final")
+            st.session_state.generation_profile = st.selectbox(
+                "Generation Profile:", options=profile_names,
+                index=profile_names.index(current_profile) if current_profile in profile_names else 0,
+                format_func=lambda name: GENERATION_PROFILES[name]["label"], key="generation_profile_sb",
+                help="Draft is faster and looser; Final favours quality. Chat refinements always use the Refinement profile."
+            )
+            if SPECULATIVE_GENERATION_ENABLED:
+                st.session_state.speculative_generation = st.checkbox(
+                    "⚡ Pre-generate while I choose", value=st.session_state.get('speculative_generation', False),
+                    key="speculative_generation_cb",
+                    help="Starts generating in the background once your inputs stop changing, "
+                         "so Generate returns almost instantly. Uses extra model calls."
+                )
+                if not st.session_state.speculative_generation:
+                    speculation.cancel_speculation(session_manager.get_session_key())
             st.markdown("---")
             st.subheader("Load Presets")
 
+            # Take one snapshot of the presets per rerun; a content reload swaps in new mappings
+            predefined_templates = get_predefined_templates()
+            predefined_descriptions = get_predefined_descriptions()
+
             # Template Presets
-            template_preset_options = ["Custom"] + list(PREDEFINED_TEMPLATES.keys())
+            template_preset_options = ["Custom"] + list(predefined_templates.keys())
             # Store current value before widget to compare for changes, avoiding immediate rerun loop
             key_tp_before = 'selected_template_preset_before_widget'
             st.session_state[key_tp_before] = st.session_state.get('selected_template_preset', "Custom")
@@ -56,12 +86,12 @@ def render_sidebar(authenticator): # Authenticator is passed in
             if selected_template_key != st.session_state[key_tp_before]:
                 st.session_state.selected_template_preset = selected_template_key
                 if selected_template_key != "Custom":
-                    st.session_state.job_ad_template = PREDEFINED_TEMPLATES[selected_template_key]
+                    st.session_state.job_ad_template = predefined_templates[selected_template_key]
                 # No need to pop key_tp_before, it will be overwritten next run correctly
                 st.rerun()
 
             # Description Presets
-            description_preset_options = ["Custom"] + list(PREDEFINED_DESCRIPTIONS.keys())
+            description_preset_options = ["Custom"] + list(predefined_descriptions.keys())
             key_dp_before = 'selected_description_preset_before_widget'
             st.session_state[key_dp_before] = st.session_state.get('selected_description_preset', "Custom")
             current_dp_index = description_preset_options.index(st.session_state[key_dp_before]) \
@@ -74,43 +104,18 @@ def render_sidebar(authenticator): # Authenticator is passed in
             if selected_description_key != st.session_state[key_dp_before]:
                 st.session_state.selected_description_preset = selected_description_key
                 if selected_description_key != "Custom":
-                    st.session_state.job_description = PREDEFINED_DESCRIPTIONS[selected_description_key]
+                    st.session_state.job_description = predefined_descriptions[selected_description_key]
                 st.rerun()
+
+            if PROFILING_ENABLED and session_manager.get_session_key() in ADMIN_USERNAMES:
+                st.markdown("---")
+                render_performance_panel()
         elif st.session_state.get("authentication_status") is False and 'authenticator' in st.session_state:
              # If login failed (handled by app.py's main area), sidebar shows minimal info or can be empty here.
              # st.sidebar.error("Login failed. Check credentials.") # Or handled in main.
              pass 
 
-def _clean_ai_response_for_ad_update(raw_response_text: str) -> str:
-    """Attempts to strip common conversational preambles from the AI's response."""
-    cleaned_text = raw_response_text.strip()
-    # Order preambles from more specific/longer to shorter to avoid premature shorter matches
-    preambles = [
-        "Okay, here's the revised job ad incorporating your changes:",
-        "Alright, I've updated the job ad as requested. Here it is:",
-        "Okay, here's a revised job ad incorporating", # Note: this is a substring of one above
-        "Okay, here's the revised job ad:",
-        "Sure, here is the updated version:",
-        "Here's the updated job advertisement:",
-        "Okay, I've updated the ad:",
-        "Here's the revised ad:",
-        "Here it is:",
-    ]
-    for preamble in preambles:
-        if cleaned_text.lower().startswith(preamble.lower()):
-            # Strip preamble and leading whitespace from the rest
-            potential_ad_content = cleaned_text[len(preamble):].lstrip()
-            # Heuristic: check if the remaining text plausibly starts a job ad
-            if potential_ad_content and (
-                potential_ad_content.lower().startswith("**job title:**") or \
-                potential_ad_content.lower().startswith("job title:") or \
-                potential_ad_content.lower().startswith("**position title:**") or \
-                potential_ad_content.lower().startswith("position title:")
-            ):
-                return potential_ad_content # Return the stripped content
-    return raw_response_text.strip() # Return original (but stripped) if no preamble matched
-
-
+@profiling.profiled()
 def render_generated_ad_output():
     """Renders the 'Review and Refine' section, with a frame around the ad content."""
     
@@ -139,6 +144,10 @@ def render_generated_ad_output():
             )
         # --- End of Frame for Ad Content ---
 
+        if st.session_state.get('ad_validation_issues'):
+            st.warning("Some checks still fail after an automatic fix. Review the ad or ask the chat to fix:\n"
+                       + ad_validation.describe_issues(st.session_state.ad_validation_issues))
+
         # Buttons are OUTSIDE and BELOW the ad content frame
         # st.markdown("---") # Visual separator
         
@@ -156,24 +165,267 @@ def render_generated_ad_output():
             if st.button("💬 Fine-tune with AI Chat", use_container_width=True, key="finetune_btn_main_ui"):
                 st.session_state.show_chat_interface = not st.session_state.show_chat_interface
                 # Initialize chat session if it's being shown for the first time OR if it's empty
+                current_chat_session = session_manager.get_chat_session() if st.session_state.show_chat_interface else None
                 if st.session_state.show_chat_interface and \
-                   (st.session_state.get('chat_session') is None or \
-                    not hasattr(st.session_state.chat_session, 'history') or \
-                    (hasattr(st.session_state.chat_session, 'history') and not st.session_state.chat_session.history)): # Check for empty history too
+                   (current_chat_session is None or \
+                    not hasattr(current_chat_session, 'history') or \
+                    (hasattr(current_chat_session, 'history') and not current_chat_session.history)): # Check for empty history too
                     if st.session_state.get('model_instance') and st.session_state.get('generated_job_ad'):
-                        st.session_state.chat_session = vertex_service.initialize_chat_session_with_context(
+                        session_manager.set_chat_session(vertex_service.initialize_chat_session_with_context(
                             st.session_state.model_instance, st.session_state.generated_job_ad
-                        )
+                        ))
                     else:
                         st.warning("Cannot initialize chat: Model or generated ad not ready.")
                 st.rerun()
         
+        render_docx_export_panel()
+        if SECTIONED_GENERATION_ENABLED:
+            render_section_regeneration()
+        render_localisation_panel()
+
         # No horizontal line immediately after buttons, chat interface will follow if active.
 
     elif not st.session_state.get('initial_generation_done', False) and st.session_state.get('vertex_ai_initialized', False):
          st.info("👆 Provide template and description, then click 'Generate Job Ad'.")
 
 
+@profiling.profiled()
+def render_docx_export_panel():
+    """Renders a download of the ad filled into one of the branded Word templates."""
+    word_templates = get_template_source_paths()
+    if not docx_export.is_available() or not word_templates:
+        return
+    with st.expander("📄 Export to Word (.docx)", expanded=False):
+        template_options = list(word_templates)
+        default_path = docx_export.resolve_template_path(st.session_state.get('selected_template_preset'))
+        default_index = next((index for index, key in enumerate(template_options) if word_templates[key] == default_path), 0)
+        selected_template = st.selectbox("Word template:", options=template_options, index=default_index,
+                                         key="docx_export_template_sb")
+        try:
+            document_bytes = docx_export.render_ad_docx(st.session_state.generated_job_ad, word_templates[selected_template])
+        except Exception as e:
+            st.error(f"Could not render the Word document: {e}")
+            print(f"ERROR: Word export failed: {e}")
+            return
+        st.download_button(
+            label="📥 Download (.docx)", data=document_bytes, file_name="job_advertisement.docx",
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            use_container_width=True, key="download_docx_btn_main_ui"
+        )
+
+
+@profiling.profiled()
+def render_section_regeneration():
+    """Renders controls to regenerate a single section of the ad, leaving the other sections untouched."""
+    template_titles = {ad_sections.normalize_title(section["title"])
+                       for section in ad_sections.parse_sections(st.session_state.job_ad_template)}
+    section_titles = [section["title"] for section in ad_sections.parse_sections(st.session_state.generated_job_ad)
+                      if ad_sections.normalize_title(section["title"]) in template_titles]
+    if len(section_titles) < 2:
+        return # Nothing to choose between; a full regeneration is equivalent
+
+    with st.expander("🔁 Regenerate a single section", expanded=False):
+        selected_section_title = st.selectbox(
+            "Section:", options=section_titles, key="regenerate_section_sb"
+        )
+        if st.button("Regenerate Section", use_container_width=True, key="regenerate_section_btn"):
+            if not st.session_state.get('model_instance'):
+                st.error("Vertex AI model not available. Cannot regenerate section.")
+                return
+            with st.spinner(f"Regenerating '{selected_section_title}'..."), \
+                    session_manager.model_request() as cancel_token:
+                updated_ad = vertex_service.regenerate_ad_section(
+                    st.session_state.model_instance,
+                    st.session_state.generated_job_ad,
+                    st.session_state.job_ad_template,
+                    selected_section_title,
+                    st.session_state.job_description,
+                    st.session_state.tone_config,
+                    st.session_state.max_words_config,
+                    st.session_state.generation_profile,
+                    cancel_token
+                )
+            if updated_ad:
+                st.session_state.generated_job_ad = updated_ad
+                st.session_state.ad_validation_issues = ad_validation.validate_ad(
+                    updated_ad, st.session_state.job_ad_template, st.session_state.max_words_config
+                )
+                session_manager.set_chat_session(None) # Chat context refers to the previous ad
+                session_manager.record_generated_ad("section")
+                session_manager.persist_session_state()
+                st.rerun()
+
+
+@profiling.profiled()
+def render_localisation_panel():
+    """Renders the multi-language view: translations of the current ad in one tab per locale, with downloads."""
+    with st.expander("🌐 Localise into other languages", expanded=False):
+        selected_locales = st.multiselect(
+            "Target locales:", options=list(LOCALISATION_LOCALES),
+            default=[locale for locale in st.session_state.localisation_locales if locale in LOCALISATION_LOCALES],
+            format_func=lambda locale: f"{LOCALISATION_LOCALES[locale]} ({locale})", key="localisation_locales_ms"
+        )
+        if selected_locales != st.session_state.localisation_locales:
+            st.session_state.localisation_locales = selected_locales
+        if not selected_locales:
+            st.caption("Choose one or more locales to translate the ad into.")
+            return
+
+        ad_text = st.session_state.generated_job_ad
+        translations = localisation.get_cached_translations(ad_text, selected_locales)
+        missing_locales = [locale for locale in selected_locales if locale not in translations]
+        translate_clicked = st.button(
+            f"Translate into {len(missing_locales)} locale(s)" if missing_locales else "All selected locales translated",
+            disabled=not missing_locales, use_container_width=True, key="localisation_translate_btn"
+        )
+
+        # One body and one download slot per tab, filled now from the cache and while translations stream in
+        slots = {}
+        for locale, tab in zip(selected_locales, st.tabs([locale for locale in selected_locales])):
+            with tab:
+                slots[locale] = (st.container(height=300).empty(), st.empty())
+
+        def show_translation(locale: str, text: str, done: bool):
+            body_slot, download_slot = slots[locale]
+            body_slot.markdown(text if done else text + " ▌")
+            if done:
+                download_slot.download_button(
+                    label=f"📥 Download {LOCALISATION_LOCALES[locale]} (.txt)", data=text,
+                    file_name=f"job_advertisement_{locale}.txt", mime="text/plain",
+                    use_container_width=True, key=f"localisation_download_{locale}"
+                )
+
+        for locale in selected_locales:
+            if locale in translations:
+                show_translation(locale, translations[locale], True)
+            elif not translate_clicked:
+                slots[locale][0].caption("Not translated yet.")
+
+        if translate_clicked:
+            if not st.session_state.get('model_instance'):
+                st.error("Vertex AI model not available. Cannot translate the ad.")
+                return
+            for locale in missing_locales:
+                slots[locale][0].caption("Translating...")
+            with session_manager.model_request() as cancel_token:
+                result = localisation.translate_ad(
+                    st.session_state.model_instance, ad_text, missing_locales, cancel_token,
+                    on_update=show_translation
+                )
+            for locale, message in result["errors"].items():
+                slots[locale][0].error(f"Translation failed: {message}")
+            if result["translations"]:
+                st.caption(f"Translated {len(result['translations']) - len(result['cached'])} locale(s) "
+                           f"in {result['seconds']:.1f}s.")
+
+
+@profiling.profiled()
+def render_ad_history_panel():
+    """
+    Renders a searchable list of previously generated ads that can be reused without a model call.
+    Expander bodies run on every rerun even when collapsed, so the history is only queried once
+    the user searches or switches on "Show recent".
+    """
+    with st.expander("🕘 Ad History (search and reuse past ads)", expanded=False):
+        search_col, scope_col = st.columns([3, 1])
+        with search_col:
+            query = st.text_input("Search past ads:", key="ad_history_query",
+                                  placeholder="e.g. backend engineer python remote")
+        with scope_col:
+            only_mine = st.checkbox("Only mine", value=True, key="ad_history_only_mine")
+            show_recent = st.toggle("Show recent", key="ad_history_show_recent")
+        if not query.strip() and not show_recent:
+            st.caption("Search above, or switch on \"Show recent\" to list the latest ads.")
+            return
+        entries = ad_history.search_history(query, username=session_manager.get_session_key() if only_mine else None)
+        if not entries:
+            st.caption("No matching ads yet." if query else "Generated ads will appear here.")
+            return
+
+        for entry in entries:
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created_at"]))
+            first_line = next((line.strip("*# ") for line in entry["ad_text"].splitlines() if line.strip()), "")
+            with st.container(border=True):
+                st.markdown(f"**{first_line[:80]}**")
+                st.caption(f"{created} · {entry['username'] or 'unknown'} · {entry['tone'] or 'default tone'}"
+                           f" · {entry['description_preset'] or 'Custom'}")
+                reuse_col, template_col, chat_col = st.columns(3)
+                with reuse_col:
+                    if st.button("Use Ad", key=f"history_use_{entry['id']}", use_container_width=True):
+                        session_manager.load_ad_from_history(entry)
+                        st.rerun()
+                with template_col:
+                    if st.button("Use as Template", key=f"history_template_{entry['id']}", use_container_width=True):
+                        st.session_state.job_ad_template = entry["ad_text"]
+                        st.session_state.selected_template_preset = "Custom"
+                        ad_history.record_reuse()
+                        session_manager.persist_session_state()
+                        st.rerun()
+                with chat_col:
+                    if st.button("Refine in Chat", key=f"history_chat_{entry['id']}", use_container_width=True):
+                        session_manager.load_ad_from_history(entry, open_chat=True)
+                        st.rerun()
+
+
+@profiling.profiled("chat_history")
+def _render_chat_history(chat_session):
+    """Renders the chat log (all past messages) inside the chat container."""
+    if chat_session and hasattr(chat_session, 'history') and chat_session.history:
+        for message in chat_session.history:
+            role_map = {"user": "user", "model": "assistant"}
+            message_role_str = role_map.get(message.role, "assistant") # Default to assistant
+            with st.chat_message(message_role_str):
+                msg_text = ""
+                if message.parts: # Check if parts exist and is not empty
+                    try: 
+                        msg_text = message.parts[0].text
+                    except AttributeError: # If parts[0] doesn't have .text (e.g. not a Part object)
+                        msg_text = str(message.parts[0]) 
+                    except IndexError: # If message.parts is an empty list
+                        msg_text = "*AI processing or empty message part.*"
+                if msg_text: 
+                    st.markdown(msg_text)
+                else: # If msg_text ended up empty (e.g. parts existed but text was empty)
+                    st.markdown("*AI processing or empty message part.*")
+    else:
+        st.info("Chat history is empty. Start by asking the AI to refine the ad.")
+
+
+def render_performance_panel():
+    """Admin-only sidebar panel: per-phase timings of recent reruns, service counters and profile capture."""
+    with st.expander("🛠️ Performance (admin)", expanded=False):
+        rerun_count = st.slider("Reruns to show:", min_value=5, max_value=50, value=15, step=5, key="perf_rerun_count")
+        rows = profiling.summarize_reruns(profiling.get_recent_reruns(rerun_count))
+        if rows:
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+        else:
+            st.caption("No reruns recorded yet.")
+
+        session_key = session_manager.get_session_key()
+        if st.button("Profile next rerun (cProfile)", key="perf_capture_btn", use_container_width=True):
+            profiling.request_capture(session_key)
+            st.rerun()
+        latest_capture = profiling.get_latest_capture(session_key)
+        if latest_capture:
+            st.caption(f"Last capture: `{latest_capture['path']}`")
+            st.code(latest_capture["summary"], language="text")
+
+        st.markdown("**Service counters**")
+        st.json({
+            "generation_profiles": vertex_service.get_generation_profile_stats(),
+            "validation": ad_validation.get_validation_stats(),
+            "session_store": session_store.get_store_stats(),
+            "generation_cache": generation_cache.get_cache_stats(),
+            "speculation": speculation.get_speculation_stats(),
+            "ad_history": ad_history.get_history_stats(),
+            "cancellation": cancellation.get_cancellation_stats(),
+            "localisation": localisation.get_localisation_stats(),
+            "stream_resume": vertex_service.get_stream_resume_stats(),
+            "docx_export": docx_export.get_export_stats(),
+        }, expanded=False)
+
+
+@profiling.profiled()
 def render_chat_interface():
     """Renders the chat interface for fine-tuning. This appears below the ad output and buttons."""
     chat_container_height = 300 # Fixed height for the scrollable chat log
@@ -187,51 +439,58 @@ def render_chat_interface():
         container_border_for_chat = True # Set to False for no border if preferred or for older Streamlit
         with st.container(height=chat_container_height, border=container_border_for_chat): 
             # Ensure chat session is initialized if it's supposed to be shown but is missing
-            if st.session_state.get('chat_session') is None:
+            # (rebuilt from stored history if it was evicted from memory while idle)
+            chat_session = session_manager.get_chat_session()
+            if chat_session is None:
                 if st.session_state.get('model_instance') and st.session_state.get('generated_job_ad'):
-                    st.session_state.chat_session = vertex_service.initialize_chat_session_with_context(
+                    chat_session = vertex_service.initialize_chat_session_with_context(
                         st.session_state.model_instance, st.session_state.generated_job_ad
                     )
-                if st.session_state.get('chat_session') is None: # Still None after attempt
+                    session_manager.set_chat_session(chat_session)
+                if chat_session is None: # Still None after attempt
                     st.warning("Chat session could not be initialized. Try generating an ad again.")
                     return 
 
             # Display chat history
-            if st.session_state.chat_session and hasattr(st.session_state.chat_session, 'history') and st.session_state.chat_session.history:
-                for message in st.session_state.chat_session.history:
-                    role_map = {"user": "user", "model": "assistant"}
-                    message_role_str = role_map.get(message.role, "assistant") # Default to assistant
-                    with st.chat_message(message_role_str):
-                        msg_text = ""
-                        if message.parts: # Check if parts exist and is not empty
-                            try: 
-                                msg_text = message.parts[0].text
-                            except AttributeError: # If parts[0] doesn't have .text (e.g. not a Part object)
-                                msg_text = str(message.parts[0]) 
-                            except IndexError: # If message.parts is an empty list
-                                msg_text = "*AI processing or empty message part.*"
-                        if msg_text: 
-                            st.markdown(msg_text)
-                        else: # If msg_text ended up empty (e.g. parts existed but text was empty)
-                            st.markdown("*AI processing or empty message part.*")
-            else:
-                st.info("Chat history is empty. Start by asking the AI to refine the ad.")
+            _render_chat_history(chat_session)
         
         # Chat input is BELOW the bordered chat log container
         if user_chat_prompt := st.chat_input("How can I refine the ad for you? (e.g., 'Make it more formal')", key="chat_refine_input_main_ui"): # Unique key
-            if st.session_state.chat_session:
+            if chat_session:
                 # The user's prompt will be added to history by the SDK when send_message is called.
                 # The chat_message context here is for the AI's *response*.
                 with st.chat_message("assistant"): 
                     message_placeholder = st.empty() # For streaming AI response
-                    raw_ai_response, success = vertex_service.send_chat_message(
-                        st.session_state.chat_session,
-                        user_chat_prompt,
-                        message_placeholder
-                    )
+                    with session_manager.model_request() as cancel_token:
+                        raw_ai_response, success = vertex_service.send_chat_message(
+                            chat_session,
+                            user_chat_prompt,
+                            message_placeholder,
+                            st.session_state.max_words_config,
+                            st.session_state.tone_config,
+                            cancel_token,
+                            st.session_state.get('model_instance')
+                        )
+                    cleaned_ad_for_update = None
                     if success and raw_ai_response is not None:
-                        cleaned_ad_for_update = _clean_ai_response_for_ad_update(raw_ai_response)
+                        # Sections are not checked here: the user may have asked to remove one
+                        cleaned_ad_for_update, st.session_state.ad_validation_issues = vertex_service.validate_and_repair(
+                            st.session_state.model_instance,
+                            raw_ai_response,
+                            st.session_state.job_ad_template,
+                            st.session_state.job_description,
+                            st.session_state.tone_config,
+                            st.session_state.max_words_config,
+                            check_sections=False
+                        )
+                        if cleaned_ad_for_update != raw_ai_response:
+                            # Keep the cleaned/repaired ad in the history, so the next refinement builds on it
+                            vertex_service.replace_last_model_turn(chat_session, cleaned_ad_for_update)
+                    session_manager.set_chat_session(chat_session) # Persist the updated history
+                    if cleaned_ad_for_update is not None:
                         st.session_state.generated_job_ad = cleaned_ad_for_update
+                        session_manager.record_generated_ad("chat")
+                        session_manager.persist_session_state()
                         st.rerun() # This re-renders the entire UI, including the chat history
             else:
                 st.error("Chat session not available. Please try clicking 'Fine-tune with AI Chat' again.")
\ No newline at end of file
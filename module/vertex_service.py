@@ -11,9 +11,14 @@ This module handles all interactions with Google Vertex AI, including:
 
 import streamlit as st
 import vertexai
-from vertexai.generative_models import GenerativeModel, ChatSession, Part, Content
+from vertexai.generative_models import GenerativeModel, ChatSession, Part, Content, GenerationConfig
 from google.oauth2 import service_account # For loading credentials from a key file
+from google.api_core import exceptions as google_exceptions
+import math
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Import necessary configurations from the central application settings
 from configs.app_settings import (
@@ -22,13 +27,41 @@ from configs.app_settings import (
     PROJECT_ID,
     LOCATION,
     MODEL_NAME,
-    SAFETY_SETTINGS
+    SAFETY_SETTINGS,
+    SECTION_GENERATION_MAX_WORKERS,
+    CONTENT_FIELD_TOKEN_BUDGETS,
+    VALIDATION_ENABLED,
+    LOCALISATION_LOCALES,
+    LOCALISATION_TOKEN_FACTORS,
+    LOCALISATION_DEFAULT_TOKEN_FACTOR,
+    GENERATION_PROFILES,
+    GENERATION_TOKENS_PER_WORD,
+    GENERATION_DEFAULT_MAX_OUTPUT_TOKENS,
+    CALL_SITE_PROFILES,
+    TONE_PROFILE_OVERRIDES,
+    STREAM_RESUME_MAX_RETRIES,
+    STREAM_RESUME_BACKOFF_SECONDS
 )
+from content.normalization import normalize_text, estimate_tokens
+from . import ad_sections, ad_validation, cancellation, profiling
 
 # Module-level flag to indicate if Vertex AI has been successfully initialized in this process run.
 # Note: app.py uses st.session_state['vertex_ai_initialized'] to manage this across Streamlit reruns.
 _vertex_ai_successfully_initialized_this_run = False
 
+# GenerativeModel holds no per-user state, so one instance is shared by every session
+# in the process instead of each session keeping its own copy.
+_shared_model_instance = None
+_shared_model_lock = threading.Lock()
+
+# Per-profile latency and length-adherence measurements (see record_generation_metrics)
+_profile_stats = {}
+_profile_stats_lock = threading.Lock()
+
+# Broken response streams that were continued instead of regenerated (see _consume_stream)
+_stream_resume_lock = threading.Lock()
+_stream_resume_stats = {"resumes": 0, "resumed_streams_completed": 0, "tokens_salvaged": 0, "overlap_chars_dropped": 0}
+
 def init_vertex_ai():
     """
     Initializes the Vertex AI SDK and the specified generative model.
@@ -43,15 +76,16 @@ def init_vertex_ai():
     Returns:
         tuple: (GenerativeModel instance, bool indicating success) or (None, False) on failure.
     """
-    global _vertex_ai_successfully_initialized_this_run
+    # vertexai.init() can be called multiple times, but once a model has been created in
+    # this Python process it is reused by every session rather than re-initialized.
+    with _shared_model_lock:
+        if _shared_model_instance is not None:
+            return _shared_model_instance, True
+        return _init_vertex_ai_locked()
 
-    # While vertexai.init() can be called multiple times, we avoid redundant setup
-    # if we've already successfully done so in this Python process instance.
-    # The st.session_state in app.py is the primary gatekeeper for app-level sessions.
-    # if _vertex_ai_successfully_initialized_this_run:
-    #     print("DEBUG: Vertex AI init_vertex_ai called, but already flagged as initialized in this run.")
-    #     # This logic might need adjustment if the model object needs to be re-fetched.
-    #     # For now, assuming app.py calls this once and stores the model.
+def _init_vertex_ai_locked():
+    """Performs the actual initialization. Must be called with _shared_model_lock held."""
+    global _vertex_ai_successfully_initialized_this_run, _shared_model_instance
 
     print(f"DEBUG: Attempting Vertex AI initialization. Preferred method: {VERTEX_AI_AUTH_METHOD}")
     credentials_object = None # Will hold credentials if using a key file
@@ -91,6 +125,7 @@ def init_vertex_ai():
         model = GenerativeModel(MODEL_NAME, safety_settings=SAFETY_SETTINGS)
         print(f"DEBUG: Vertex AI Model '{MODEL_NAME}' loaded successfully.")
         _vertex_ai_successfully_initialized_this_run = True
+        _shared_model_instance = model
         return model, True
 
     except FileNotFoundError: # Should be caught by os.path.exists for KEY_FILE method
@@ -105,24 +140,99 @@ def init_vertex_ai():
         # traceback.print_exc()
         return None, False
 
-def generate_initial_ad(model: GenerativeModel, template: str, description: str, tone: str, max_words: int) -> str | None:
+def resolve_generation_profile(call_site: str, tone: str | None = None, profile_name: str | None = None) -> tuple[str, dict]:
     """
-    Generates the initial job advertisement using the provided model and inputs.
+    Resolves the generation profile for a call site: an explicit profile name wins, then the
+    call site's default from CALL_SITE_PROFILES; tone overrides are applied on top.
+
+    Returns:
+        tuple: (profile name, profile settings dict).
+    """
+    if profile_name not in GENERATION_PROFILES:
+        profile_name = CALL_SITE_PROFILES.get(call_site, "final")
+    profile = dict(GENERATION_PROFILES[profile_name])
+    profile.update(TONE_PROFILE_OVERRIDES.get(tone, {}))
+    return profile_name, profile
+
+def max_output_tokens_for(max_words: int, token_headroom: float) -> int:
+    """Output-token cap for a word limit (GENERATION_DEFAULT_MAX_OUTPUT_TOKENS when there is no limit)."""
+    if max_words <= 0:
+        return GENERATION_DEFAULT_MAX_OUTPUT_TOKENS
+    # A fixed allowance covers headings and markdown on short sections
+    return math.ceil(max_words * GENERATION_TOKENS_PER_WORD * token_headroom) + 64
+
+def build_generation_config(call_site: str, max_words: int | None = 0, tone: str | None = None,
+                            profile_name: str | None = None, max_output_tokens: int | None = None) -> GenerationConfig:
+    """
+    Builds the GenerationConfig for a model call.
 
     Args:
-        model: The initialized GenerativeModel instance.
-        template: The job ad template string.
-        description: The job description string or key information.
-        tone: The desired tone for the advertisement.
-        max_words: Approximate maximum word count (0 for no strict limit).
+        call_site: One of the CALL_SITE_PROFILES keys ("initial_ad", "section", "repair", "chat", "localisation").
+        max_words: Word limit of the text this call produces (0 for no limit, which still applies
+                   GENERATION_DEFAULT_MAX_OUTPUT_TOKENS; None for no cap beyond the model's own maximum).
+        tone: The selected tone, for TONE_PROFILE_OVERRIDES.
+        profile_name: Optional explicit profile (a GENERATION_PROFILES key).
+        max_output_tokens: Optional explicit cap, for output whose length is not measured in
+                           English words (replaces the cap derived from max_words).
+    """
+    _, profile = resolve_generation_profile(call_site, tone, profile_name)
+    config_kwargs = {
+        "temperature": profile["temperature"],
+        "top_p": profile["top_p"],
+        "candidate_count": profile["candidate_count"],
+    }
+    if max_output_tokens is None and max_words is not None:
+        max_output_tokens = max_output_tokens_for(max_words, profile["token_headroom"])
+    if max_output_tokens:
+        config_kwargs["max_output_tokens"] = max_output_tokens
+    if profile.get("stop_sequences"):
+        config_kwargs["stop_sequences"] = profile["stop_sequences"]
+    return GenerationConfig(**config_kwargs)
 
-    Returns:
-        The generated job advertisement text as a string, or None on failure.
+def record_generation_metrics(profile_name: str, seconds: float, text: str | None, max_words: int):
+    """Records latency and length adherence of one completed generation for its profile."""
+    with _profile_stats_lock:
+        stats = _profile_stats.setdefault(profile_name, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                                                         "limited_calls": 0, "within_limit": 0, "total_length_ratio": 0.0})
+        stats["calls"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if max_words > 0 and text:
+            length_ratio = ad_validation.count_words(text) / max_words
+            stats["limited_calls"] += 1
+            stats["total_length_ratio"] += length_ratio
+            if length_ratio <= 1.0:
+                stats["within_limit"] += 1
+
+def get_generation_profile_stats() -> dict:
     """
-    if not model:
-        st.error("Vertex AI Model not available for ad generation. Please check initialization.")
-        print("ERROR: generate_initial_ad called with no model.")
-        return None
+    Per-profile summary: call count, mean/max latency and, for calls with a word limit,
+    the mean words/limit ratio and the share of outputs within the limit.
+    """
+    with _profile_stats_lock:
+        summary = {}
+        for profile_name, stats in _profile_stats.items():
+            limited = stats["limited_calls"]
+            summary[profile_name] = {
+                "calls": stats["calls"],
+                "mean_seconds": round(stats["total_seconds"] / stats["calls"], 3),
+                "max_seconds": round(stats["max_seconds"], 3),
+                "mean_length_ratio": round(stats["total_length_ratio"] / limited, 3) if limited else None,
+                "within_limit_pct": round(100 * stats["within_limit"] / limited, 1) if limited else None,
+            }
+        return summary
+
+def _prepare_prompt_inputs(template: str, description: str) -> tuple[str, str]:
+    """Normalises user-editable prompt fields (whitespace, boilerplate, optional token budgets)."""
+    return (normalize_text(template, token_budget=CONTENT_FIELD_TOKEN_BUDGETS.get("template", 0)),
+            normalize_text(description, token_budget=CONTENT_FIELD_TOKEN_BUDGETS.get("description", 0)))
+
+def build_initial_ad_prompt(template: str, description: str, tone: str, max_words: int) -> str:
+    """
+    Builds the full-ad generation prompt. Shared by the UI and the HTTP API so both
+    send the model exactly the same prompt for the same inputs.
+    """
+    template, description = _prepare_prompt_inputs(template, description)
 
     # Construct configuration instructions for the prompt
     config_instructions = f"\nAdopt a '{tone}' tone for the advertisement."
@@ -132,7 +242,7 @@ def generate_initial_ad(model: GenerativeModel, template: str, description: str,
         config_instructions += "\nThere is no strict word limit, but aim for clarity and conciseness appropriate for a job ad."
 
     # Construct the full prompt for the LLM
-    prompt = f"""
+    return f"""
 You are an expert HR copywriter specializing in creating compelling job advertisements.
 Your task is to generate a complete and engaging job advertisement based on the provided template, job description, and specific instructions.
 
@@ -162,36 +272,470 @@ Your task is to generate a complete and engaging job advertisement based on the
 
 Begin the job advertisement now:
 """
+
+@profiling.profiled()
+def generate_initial_ad(model: GenerativeModel, template: str, description: str, tone: str, max_words: int,
+                        profile_name: str | None = None,
+                        cancel_token: cancellation.CancellationToken | None = None) -> str | None:
+    """
+    Generates the initial job advertisement using the provided model and inputs.
+
+    Args:
+        model: The initialized GenerativeModel instance.
+        template: The job ad template string.
+        description: The job description string or key information.
+        tone: The desired tone for the advertisement.
+        max_words: Approximate maximum word count (0 for no strict limit).
+        profile_name: Optional generation profile (defaults to the "initial_ad" call-site profile).
+        cancel_token: Optional token; the response stream is closed once it is cancelled.
+
+    Returns:
+        The generated job advertisement text as a string, or None on failure or cancellation.
+        Text cut off at the output token limit is returned, with a warning.
+    """
+    if not model:
+        st.error("Vertex AI Model not available for ad generation. Please check initialization.")
+        print("ERROR: generate_initial_ad called with no model.")
+        return None
+
+    prompt = build_initial_ad_prompt(template, description, tone, max_words)
+    profile_name, _ = resolve_generation_profile("initial_ad", tone, profile_name)
     try:
         print(f"DEBUG: Sending prompt to Vertex AI for initial ad generation (first 50 chars): {prompt[:50]}...")
-        response = model.generate_content(prompt)
+        started = time.perf_counter()
+        generation_config = build_generation_config("initial_ad", max_words, tone, profile_name)
+        response_stream = model.generate_content(prompt, stream=True, generation_config=generation_config)
+        generated_text, last_chunk, completed = _consume_stream(response_stream, "initial_ad", cancel_token,
+                                                                resume=_make_resume(model, prompt, generation_config))
+        if not completed:
+            return None
+        if is_truncated(last_chunk):
+            # The cap bounds the generation time, so the text is kept as it is and the user is told
+            st.warning("The ad reached the output length limit for this word limit and may end abruptly. "
+                       "Check its last section, or raise the word limit and generate again.")
+            print(f"WARNING: Initial ad truncated at max_output_tokens after {len(generated_text)} characters.")
         print("DEBUG: Received response from Vertex AI for initial ad generation.")
-        return response.text
+        record_generation_metrics(profile_name, time.perf_counter() - started, generated_text, max_words)
+        return generated_text
     except Exception as e:
         error_msg = f"An error occurred during ad generation: {e}"
         st.error(error_msg)
         print(f"ERROR: Ad generation failed. Details: {error_msg}")
         return None
 
-def initialize_chat_session_with_context(model: GenerativeModel, generated_ad_text: str) -> ChatSession | None:
+def generate_initial_ad_in_background(model: GenerativeModel, template: str, description: str, tone: str,
+                                     max_words: int, cancel_token: cancellation.CancellationToken,
+                                     profile_name: str | None = None) -> str | None:
     """
-    Initializes or re-initializes a chat session, priming it with the current job ad
-    and instructions for AI behavior during fine-tuning.
+    Generates an ad off the Streamlit script thread (no st calls; errors are raised).
+    The response is streamed so the call can be abandoned between chunks once
+    cancel_token is cancelled.
+
+    Returns:
+        The generated text, or None if the generation was cancelled. OutputTruncated is
+        raised if the ad was cut off at the output token limit.
+    """
+    prompt = build_initial_ad_prompt(template, description, tone, max_words)
+    profile_name, _ = resolve_generation_profile("initial_ad", tone, profile_name)
+    started = time.perf_counter()
+    generation_config = build_generation_config("initial_ad", max_words, tone, profile_name)
+    response_stream = model.generate_content(prompt, stream=True, generation_config=generation_config)
+    generated_text, last_chunk, completed = _consume_stream(response_stream, "speculative", cancel_token,
+                                                            resume=_make_resume(model, prompt, generation_config))
+    if not completed:
+        return None
+    if is_truncated(last_chunk):
+        raise OutputTruncated(f"Ad cut off at max_output_tokens after {len(generated_text)} characters.")
+    record_generation_metrics(profile_name, time.perf_counter() - started, generated_text, max_words)
+    return generated_text
+
+def _build_section_prompt(section: dict, all_sections: list[dict], description: str, tone: str, word_budget: int) -> str:
+    """Builds the prompt that generates a single template section."""
+    section_titles = ", ".join(s["title"] for s in all_sections)
+    if section["heading"]:
+        heading_instruction = f"Start your output with this heading line exactly as written: {section['heading']}"
+    else:
+        heading_instruction = "This is the opening part of the ad (before any section heading). Do not add a heading."
+    length_instruction = f"Keep this section to approximately {word_budget} words." if word_budget > 0 else \
+        "Keep this section concise and appropriate for a job ad."
+
+    return f"""
+You are an expert HR copywriter specializing in creating compelling job advertisements.
+You are writing ONE section of a job advertisement. Other sections ({section_titles}) are written separately, so do not repeat their content.
+
+**SECTION TEMPLATE:**
+<section_template>
+{ad_sections.render_section(section)}
+</section_template>
+
+**JOB DESCRIPTION:**
+<job_description>
+{description}
+</job_description>
+
+**INSTRUCTIONS:**
+*   Fill in the placeholders and expand this section using the job description. If the job description lacks the information, write plausible, positive content.
+*   Adopt a '{tone}' tone. {length_instruction}
+*   {heading_instruction}
+*   Preserve formatting (bullet points, bolding) from the section template.
+*   Output ONLY the section text, with no commentary before or after it.
+"""
+
+def _generate_section(model: GenerativeModel, section: dict, prompt: str, generation_config: GenerationConfig,
+                      cancel_token: cancellation.CancellationToken | None = None) -> tuple[str, bool]:
+    """
+    Generates one section. Runs on a worker thread, so it must not call Streamlit;
+    errors are raised to the caller (GenerationCancelled if cancel_token was cancelled).
+
+    Returns:
+        tuple: (section text, True if it was cut off at the output token limit).
+    """
+    if cancel_token is not None and cancel_token.cancelled:
+        raise cancellation.GenerationCancelled(cancel_token.reason)
+    response_stream = model.generate_content(prompt, stream=True, generation_config=generation_config)
+    text, last_chunk, completed = _consume_stream(response_stream, "section", cancel_token,
+                                                  resume=_make_resume(model, prompt, generation_config))
+    if not completed:
+        raise cancellation.GenerationCancelled(cancel_token.reason)
+    truncated = is_truncated(last_chunk)
+    if truncated:
+        print(f"WARNING: Section '{section['title']}' truncated at max_output_tokens; kept as generated.")
+    text = text.strip()
+    # Guarantee the heading is present so the stitched ad can be re-parsed into sections.
+    if section["heading"] and ad_sections.normalize_title(text.splitlines()[0] if text else "") != \
+            ad_sections.normalize_title(section["heading"]):
+        text = f"{section['heading']}\n{text}"
+    return text, truncated
+
+@profiling.profiled()
+def generate_sectioned_ad(model: GenerativeModel, template: str, description: str, tone: str, max_words: int,
+                          profile_name: str | None = None,
+                          cancel_token: cancellation.CancellationToken | None = None,
+                          on_progress=None) -> str | None:
+    """
+    Generates a job advertisement section by section, with all sections requested
+    concurrently against the shared job description and stitched together in template order.
+    Falls back to `generate_initial_ad` when the template has fewer than two sections.
 
     Args:
         model: The initialized GenerativeModel instance.
-        generated_ad_text: The current full text of the job advertisement.
+        template: The job ad template string.
+        description: The job description string or key information.
+        tone: The desired tone for the advertisement.
+        max_words: Approximate maximum word count (0 for no strict limit), split across sections.
+        profile_name: Optional generation profile (defaults to the "section" call-site profile).
+        cancel_token: Optional token; once cancelled, section streams are closed and None is returned.
+        on_progress: Optional callback(done, total), called from the calling thread about twice a
+                     second while sections are generated. Its Streamlit calls double as checkpoints
+                     at which a rerun or stop can interrupt the wait; the sections are then cancelled.
 
     Returns:
-        A new ChatSession instance, or None on failure.
+        The generated job advertisement text as a string, or None on failure or cancellation.
+        Text cut off at the output token limit is returned, with a warning.
     """
     if not model:
-        st.error("Vertex AI Model not available for chat initialization.")
-        print("ERROR: initialize_chat_session_with_context called with no model.")
+        st.error("Vertex AI Model not available for ad generation. Please check initialization.")
+        print("ERROR: generate_sectioned_ad called with no model.")
+        return None
+
+    template, description = _prepare_prompt_inputs(template, description)
+
+    sections = ad_sections.parse_sections(template)
+    if len(sections) < 2:
+        return generate_initial_ad(model, template, description, tone, max_words, profile_name, cancel_token)
+
+    profile_name, _ = resolve_generation_profile("section", tone, profile_name)
+    word_budgets = ad_sections.split_word_budget(sections, max_words)
+    section_jobs = [
+        (section, _build_section_prompt(section, sections, description, tone, budget),
+         build_generation_config("section", budget, tone, profile_name))
+        for section, budget in zip(sections, word_budgets)
+    ]
+    print(f"DEBUG: Generating {len(sections)} ad sections concurrently.")
+    started = time.perf_counter()
+    # The workers need a token even when the caller has none, so an interrupted wait can stop them
+    cancel_token = cancel_token or cancellation.CancellationToken()
+    try:
+        with ThreadPoolExecutor(max_workers=min(SECTION_GENERATION_MAX_WORKERS, len(sections))) as executor:
+            futures = [executor.submit(_generate_section, model, *job, cancel_token) for job in section_jobs]
+            pending = set(futures)
+            try:
+                while pending:
+                    _, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    if on_progress:
+                        on_progress(len(futures) - len(pending), len(futures))
+            except BaseException as e: # Streamlit rerun/stop raised from on_progress
+                cancel_token.cancel(cancellation.interruption_reason(e))
+                raise
+            generated, truncated_flags = zip(*(future.result() for future in futures))
+    except cancellation.GenerationCancelled as e:
+        print(f"DEBUG: Sectioned ad generation cancelled ({e}).")
+        return None
+    except Exception as e:
+        error_msg = f"An error occurred during ad generation: {e}"
+        st.error(error_msg)
+        print(f"ERROR: Sectioned ad generation failed. Details: {error_msg}")
+        return None
+
+    generated_sections = [
+        {"title": section["title"], "heading": "", "body": text} for section, text in zip(sections, generated)
+    ]
+    print("DEBUG: All ad sections generated; stitched in template order.")
+    truncated_titles = [section["title"] for section, truncated in zip(sections, truncated_flags) if truncated]
+    if truncated_titles:
+        st.warning(f"These sections reached their output length limit and may end abruptly: "
+                   f"{', '.join(truncated_titles)}.")
+    stitched_ad = ad_sections.stitch_sections(generated_sections)
+    record_generation_metrics(profile_name, time.perf_counter() - started, stitched_ad, max_words)
+    return stitched_ad
+
+@profiling.profiled()
+def regenerate_ad_section(model: GenerativeModel, current_ad: str, template: str, section_title: str,
+                          description: str, tone: str, max_words: int, profile_name: str | None = None,
+                          cancel_token: cancellation.CancellationToken | None = None) -> str | None:
+    """
+    Regenerates a single section of the current ad, leaving every other section untouched.
+
+    Args:
+        model: The initialized GenerativeModel instance.
+        current_ad: The full text of the current job advertisement.
+        template: The job ad template string the ad was generated from.
+        section_title: Title of the section to regenerate.
+        description: The job description string or key information.
+        tone: The desired tone for the advertisement.
+        max_words: Approximate maximum word count for the whole ad (0 for no strict limit).
+        profile_name: Optional generation profile (defaults to the "section" call-site profile).
+        cancel_token: Optional token; the response stream is closed once it is cancelled.
+
+    Returns:
+        The full job advertisement with the section replaced, or None on failure or cancellation.
+    """
+    if not model:
+        st.error("Vertex AI Model not available for ad generation. Please check initialization.")
+        print("ERROR: regenerate_ad_section called with no model.")
+        return None
+    if not section_title:
+        st.error("Please choose a section to regenerate.")
+        print("ERROR: regenerate_ad_section called with no section title.")
+        return None
+
+    template, description = _prepare_prompt_inputs(template, description)
+    template_sections = ad_sections.parse_sections(template)
+    ad_sections_list = ad_sections.parse_sections(current_ad)
+    template_index = ad_sections.find_section(template_sections, section_title)
+    ad_index = ad_sections.find_section(ad_sections_list, section_title)
+    if template_index < 0 or ad_index < 0:
+        st.error(f"Section '{section_title}' was not found in both the template and the current ad.")
+        print(f"ERROR: regenerate_ad_section could not locate section '{section_title}'.")
+        return None
+
+    section = template_sections[template_index]
+    word_budget = ad_sections.split_word_budget(template_sections, max_words)[template_index]
+    prompt = _build_section_prompt(section, template_sections, description, tone, word_budget)
+    try:
+        print(f"DEBUG: Regenerating ad section '{section_title}'.")
+        new_text, truncated = _generate_section(model, section, prompt,
+                                                build_generation_config("section", word_budget, tone, profile_name),
+                                                cancel_token)
+    except cancellation.GenerationCancelled as e:
+        print(f"DEBUG: Section regeneration cancelled ({e}).")
+        return None
+    except Exception as e:
+        error_msg = f"An error occurred while regenerating the section: {e}"
+        st.error(error_msg)
+        print(f"ERROR: Section regeneration failed. Details: {error_msg}")
+        return None
+
+    if truncated:
+        st.warning(f"The regenerated '{section_title}' section reached its output length limit and may end abruptly.")
+    ad_sections_list[ad_index] = {"title": section["title"], "heading": "", "body": new_text}
+    return ad_sections.stitch_sections(ad_sections_list)
+
+def _build_missing_sections_prompt(template_sections: list[dict], missing_titles: list[str],
+                                   description: str, tone: str) -> str:
+    """Prompt that writes only the sections missing from an otherwise finished ad."""
+    missing_templates = "\n\n".join(
+        ad_sections.render_section(template_sections[ad_sections.find_section(template_sections, title)])
+        for title in missing_titles
+    )
+    return f"""
+You are an expert HR copywriter. A job advertisement is finished except for the sections below, which are missing.
+Write ONLY these sections, in this order, each starting with its heading line exactly as given. Adopt a '{tone}' tone.
+
+<missing_sections_template>
+{missing_templates}
+</missing_sections_template>
+
+<job_description>
+{description}
+</job_description>
+
+Output only the section text, with no commentary.
+"""
+
+def _build_repair_prompt(ad_text: str, issues: list[dict], description: str, max_words: int) -> str:
+    """Prompt that fixes specific validation issues while leaving the rest of the ad unchanged."""
+    length_rule = f"*   Bring the ad to approximately {max_words} words by tightening wording, not by dropping sections.\n" \
+        if any(issue["type"] == "length" for issue in issues) else ""
+    return f"""
+You are an expert HR copywriter. The job advertisement below has specific problems. Fix ONLY these problems:
+{ad_validation.describe_issues(issues)}
+
+**RULES:**
+*   Keep every other sentence, heading and formatting exactly as it is.
+*   Fill placeholders using the job description. If it does not contain the information, rewrite the sentence so no placeholder remains.
+{length_rule}*   Output ONLY the complete corrected job advertisement, with no commentary.
+
+<job_ad>
+{ad_text}
+</job_ad>
+
+<job_description>
+{description}
+</job_description>
+"""
+
+def _repair_ad(model: GenerativeModel, ad_text: str, template: str, description: str, tone: str,
+               max_words: int, issues: list[dict]) -> str:
+    """
+    Issues one narrowly scoped repair request. When the only problem is missing sections,
+    just those sections are written and inserted in template order; otherwise the ad is
+    corrected in place. Raises on model errors and on a response cut off at max_output_tokens.
+    """
+    template, description = _prepare_prompt_inputs(template, description)
+    if all(issue["type"] == "missing_section" for issue in issues):
+        template_sections = ad_sections.parse_sections(template)
+        missing_titles = [issue["detail"] for issue in issues]
+        print(f"DEBUG: Repair: writing {len(missing_titles)} missing section(s) only.")
+        response = model.generate_content(
+            _build_missing_sections_prompt(template_sections, missing_titles, description, tone),
+            generation_config=build_generation_config("repair", 0, tone)
+        )
+        if is_truncated(response):
+            raise OutputTruncated("Missing-section repair was cut off at the output token limit.")
+        written = {ad_sections.normalize_title(section["title"]): section
+                   for section in ad_sections.parse_sections(response.text)}
+
+        # Rebuild in template order, keeping existing sections untouched and adding the written ones
+        current = ad_sections.parse_sections(ad_text)
+        merged = [section for section in current if not section["heading"]]
+        for template_section in template_sections:
+            if not template_section["heading"]:
+                continue
+            title_key = ad_sections.normalize_title(template_section["title"])
+            existing_index = ad_sections.find_section(current, template_section["title"])
+            if existing_index >= 0:
+                merged.append(current[existing_index])
+            elif title_key in written:
+                merged.append(written[title_key])
+        # Keep any extra sections the ad had that the template does not
+        merged += [section for section in current if section["heading"] and section not in merged]
+        return ad_sections.stitch_sections(merged)
+
+    print(f"DEBUG: Repair: fixing {len(issues)} issue(s) in place.")
+    response = model.generate_content(
+        _build_repair_prompt(ad_text, issues, description, max_words),
+        generation_config=build_generation_config("repair", max_words, tone)
+    )
+    if is_truncated(response):
+        raise OutputTruncated("Ad repair was cut off at the output token limit.")
+    return ad_validation.clean_ai_response(response.text)
+
+@profiling.profiled()
+def validate_and_repair(model: GenerativeModel, ad_text: str, template: str, description: str, tone: str,
+                        max_words: int, check_sections: bool = True) -> tuple[str, list[dict]]:
+    """
+    Cleans and validates an ad locally and, if it fails, issues a single targeted repair request.
+    Makes no Streamlit calls, so it can be used from the UI, the API and background jobs.
+
+    Args:
+        model: The initialized GenerativeModel instance (None skips the repair).
+        ad_text: The raw generated or refined ad.
+        template: The template the ad was generated from.
+        description: The job description string or key information.
+        tone: The desired tone for the advertisement.
+        max_words: Approximate maximum word count (0 for no strict limit).
+        check_sections: Whether template section coverage is checked (off for chat refinements).
+
+    Returns:
+        tuple: (the best ad text, list of remaining validation issues).
+    """
+    ad_text = ad_validation.clean_ai_response(ad_text)
+    if not VALIDATION_ENABLED:
+        return ad_text, []
+    issues = ad_validation.validate_ad(ad_text, template, max_words, check_sections)
+    if not issues or not model:
+        return ad_text, issues
+
+    try:
+        repaired_text = _repair_ad(model, ad_text, template, description, tone, max_words, issues)
+    except Exception as e:
+        print(f"ERROR: Ad repair request failed; keeping the unrepaired ad. Details: {e}")
+        return ad_text, issues
+    remaining_issues = ad_validation.validate_ad(repaired_text, template, max_words, check_sections)
+    ad_validation.record_repair(resolved=not remaining_issues)
+    if repaired_text.strip() and len(remaining_issues) <= len(issues):
+        return repaired_text, remaining_issues
+    return ad_text, issues
+
+def build_localisation_prompt(ad_text: str, language: str) -> str:
+    """Prompt that translates a finished ad, keeping its markdown structure line for line."""
+    return f"""
+You are an expert HR copywriter and translator. Translate the job advertisement below into {language}.
+
+**RULES:**
+*   Keep the formatting exactly: the same headings, bullet points, numbering, bold and italic markers, blank lines and line order.
+*   Keep URLs, email addresses, phone numbers, company names and product or technology names unchanged.
+*   Adapt job titles, salary wording and benefits phrasing to what is usual for job ads in that market, without adding or removing information.
+*   Output ONLY the translated job advertisement, with no commentary.
+
+<job_ad>
+{ad_text}
+</job_ad>
+"""
+
+def translation_max_output_tokens(ad_text: str, locale: str) -> int:
+    """Output-token cap for translating an ad into a locale, sized from the source ad's tokens."""
+    token_factor = LOCALISATION_TOKEN_FACTORS.get(locale, LOCALISATION_DEFAULT_TOKEN_FACTOR)
+    return math.ceil(estimate_tokens(ad_text) * token_factor) + 64
+
+def translate_ad_in_background(model: GenerativeModel, ad_text: str, locale: str,
+                               cancel_token: cancellation.CancellationToken | None = None,
+                               on_text=None) -> str | None:
+    """
+    Translates a finished ad off the Streamlit script thread (no st calls; errors are raised).
+
+    Args:
+        model: The initialized GenerativeModel instance.
+        ad_text: The ad to translate.
+        locale: Target locale, a LOCALISATION_LOCALES key such as "de-DE".
+        cancel_token: Optional token; the response stream is closed once it is cancelled.
+        on_text: Optional callback receiving the translation so far after each chunk.
+
+    Returns:
+        The translated text, or None if the translation was cancelled. OutputTruncated is
+        raised if the translation was cut off at the output token limit.
+    """
+    profile_name, _ = resolve_generation_profile("localisation")
+    started = time.perf_counter()
+    prompt = build_localisation_prompt(ad_text, LOCALISATION_LOCALES[locale])
+    generation_config = build_generation_config("localisation", profile_name=profile_name,
+                                                max_output_tokens=translation_max_output_tokens(ad_text, locale))
+    response_stream = model.generate_content(prompt, stream=True, generation_config=generation_config)
+    translated_text, last_chunk, completed = _consume_stream(response_stream, "localisation", cancel_token, on_text,
+                                                             resume=_make_resume(model, prompt, generation_config))
+    if not completed:
         return None
+    if is_truncated(last_chunk):
+        raise OutputTruncated(f"Translation into {locale} was cut off at the output token limit.")
+    # Word counts do not carry over between languages, so only the latency is recorded
+    record_generation_metrics(profile_name, time.perf_counter() - started, translated_text, 0)
+    return translated_text.strip()
 
+def build_chat_priming_message(generated_ad_text: str) -> str:
+    """Builds the model-side message that primes a refinement chat with the current ad."""
     # This priming message is crucial for controlling the AI's output format during chat.
-    initial_assistant_message_content = f"""
+    return f"""
 Okay, I'm ready to help you refine the job ad. Here is the current version:
 
 --- START OF CURRENT JOB AD ---
@@ -224,6 +768,26 @@ I will rely on you to follow these instructions strictly, especially the output
 
 What changes would you like to make to the job ad displayed above?
 """
+
+@profiling.profiled()
+def initialize_chat_session_with_context(model: GenerativeModel, generated_ad_text: str) -> ChatSession | None:
+    """
+    Initializes or re-initializes a chat session, priming it with the current job ad
+    and instructions for AI behavior during fine-tuning.
+
+    Args:
+        model: The initialized GenerativeModel instance.
+        generated_ad_text: The current full text of the job advertisement.
+
+    Returns:
+        A new ChatSession instance, or None on failure.
+    """
+    if not model:
+        st.error("Vertex AI Model not available for chat initialization.")
+        print("ERROR: initialize_chat_session_with_context called with no model.")
+        return None
+
+    initial_assistant_message_content = build_chat_priming_message(generated_ad_text)
     # This message is from the "model" (assistant's) perspective, setting the stage.
     initial_model_content = Content(
         role="model",
@@ -239,7 +803,193 @@ What changes would you like to make to the job ad displayed above?
         print(f"ERROR: Chat session initialization failed: {e}")
         return None
 
-def send_chat_message(chat_session: ChatSession, user_prompt: str, message_placeholder) -> tuple[str | None, bool]:
+def extract_chunk_text(stream_chunk) -> str:
+    """Robustly extracts text from the various possible stream chunk structures."""
+    if hasattr(stream_chunk, 'text'):
+        return stream_chunk.text
+    if hasattr(stream_chunk, 'parts') and stream_chunk.parts and hasattr(stream_chunk.parts[0], 'text'):
+        return stream_chunk.parts[0].text
+    return ""
+
+def finish_reason_name(response_or_chunk) -> str | None:
+    """The first candidate's finish reason ("STOP", "MAX_TOKENS", "SAFETY", ...), or None if not reported."""
+    try:
+        return response_or_chunk.candidates[0].finish_reason.name
+    except (AttributeError, IndexError, TypeError):
+        return None
+
+def is_truncated(response_or_chunk) -> bool:
+    """True if the model stopped because it reached max_output_tokens, i.e. the text is incomplete."""
+    return finish_reason_name(response_or_chunk) == "MAX_TOKENS"
+
+class OutputTruncated(Exception):
+    """Raised when a response was cut off at max_output_tokens, so it must not be used as a finished ad."""
+
+def _close_stream(response_stream):
+    close_stream = getattr(response_stream, "close", None)
+    if close_stream:
+        close_stream()
+
+_CONTINUATION_INSTRUCTION = (
+    "Your previous response was cut off. Continue it from exactly where it stopped, mid-word or mid-line "
+    "if necessary. Do not repeat any of the text already written and do not add any commentary."
+)
+# Continuation text is held back until this many characters have arrived, so a repeated
+# tail of the partial response can be recognised and dropped
+_RESUME_OVERLAP_WINDOW_CHARS = 400
+_RESUME_MIN_OVERLAP_CHARS = 8 # Shorter matches are as likely to be coincidence as repetition
+_RESUMABLE_STREAM_ERRORS = (
+    OSError, # Includes ConnectionError, TimeoutError and the HTTP client's broken-stream errors
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.Unauthenticated, # Access token expired mid-stream; the new request refreshes it
+    google_exceptions.Aborted,
+    google_exceptions.ResourceExhausted,
+)
+
+def continuation_contents(prompt: str, partial_text: str, history: list | None = None) -> list:
+    """
+    Contents for a request that continues a broken response: the original turn, the partial
+    answer as the model's turn, and an instruction to carry on (just the original turn if
+    nothing had been received).
+    """
+    contents = list(history or []) + [Content(role="user", parts=[Part.from_text(prompt)])]
+    if partial_text:
+        contents += [Content(role="model", parts=[Part.from_text(partial_text)]),
+                     Content(role="user", parts=[Part.from_text(_CONTINUATION_INSTRUCTION)])]
+    return contents
+
+def strip_overlap(partial_text: str, continuation_text: str) -> str:
+    """
+    Drops the start of a continuation that repeats text already received: either the tail of
+    the partial text (the model restarted the interrupted line or sentence) or all of it (the
+    model restarted the whole response). A continuation shorter than _RESUME_MIN_OVERLAP_CHARS
+    that matches the start of the partial text (e.g. a closing "**") is kept, not taken for a restart.
+    """
+    if not partial_text or not continuation_text:
+        return continuation_text
+    for candidate in (continuation_text, continuation_text.lstrip()):
+        if candidate.startswith(partial_text):
+            overlap = len(partial_text)
+        elif len(candidate) >= _RESUME_MIN_OVERLAP_CHARS and partial_text.startswith(candidate):
+            overlap = len(candidate) # A restart that broke again before catching up
+        else:
+            overlap = next((length for length in range(min(len(partial_text), len(candidate)),
+                                                        _RESUME_MIN_OVERLAP_CHARS - 1, -1)
+                            if partial_text.endswith(candidate[:length])), 0)
+        if overlap:
+            with _stream_resume_lock:
+                _stream_resume_stats["overlap_chars_dropped"] += overlap
+            return candidate[overlap:]
+    return continuation_text
+
+def _make_resume(model: GenerativeModel, prompt: str, generation_config: GenerationConfig, history: list | None = None):
+    """Returns a `resume` callable for _consume_stream that continues a broken generate_content stream."""
+    return lambda partial_text: model.generate_content(
+        continuation_contents(prompt, partial_text, history), stream=True, generation_config=generation_config
+    )
+
+def _record_stream_resume(kind: str, partial_text: str, error: Exception):
+    with _stream_resume_lock:
+        _stream_resume_stats["resumes"] += 1
+        _stream_resume_stats["tokens_salvaged"] += estimate_tokens(partial_text)
+    print(f"WARNING: {kind} model stream broke after {len(partial_text)} characters ({error}); resuming.")
+
+def get_stream_resume_stats() -> dict:
+    """Continuation requests made, streams they completed, and output tokens not generated twice."""
+    with _stream_resume_lock:
+        return dict(_stream_resume_stats)
+
+def _consume_stream(response_stream, kind: str, cancel_token: cancellation.CancellationToken | None = None,
+                    on_text=None, resume=None) -> tuple[str, object, bool]:
+    """
+    Iterates a streamed model response.
+
+    The upstream stream is closed early (and counted in the cancellation stats) when
+    cancel_token is cancelled, or when a Streamlit rerun/stop raised from on_text's
+    st calls interrupts the loop.
+
+    With `resume`, a transient error part-way through the stream does not lose the text
+    received so far: up to STREAM_RESUME_MAX_RETRIES continuation streams are requested
+    (with backoff) and appended, minus any text they repeat. on_text only ever sees text
+    that belongs to the final response. A response cut off at max_output_tokens is not
+    continued: the cap is the bound on generation time, and callers check the last chunk
+    (see is_truncated).
+
+    Args:
+        response_stream: The iterable returned by a stream=True call.
+        kind: Stream kind for the cancellation stats ("initial_ad", "section", "chat", ...).
+        cancel_token: Optional token checked before each chunk is consumed.
+        on_text: Optional callback receiving the text so far after each chunk.
+        resume: Optional callable(partial_text) returning a stream that continues the response
+                (see continuation_contents); errors are not retried without it.
+
+    Returns:
+        tuple: (text received, last chunk or None, True if the stream ran to completion).
+    """
+    text, last_chunk, resume_attempts = "", None, 0
+    held_back = None # Continuation text not yet checked for overlap (None outside a continuation)
+    while True:
+        try:
+            if response_stream is None:
+                response_stream = resume(text)
+            for stream_chunk in response_stream:
+                if cancel_token is not None and cancel_token.cancelled:
+                    _close_stream(response_stream)
+                    cancellation.record_aborted_stream(kind, cancel_token.reason, text)
+                    return text, last_chunk, False
+                last_chunk = stream_chunk
+                chunk_text = extract_chunk_text(stream_chunk)
+                if held_back is not None:
+                    held_back += chunk_text
+                    # Keep holding back while the continuation could still be a restart of the whole response
+                    if len(held_back) < _RESUME_OVERLAP_WINDOW_CHARS or text.startswith(held_back.lstrip()):
+                        continue
+                    chunk_text, held_back = strip_overlap(text, held_back), None
+                text += chunk_text
+                if on_text:
+                    on_text(text)
+            if held_back is not None:
+                text += strip_overlap(text, held_back)
+                held_back = None
+                if on_text:
+                    on_text(text)
+            break
+        except Exception as e:
+            if resume is None or resume_attempts >= STREAM_RESUME_MAX_RETRIES or \
+                    not isinstance(e, _RESUMABLE_STREAM_ERRORS):
+                raise # Model/network errors are handled by the callers
+            if held_back:
+                text += strip_overlap(text, held_back) # Keep what the broken continuation added
+            held_back = "" if text else None
+            if response_stream is not None:
+                _close_stream(response_stream)
+            response_stream = None
+            _record_stream_resume(kind, text, e)
+            time.sleep(STREAM_RESUME_BACKOFF_SECONDS * 2 ** resume_attempts)
+            resume_attempts += 1
+            if cancel_token is not None and cancel_token.cancelled:
+                cancellation.record_aborted_stream(kind, cancel_token.reason, text)
+                return text, last_chunk, False
+        except BaseException as e: # Streamlit rerun/stop: nobody will read the rest of this response
+            if cancel_token is not None:
+                cancel_token.cancel(cancellation.interruption_reason(e))
+            if response_stream is not None:
+                _close_stream(response_stream)
+            cancellation.record_aborted_stream(kind, cancellation.interruption_reason(e), text)
+            raise
+    if resume_attempts:
+        with _stream_resume_lock:
+            _stream_resume_stats["resumed_streams_completed"] += 1
+    cancellation.record_completed_stream(kind, text)
+    return text, last_chunk, True
+
+@profiling.profiled()
+def send_chat_message(chat_session: ChatSession, user_prompt: str, message_placeholder,
+                      max_words: int = 0, tone: str | None = None,
+                      cancel_token: cancellation.CancellationToken | None = None,
+                      model: GenerativeModel | None = None) -> tuple[str | None, bool]:
     """
     Sends a user's message to the ongoing chat session and streams the AI's response.
 
@@ -247,10 +997,16 @@ def send_chat_message(chat_session: ChatSession, user_prompt: str, message_place
         chat_session: The active ChatSession instance.
         user_prompt: The user's input string.
         message_placeholder: A Streamlit empty placeholder to stream the response into.
+        max_words: Word limit of the ad, for the length metrics only. The reply has no output-token
+                   cap beyond the model's own maximum: a refinement may legitimately lengthen the ad.
+        tone: The selected tone, for the "chat" profile's tone overrides.
+        cancel_token: Optional token; the response stream is closed once it is cancelled.
+        model: The model behind the chat (defaults to the shared instance), used to continue a
+               response whose stream broke part-way.
 
     Returns:
         tuple: (The AI's full response text or None on error, bool indicating success).
-               Success is False if the response was blocked, empty, or an error occurred.
+               Success is False if the response was blocked, empty, cancelled, or an error occurred.
     """
     if not chat_session:
         st.error("Chat session is not available. Cannot send message.")
@@ -262,37 +1018,57 @@ def send_chat_message(chat_session: ChatSession, user_prompt: str, message_place
     full_response_text = ""
     try:
         print(f"DEBUG: Sending user prompt to chat: '{user_prompt[:50]}...'")
-        response_stream = chat_session.send_message(user_prompt, stream=True)
-        
-        for stream_chunk in response_stream:
-            chunk_text_content = ""
-            # Robustly extract text from various possible chunk structures
-            if hasattr(stream_chunk, 'text'):
-                chunk_text_content = stream_chunk.text
-            elif hasattr(stream_chunk, 'parts') and stream_chunk.parts and hasattr(stream_chunk.parts[0], 'text'):
-                 chunk_text_content = stream_chunk.parts[0].text
-            
-            if chunk_text_content:
-                full_response_text += chunk_text_content
+        profile_name, _ = resolve_generation_profile("chat", tone)
+        started = time.perf_counter()
+        generation_config = build_generation_config("chat", None, tone)
+        # A broken turn is not added to the session history, so it is continued with a
+        # stateless request over the history as it was before this message
+        history_before = list(chat_session.history)
+        resume_model = model or _shared_model_instance
+        continuation_requests = []
+
+        def resume_chat_response(partial_text: str):
+            continuation_requests.append(len(partial_text))
+            return _make_resume(resume_model, user_prompt, generation_config, history_before)(partial_text)
+
+        response_stream = chat_session.send_message(user_prompt, stream=True, generation_config=generation_config)
+        # Each placeholder update is also a point where a new prompt (rerun) or a closed tab (stop)
+        # interrupts the loop; the upstream stream is then closed rather than drained.
+        full_response_text, stream_chunk, completed = _consume_stream(
+            response_stream, "chat", cancel_token,
+            on_text=(lambda text: message_placeholder.markdown(text + "▌")) if message_placeholder else None, # Streaming cursor
+            resume=resume_chat_response if resume_model else None
+        )
+        if not completed:
+            print("DEBUG: Chat response stream cancelled; ad not updated.")
+            return full_response_text, False
+        if continuation_requests:
+            # Record the turn in the session history as if the stream had not broken
+            del chat_session.history[len(history_before):]
+            chat_session.history.extend([Content(role="user", parts=[Part.from_text(user_prompt)]),
+                                         Content(role="model", parts=[Part.from_text(full_response_text)])])
+
+        # Check for safety blocking (reported on the final chunk)
+        if hasattr(stream_chunk, 'candidates') and stream_chunk.candidates and \
+           hasattr(stream_chunk.candidates[0], 'finish_reason') and \
+           stream_chunk.candidates[0].finish_reason.name == "SAFETY":
+            safety_message = "\n[AI response stopped due to safety reasons.]\n"
+            if safety_message not in full_response_text: # Avoid duplicate messages
+                full_response_text += safety_message
             if message_placeholder:
-                message_placeholder.markdown(full_response_text + "▌") # Streaming cursor
-
-            # Check for safety blocking during the stream
-            if hasattr(stream_chunk, 'candidates') and stream_chunk.candidates and \
-               hasattr(stream_chunk.candidates[0], 'finish_reason') and \
-               stream_chunk.candidates[0].finish_reason.name == "SAFETY":
-                safety_message = "\n[AI response stopped due to safety reasons.]\n"
-                if safety_message not in full_response_text: # Avoid duplicate messages
-                    full_response_text += safety_message
-                if message_placeholder:
-                    message_placeholder.markdown(full_response_text)
-                st.warning("AI response was blocked due to safety reasons. Ad not updated.")
-                print("WARNING: AI response blocked by safety filter during stream.")
-                return full_response_text, False # Return the partial text and False for success
+                message_placeholder.markdown(full_response_text)
+            st.warning("AI response was blocked due to safety reasons. Ad not updated.")
+            print("WARNING: AI response blocked by safety filter during stream.")
+            return full_response_text, False # Return the partial text and False for success
 
         if message_placeholder:
             message_placeholder.markdown(full_response_text) # Final complete response
 
+        if is_truncated(stream_chunk):
+            # Only the model's own output maximum applies to chat replies; the text is kept as it is
+            st.warning("The AI response reached the model's output length limit and may end abruptly.")
+            print(f"WARNING: Chat response truncated at the model's maximum after {len(full_response_text)} characters.")
+
         if not full_response_text.strip():
             st.warning("AI returned an empty response. Ad not updated.")
             print("WARNING: AI returned an empty response.")
@@ -309,6 +1085,7 @@ def send_chat_message(chat_session: ChatSession, user_prompt: str, message_place
             return full_response_text, False
 
         print("DEBUG: Received successful response from chat.")
+        record_generation_metrics(profile_name, time.perf_counter() - started, full_response_text, max_words)
         return full_response_text, True
 
     except TypeError as te: # Often related to unexpected stream chunk format
@@ -322,4 +1099,129 @@ def send_chat_message(chat_session: ChatSession, user_prompt: str, message_place
         st.error(error_msg)
         print(f"ERROR: {error_msg}")
         if message_placeholder: message_placeholder.error(f"An error occurred: {e}")
-        return None, False
\ No newline at end of file
+        return None, False
+
+def replace_last_model_turn(chat_session: ChatSession, text: str):
+    """
+    Replaces the text of the chat's latest model turn, e.g. with the repaired version of a
+    refined ad, so the next refinement starts from the ad the user actually sees.
+    """
+    for index in range(len(chat_session.history) - 1, -1, -1):
+        if chat_session.history[index].role == "model":
+            chat_session.history[index] = Content(role="model", parts=[Part.from_text(text)])
+            return
+
+def serialize_chat_history(chat_session: ChatSession | None) -> list:
+    """
+    Converts a chat session's history into a compact, JSON-compatible form.
+
+    Returns:
+        A list of [role, text] pairs (empty if there is no history).
+    """
+    if chat_session is None or not getattr(chat_session, 'history', None):
+        return []
+    serialized = []
+    for message in chat_session.history:
+        text = ""
+        if message.parts:
+            try:
+                text = message.parts[0].text
+            except AttributeError:
+                text = str(message.parts[0])
+        serialized.append([message.role, text])
+    return serialized
+
+def rebuild_chat_session(model: GenerativeModel, history: list) -> ChatSession | None:
+    """
+    Rebuilds a ChatSession from a history produced by `serialize_chat_history`.
+
+    Args:
+        model: The initialized GenerativeModel instance.
+        history: A list of [role, text] pairs.
+
+    Returns:
+        A ChatSession primed with the stored history, or None on failure.
+    """
+    if not model or not history:
+        return None
+    try:
+        contents = [Content(role=role, parts=[Part.from_text(text)]) for role, text in history]
+        chat_session = model.start_chat(history=contents)
+        print(f"DEBUG: Rebuilt chat session from {len(contents)} stored message(s).")
+        return chat_session
+    except Exception as e:
+        print(f"ERROR: Failed to rebuild chat session from stored history: {e}")
+        return None
+
+async def stream_initial_ad_async(model: GenerativeModel, template: str, description: str, tone: str, max_words: int,
+                                  profile_name: str | None = None):
+    """
+    Async generator that streams the initial job advertisement as text chunks.
+    Used by the HTTP API; makes no Streamlit calls and raises on failure.
+
+    Args:
+        model: The initialized GenerativeModel instance.
+        template: The job ad template string.
+        description: The job description string or key information.
+        tone: The desired tone for the advertisement.
+        max_words: Approximate maximum word count (0 for no strict limit).
+        profile_name: Optional generation profile (defaults to the "initial_ad" call-site profile).
+
+    Yields:
+        str: Successive chunks of the advertisement text.
+    """
+    prompt = build_initial_ad_prompt(template, description, tone, max_words)
+    print(f"DEBUG: Streaming initial ad generation (async), prompt length {len(prompt)} chars.")
+    response_stream = await model.generate_content_async(
+        prompt, stream=True, generation_config=build_generation_config("initial_ad", max_words, tone, profile_name)
+    )
+    text_stream = _relay_async_stream(response_stream, "api_initial_ad")
+    try:
+        async for chunk_text_content in text_stream:
+            yield chunk_text_content
+    finally:
+        await text_stream.aclose()
+
+async def _relay_async_stream(response_stream, kind: str):
+    """
+    Yields the text of each chunk of an async model stream. If the consumer closes this
+    generator early (client disconnected or superseded), the upstream stream is closed too;
+    the caller records why (see api_service). Raises OutputTruncated once all of the text has
+    been yielded if the stream was cut off at max_output_tokens, so the caller can warn.
+    """
+    text, last_chunk = "", None
+    try:
+        async for stream_chunk in response_stream:
+            last_chunk = stream_chunk
+            chunk_text_content = extract_chunk_text(stream_chunk)
+            if chunk_text_content:
+                text += chunk_text_content
+                yield chunk_text_content
+    except GeneratorExit:
+        close_stream = getattr(response_stream, "aclose", None)
+        if close_stream:
+            await close_stream()
+        raise
+    cancellation.record_completed_stream(kind, text)
+    if is_truncated(last_chunk):
+        raise OutputTruncated(f"The response was cut off at the output token limit after {len(text)} characters.")
+
+async def stream_chat_message_async(chat_session: ChatSession, user_prompt: str, tone: str | None = None):
+    """
+    Async generator that sends a refinement message and streams the reply as text chunks.
+    The SDK appends the exchange to the chat history once the stream completes. The reply has
+    no output-token cap beyond the model's own maximum (see _relay_async_stream for truncation).
+
+    Yields:
+        str: Successive chunks of the AI's reply.
+    """
+    print(f"DEBUG: Streaming chat reply (async) for prompt: '{user_prompt[:50]}...'")
+    response_stream = await chat_session.send_message_async(
+        user_prompt, stream=True, generation_config=build_generation_config("chat", None, tone)
+    )
+    text_stream = _relay_async_stream(response_stream, "api_chat")
+    try:
+        async for chunk_text_content in text_stream:
+            yield chunk_text_content
+    finally:
+        await text_stream.aclose()
@@ -0,0 +1,27 @@
+# job_ad_generator_project/tests/test_ad_validation.py
+
+from content.predefined_data import DEFAULT_JOB_AD_TEMPLATE
+from module import ad_validation
+
+
+def test_mixed_case_template_placeholders_are_found():
+    ad_text = ("**Job Title:** [Job Title]\n**Company:** [Your Company Name]\n**Location:** [Location]\n"
+               "Salary: [Salary Range]. Apply to [email_address] or via [Link].\n"
+               "*   [Responsibility 1: Action-oriented]\n")
+    assert ad_validation.find_placeholders(ad_text) == [
+        "[Job Title]", "[Your Company Name]", "[Location]", "[Salary Range]", "[email_address]", "[Link]",
+        "[Responsibility 1: Action-oriented]",
+    ]
+
+
+def test_default_template_placeholders_fail_validation():
+    issues = ad_validation.validate_ad(DEFAULT_JOB_AD_TEMPLATE, DEFAULT_JOB_AD_TEMPLATE, 0, check_sections=False)
+    placeholder_issues = [issue["detail"] for issue in issues if issue["type"] == "placeholder"]
+    assert placeholder_issues
+    assert "[Your Company Name]" in placeholder_issues[0]
+    assert "[Insert Job Title Here]" in placeholder_issues[0]
+
+
+def test_markdown_links_and_allowed_text_are_not_placeholders():
+    ad_text = "[INTERNAL ONLY]\nRead more on [our careers page](https://example.com/careers)."
+    assert ad_validation.find_placeholders(ad_text) == []